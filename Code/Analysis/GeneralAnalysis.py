@@ -18,7 +18,6 @@ Requirements
 + [re](https://docs.python.org/2/library/re.html)
 + [types](https://docs.python.org/2/library/types.html)
 + [numpy](https://docs.scipy.org/doc/)
-+ [scipy](https://docs.scipy.org/doc/)
 + [sympy](http://www.sympy.org/en/index.html)
 
 Help
@@ -53,14 +52,6 @@ try:
 except:
     print("Pandas was not imported")
     pass
-try:
-    from scipy.stats.mstats import gmean
-except:
-    print("The function gmean from the package scipy.stats.mstats did not import correctly ")
-try:
-    from statsmodels.robust.scale import mad
-except:
-    print("The function mad from the package statsmodels.robust.scale did not import correctly ")
 try:
     #Todo: this could lead to a cyclic dependency, it really should import only the models it analyzes
     #Todo: If analysis is to be in the top import, none of the models should rely on it
@@ -86,10 +77,12 @@ except:
 def independent_variable_model_collapse(model,independent_column_name="Frequency", **options):
     """Returns a model with a single set of independent variables. Default is to average values together
     but geometric mean, std, variance, rss, mad and median are options.
-    Geometric means of odd number of negative values fails"""
+    Geometric means of odd number of negative values fails. To keep other columns separate use group_by, for
+    example group_by=["Direction","Connect"], non-numeric columns that are not grouped keep their first value.
+    The groups are reduced in a single vectorized pass by group_by_aggregate"""
     if isinstance(model,pandas.DataFrame):
         model_1 = DataFrame_to_AsciiDataTable(model)
-    defaults = {"method": "mean"}
+    defaults = {"method": "mean", "group_by": None}
     # load other options from model
     for option, value in model.options.items():
         if not re.search('begin_line|end_line', option):
@@ -106,29 +99,15 @@ def independent_variable_model_collapse(model,independent_column_name="Frequency
         collapse_options[key] = value
     for key, value in options.items():
         collapse_options[key] = value
-    unique_independent_variable_list = sorted(list(set(model[independent_column_name])))
-    independent_variable_selector = model.column_names.index(independent_column_name)
-    out_data = []
-    for index, independent_variable in enumerate(unique_independent_variable_list):
-        data_row = [x for x in model.data[:] if x[independent_variable_selector] == independent_variable]
-        if re.search('mean|av', collapse_options["method"], re.IGNORECASE):
-            new_row = np.mean(np.array(data_row), axis=0).tolist()
-        elif re.search('median', collapse_options["method"], re.IGNORECASE):
-            new_row = np.median(np.array(data_row), axis=0).tolist()
-        elif re.search('geometric', collapse_options["method"], re.IGNORECASE):
-            new_row = gmean(np.array(data_row), axis=0).tolist()
-        elif re.search('st', collapse_options["method"], re.IGNORECASE):
-            new_row = np.std(np.array(data_row), axis=0).tolist()
-        elif re.search('var', collapse_options["method"], re.IGNORECASE):
-            new_row = np.var(np.array(data_row), axis=0, dtype=np.float64).tolist()
-        elif re.search('rms', collapse_options["method"], re.IGNORECASE):
-            new_row = np.sqrt(np.mean(np.square(np.array(data_row)), axis=0, dtype=np.float64)).tolist()
-        elif re.search('rss', collapse_options["method"], re.IGNORECASE):
-            new_row = np.sqrt(np.sum(np.square(np.array(data_row)), axis=0, dtype=np.float64)).tolist()
-        elif re.search('mad', collapse_options["method"], re.IGNORECASE):
-            new_row = mad(np.array(data_row), axis=0).tolist()
-        new_row[independent_variable_selector]=independent_variable
-        out_data.append(new_row)
+    group_column_names = [independent_column_name]
+    if collapse_options["group_by"]:
+        if isinstance(collapse_options["group_by"], StringType):
+            collapse_options["group_by"] = [collapse_options["group_by"]]
+        for column_name in collapse_options["group_by"]:
+            if column_name not in group_column_names:
+                group_column_names.append(column_name)
+    group_selectors = [model.column_names.index(column_name) for column_name in group_column_names]
+    out_data = group_by_aggregate(model.data, group_selectors, method=collapse_options["method"])
 
     collapse_options["data"] = out_data
 
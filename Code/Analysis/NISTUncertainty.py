@@ -18,6 +18,7 @@ Requirements
 + [re](https://docs.python.org/2/library/re.html)
 + [numpy](https://docs.scipy.org/doc/)
 + [math](https://docs.python.org/2/library/math.html)
++ [pickle](https://docs.python.org/2/library/pickle.html)
 
 
 Help
@@ -38,6 +39,7 @@ import sys
 import os
 import re
 import math
+import pickle
 #-----------------------------------------------------------------------------
 # Third Party Imports
 sys.path.append(os.path.join(os.path.dirname( __file__ ), '..','..'))
@@ -56,6 +58,13 @@ CONNECTOR_TYPES=['14 mm','7 mm', 'Type-N','3.5 mm', '2.92 mm', '2.4mm', '1.85 mm
 MINIMUM_DB=100
 """The smallest value in dB for a linear magnitude of zero. Note this one is positive,
 which is different than touchstone models definition."""
+UNCERTAINTY_BAND_EDGES=np.array([.01,.05,1.,18.])
+"""Frequencies in GHz where the uncertainty models change form"""
+UNCERTAINTY_TABLE_FREQUENCIES=np.geomspace(.001,110.,4001)
+"""Default frequency nodes in GHz of the compiled uncertainty tables, see CompiledUncertaintyModel"""
+COMPILED_UNCERTAINTY_MODELS={}
+"""Compiled uncertainty models by (connector type, model, uncertainty type, format),
+see get_compiled_uncertainty_model"""
 
 #-----------------------------------------------------------------------------
 # Module Functions
@@ -475,8 +484,444 @@ def type_b(wr_connector_type='Type-N', frequency=1, parameter='S11', magnitude=1
     return out
 
 
+def magnitude_to_db_array(magnitude):
+    """Converts an array of linear magnitudes to -20*log10(magnitude), magnitudes that are not positive are set to
+    MINIMUM_DB as in the scalar functions"""
+    magnitude=np.asarray(magnitude,dtype=np.float64)
+    magnitude_db=np.full(magnitude.shape,float(MINIMUM_DB))
+    positive=magnitude>0
+    magnitude_db[positive]=-20.*np.log10(magnitude[positive])
+    return magnitude_db
+
+def db_uncertainty_to_magnitude_array(magnitude,uncertainty_db):
+    """Converts an uncertainty in dB to an uncertainty in linear magnitude for the linear magnitude array magnitude"""
+    return np.abs((1./math.log10(math.e))*magnitude*uncertainty_db/20.)
+
+def coax_s11_S_NIST_array(connector_type='Type-N',frequency=1.0):
+    """Calculates S_NIST, for S11 in coax systems for an array of frequencies, returns
+    [uncertainty_magnitude_array,uncertainty_phase_array]"""
+    frequency=np.asarray(frequency,dtype=np.float64)
+    if re.search('14',connector_type,re.IGNORECASE):
+        uncertainty_magnitude=np.full(frequency.shape,.0005)
+    elif re.search('7',connector_type,re.IGNORECASE):
+        uncertainty_magnitude=10.0**(-3.303+.025*frequency)
+    elif re.search('N',connector_type,re.IGNORECASE):
+        uncertainty_magnitude=10.0**(-3.327+.046*frequency)
+    elif re.search('3.5|2.9',connector_type,re.IGNORECASE):
+        uncertainty_magnitude=10.0**(-3.281+.03*frequency)
+    else:
+        uncertainty_magnitude=1/(400.-.75*frequency*np.exp(.04*frequency))
+    uncertainty_phase=np.arctan(uncertainty_magnitude)
+    return [uncertainty_magnitude,uncertainty_phase]
+
+def coax_s11_type_b_array(connector_type='Type-N',frequency=1.0,magnitude_S11=1.0):
+    """Calculates Type-B uncertainties for S11 in a coax system for arrays of frequency and magnitude_S11,
+    returns [uncertainty_magnitude_array,uncertainty_phase_array]"""
+    frequency=np.asarray(frequency,dtype=np.float64)
+    magnitude_S11=np.asarray(magnitude_S11,dtype=np.float64)
+    Dx=.001*(1.61+.07*np.sqrt(frequency)+.04/frequency)+.0012
+    Dy=.001*(.01*frequency+.04/frequency)
+    uncertainty_m1=np.sqrt(Dx**2+Dy**2)
+    uncertainty_m2=.00008/frequency
+    uncertainty_m3=.1651*np.sqrt(frequency)*5.*6*10**6/(.35*math.sqrt((1.4*10**7)**3))
+    delta=np.sqrt((uncertainty_m1**2+uncertainty_m2**2+uncertainty_m3**2)/3)
+    with np.errstate(divide='ignore'):
+        uncertainty_arg1=np.arctan(uncertainty_m1/magnitude_S11)
+        uncertainty_arg2=np.arctan(uncertainty_m2/magnitude_S11)
+    uncertainty_arg3=12.0115*frequency*.0025
+    delta_arg=np.sqrt((uncertainty_arg1**2+uncertainty_arg2**2+uncertainty_arg3**2)/3)
+    if re.search('14',connector_type,re.IGNORECASE):
+        [magnitude_factor,phase_factor]=[1.,.5]
+    elif re.search('7|N',connector_type,re.IGNORECASE):
+        [magnitude_factor,phase_factor]=[1.,1.]
+    elif re.search('3.5',connector_type,re.IGNORECASE):
+        [magnitude_factor,phase_factor]=[2.,2.]
+    elif re.search('2.9',connector_type,re.IGNORECASE):
+        [magnitude_factor,phase_factor]=[2.4,2.4]
+    else:
+        [magnitude_factor,phase_factor]=[2.92,2.92]
+    return [magnitude_factor*delta,phase_factor*delta_arg]
+
+def waveguide_s11_S_NIST_array(waveguide_type='WR90',frequency=1.0):
+    """Calculates the S NIST Uncertainity for S11 on waveguide systems as arrays the shape of frequency"""
+    return [np.full(np.shape(frequency),value) for value in waveguide_s11_S_NIST(waveguide_type)]
+
+def waveguide_s11_type_b_array(waveguide_type='WR90',magnitude_S11=1.0):
+    """Calculates type B uncertainties for waveguides for an array of magnitude_S11"""
+    magnitude_S11=np.asarray(magnitude_S11,dtype=np.float64)
+    if re.search('90',waveguide_type,re.IGNORECASE):
+        [magnitude_coefficient,phase_term]=[.003,0.2]
+    elif re.search('62',waveguide_type,re.IGNORECASE):
+        [magnitude_coefficient,phase_term]=[.003,0.5]
+    elif re.search('42',waveguide_type,re.IGNORECASE):
+        [magnitude_coefficient,phase_term]=[.002,0.85]
+    elif re.search('28',waveguide_type,re.IGNORECASE):
+        [magnitude_coefficient,phase_term]=[.002,1.0]
+    elif re.search('22',waveguide_type,re.IGNORECASE):
+        [magnitude_coefficient,phase_term]=[.004,1.53]
+    elif re.search('15',waveguide_type,re.IGNORECASE):
+        [magnitude_coefficient,phase_term]=[.004,2.29]
+    else:
+        [magnitude_coefficient,phase_term]=[.005,3.36]
+    uncertainty_magnitude=magnitude_coefficient*(1.0+magnitude_S11**2)/math.sqrt(3.)
+    uncertainty_phase=np.sqrt(np.arctan(uncertainty_magnitude/(magnitude_S11+.001))**2+phase_term**2/3.)
+    return [uncertainty_magnitude,uncertainty_phase]
+
+def coax_s12_S_NIST_array(connector_type='N',frequency=1,magnitude_S21=10,format='DB'):
+    """Calculates SNIST for connector type for arrays of frequency and magnitude_S21. Frequencies outside of the
+    bands of the 7 mm model use the nearest band"""
+    magnitude=np.asarray(magnitude_S21,dtype=np.float64)
+    if re.search('mag',format,re.IGNORECASE):
+        # if the format is mag then change the number to db
+        magnitude_S21=magnitude_to_db_array(magnitude)
+    else:
+        magnitude_S21=magnitude
+    frequency,magnitude_S21=np.broadcast_arrays(np.asarray(frequency,dtype=np.float64),magnitude_S21)
+    band_25=(magnitude_S21>=0)&(magnitude_S21<25)
+    band_40=(magnitude_S21>=25)&(magnitude_S21<40)
+    band_65=(magnitude_S21>=40)&(magnitude_S21<65)
+    high_loss_magnitude=.02+.00015*(magnitude_S21-40.)**2
+    if re.search('14',connector_type,re.IGNORECASE):
+        uncertainty_magnitude=np.select([band_25,band_40,band_65],
+                                        [.0005+.00035*frequency,.02,high_loss_magnitude],.004)
+        uncertainty_phase=np.where(band_25,.02+.0153*frequency,.1+.017*frequency)
+        uncertainty_magnitude=np.maximum(uncertainty_magnitude,.004)
+    elif re.search('7',connector_type,re.IGNORECASE):
+        low_frequency=frequency<1.
+        uncertainty_magnitude=np.select([band_25&low_frequency,band_25,band_40,band_65],
+                                        [10.**(-3.06+.051*frequency),10.**(-2.816+.038*frequency),
+                                         .02,high_loss_magnitude],.004)
+        uncertainty_phase=np.select([band_25&low_frequency,band_25,(band_40|band_65)&low_frequency],
+                                    [10.**(-1.95+.792*frequency),10.**(-.927+.023*frequency),
+                                     10.**(-.96+.259*frequency)],.1+.017*frequency)
+        uncertainty_magnitude=np.maximum(uncertainty_magnitude,.004)
+    elif re.search('N',connector_type,re.IGNORECASE):
+        uncertainty_magnitude=np.select([band_25,band_40],[10.**(-2.17+.024*frequency),.02],high_loss_magnitude)
+        uncertainty_phase=np.where(band_25,10.**(-1.138+.032*frequency),.1+.017*frequency)
+        uncertainty_magnitude=np.maximum(uncertainty_magnitude,.004)
+    elif re.search('3.5|2.92|2.4',connector_type,re.IGNORECASE):
+        # All of the following cases have the same phase uncertainty
+        uncertainty_phase=.1+.0098*frequency
+        if re.search('3.5|2.92',connector_type,re.IGNORECASE):
+            [low_loss_magnitude,mid_loss_magnitude]=[.0005+.00027*frequency,.02]
+        else:
+            [low_loss_magnitude,mid_loss_magnitude]=[.01+.0004*frequency,.03]
+        uncertainty_magnitude=np.select([band_25,band_40,band_65],
+                                        [low_loss_magnitude,mid_loss_magnitude,
+                                         mid_loss_magnitude+.00015*(magnitude_S21-40.)**2],low_loss_magnitude)
+    else:
+        uncertainty_magnitude=np.full(frequency.shape,.002)
+        uncertainty_phase=np.full(frequency.shape,.01)
+    #enforce min uncertainties
+    uncertainty_magnitude=np.maximum(uncertainty_magnitude,.002)
+    uncertainty_phase=np.maximum(uncertainty_phase,.01)
+    if re.search('mag',format,re.IGNORECASE):
+        # if the format is mag then change the uncertainty back to mag
+        uncertainty_magnitude=db_uncertainty_to_magnitude_array(magnitude,uncertainty_magnitude)
+    return [uncertainty_magnitude,uncertainty_phase]
+
+def coax_s12_type_b_array(connector_type='N',frequency=1,magnitude_S21=10,format='DB'):
+    """Calculates the type-b uncertainty for coax connecters for arrays of frequency and magnitude_S21"""
+    magnitude=np.asarray(magnitude_S21,dtype=np.float64)
+    frequency,magnitude=np.broadcast_arrays(np.asarray(frequency,dtype=np.float64),magnitude)
+    uncertainty_m4=.0006*np.sqrt(frequency)+.0011
+    uncertainty_m5=(1.434*np.sqrt(frequency)*5.*6.*10**6)/(.35*math.sqrt((1.4*10**7)**3))
+    delta=np.sqrt((uncertainty_m4**2+uncertainty_m5**2)/3)
+    uncertainty_arg4=np.arctan(.01*np.sqrt((.017+.018*np.sqrt(frequency)+.05*frequency+.018*frequency**2)))
+    uncertainty_arg5=12.0115*frequency*.0025
+    delta_arg=np.sqrt((uncertainty_arg4**2+uncertainty_arg5**2)/3)
+    delta_arg=np.where(frequency<=1.,.03,delta_arg)
+    if re.search('14|7|N',connector_type,re.IGNORECASE):
+        uncertainty_magnitude=delta
+    elif re.search('3.5',connector_type,re.IGNORECASE):
+        uncertainty_magnitude=2.*delta
+    elif re.search('2.92',connector_type,re.IGNORECASE):
+        uncertainty_magnitude=2.4*delta
+    elif re.search('2.4',connector_type,re.IGNORECASE):
+        uncertainty_magnitude=2.92*delta
+    else:
+        uncertainty_magnitude=delta
+    if re.search('mag',format,re.IGNORECASE):
+        # if the format is mag then change the uncertainty back to mag
+        uncertainty_magnitude=db_uncertainty_to_magnitude_array(magnitude,uncertainty_magnitude)
+    return [uncertainty_magnitude,delta_arg]
+
+def waveguide_s21_S_NIST_array(magnitude_S21=1,format='DB'):
+    """Calculates SNIST for S21 in Waveguides for an array of magnitude_S21"""
+    magnitude=np.asarray(magnitude_S21,dtype=np.float64)
+    if re.search('mag',format,re.IGNORECASE):
+        # if the format is mag then change the number to db
+        magnitude_S21=magnitude_to_db_array(magnitude)
+    else:
+        magnitude_S21=magnitude
+    uncertainty_magnitude=np.select([(magnitude_S21>=0)&(magnitude_S21<25),(magnitude_S21>=25)&(magnitude_S21<=40)],
+                                    [.01,.02],.02+.00015*(magnitude_S21-40)**2)
+    if re.search('mag',format,re.IGNORECASE):
+        # if the format is mag then change the uncertainty back to mag
+        uncertainty_magnitude=db_uncertainty_to_magnitude_array(magnitude,uncertainty_magnitude)
+    return [uncertainty_magnitude,np.full(magnitude.shape,.15)]
+
+def waveguide_s21_type_b_array(waveguide_type='WR90',magnitude_S21=1,format='DB'):
+    """Calculates type B uncertainty for S21 in Waveguides for an array of magnitude_S21"""
+    magnitude_S21=np.asarray(magnitude_S21,dtype=np.float64)
+    [uncertainty_magnitude,uncertainty_phase]=waveguide_s21_type_b(waveguide_type=waveguide_type,format='DB')
+    uncertainty_magnitude=np.full(magnitude_S21.shape,uncertainty_magnitude)
+    if re.search('mag',format,re.IGNORECASE):
+        # waveguide_s21_type_b scales the uncertainty by the magnitude in dB
+        uncertainty_magnitude=db_uncertainty_to_magnitude_array(magnitude_to_db_array(magnitude_S21),
+                                                                uncertainty_magnitude)
+    return [uncertainty_magnitude,np.full(magnitude_S21.shape,uncertainty_phase)]
+
+def coax_power_S_NIST_array(connector_type='N',frequency=1.):
+    """Calculates SNIST for coax power measurements for an array of frequencies"""
+    frequency=np.asarray(frequency,dtype=np.float64)
+    if re.search('7',connector_type,re.IGNORECASE):
+        uncertainty_eff=.09+.01*frequency
+    elif re.search('N',connector_type,re.IGNORECASE):
+        uncertainty_eff=10**(-1.4+.04*frequency)
+    elif re.search('3.5',connector_type,re.IGNORECASE):
+        uncertainty_eff=np.where(frequency<.05,10**(-1.4+.04*frequency),.25)
+    else:
+        uncertainty_eff=np.full(frequency.shape,.25)
+    return [uncertainty_eff]
+
+def coax_power_type_b_array(connector_type='N',frequency=1.):
+    """Calculates type b for coax power measurements for an array of frequencies"""
+    frequency=np.asarray(frequency,dtype=np.float64)
+    low_frequency_eff=np.sqrt((.365+.105*np.sqrt(frequency)/math.sqrt(3))**2+.2**2/3)
+    if re.search('7',connector_type,re.IGNORECASE):
+        uncertainty_eff=low_frequency_eff
+    elif re.search('N',connector_type,re.IGNORECASE):
+        uncertainty_eff=np.where(frequency<.05,low_frequency_eff,
+                                 np.sqrt((.09+.00267*frequency+.000223*frequency**2)**2+.2**2/3))
+    elif re.search('3.5',connector_type,re.IGNORECASE):
+        uncertainty_eff=np.where(frequency<.05,.0103*frequency+.582,.7)
+    else:
+        uncertainty_eff=np.full(frequency.shape,.7)
+    return [uncertainty_eff]
+
+def waveguide_power_S_NIST_array(waveguide_type='WR90',frequency=1.):
+    """Calculates SNIST for waveguide systems as an array the shape of frequency"""
+    return [np.full(np.shape(frequency),value) for value in waveguide_power_S_NIST(waveguide_type)]
+
+def waveguide_power_type_b_array(waveguide_type='WR90',frequency=1.):
+    """Calculates type b for waveguide systems as an array the shape of frequency"""
+    return [np.full(np.shape(frequency),value) for value in waveguide_power_type_b(waveguide_type)]
+
+def get_uncertainty_model(wr_connector_type='Type-N', parameter='S11'):
+    """Matches wr_connector_type and parameter the way S_NIST and type_b do and returns the name of the
+    uncertainty model ('coax_s11','coax_s12','coax_power','waveguide_s11','waveguide_s21' or 'waveguide_power'),
+    or None if there is no model"""
+    model=None
+    if re.search('14|7|N|3|2', wr_connector_type, re.IGNORECASE):
+        if re.search('11|22',parameter,re.IGNORECASE):
+            model='coax_s11'
+        elif re.search('12|21',parameter,re.IGNORECASE):
+            model='coax_s12'
+        elif re.search('p|eff',parameter,re.IGNORECASE):
+            model='coax_power'
+    elif re.search('w', wr_connector_type, re.IGNORECASE):
+        if re.search('11|22',parameter,re.IGNORECASE):
+            model='waveguide_s11'
+        elif re.search('21|12',parameter,re.IGNORECASE):
+            model='waveguide_s21'
+        elif re.search('p|eff',parameter,re.IGNORECASE):
+            model='waveguide_power'
+    return model
+
+def evaluate_uncertainty_model(model, uncertainty_type='S_NIST', wr_connector_type='Type-N', frequency=1,
+                               magnitude=1.0, format='mag'):
+    """Evaluates the array function of an uncertainty model from get_uncertainty_model, uncertainty_type is
+    'S_NIST' or 'type_b'. The arguments are passed as in S_NIST and type_b, returns a list of arrays with the
+    broadcast shape of frequency and magnitude"""
+    shape=np.broadcast(np.asarray(frequency),np.asarray(magnitude)).shape
+    out=[0]
+    if model in ['coax_s11']:
+        if uncertainty_type in ['S_NIST']:
+            out=coax_s11_S_NIST_array(connector_type=wr_connector_type, frequency=frequency)
+        else:
+            out=coax_s11_type_b_array(connector_type=wr_connector_type, frequency=frequency,
+                                      magnitude_S11=magnitude)
+    elif model in ['coax_s12']:
+        out=globals()[model+"_"+uncertainty_type+"_array"](connector_type=wr_connector_type, magnitude_S21=magnitude,
+                                                           frequency=frequency, format=format)
+    elif model in ['coax_power']:
+        out=globals()[model+"_"+uncertainty_type+"_array"](connector_type=wr_connector_type, frequency=frequency)
+    elif model in ['waveguide_s11','waveguide_power']:
+        out=globals()[model+"_"+uncertainty_type+"_array"](wr_connector_type)
+    elif model in ['waveguide_s21']:
+        out=globals()[model+"_"+uncertainty_type+"_array"](magnitude_S21=magnitude,format=format)
+    return [np.broadcast_to(np.asarray(value,dtype=np.float64),shape).copy() for value in out]
+
+def S_NIST_array(wr_connector_type='Type-N', frequency=1, parameter='S11', magnitude=1.0, phase=0, format='mag'):
+    """S_NIST_array calculates the Standard NIST uncertainty as S_NIST does for arrays of frequency and magnitude,
+    the connector type and parameter are only matched once. Returns a list of arrays with the broadcast shape of
+    frequency and magnitude"""
+    return evaluate_uncertainty_model(get_uncertainty_model(wr_connector_type,parameter),'S_NIST',
+                                      wr_connector_type,frequency,magnitude,format)
+
+def type_b_array(wr_connector_type='Type-N', frequency=1, parameter='S11', magnitude=1.0, phase=0, format='mag'):
+    """type_b_array calculates the Standard type_b uncertainty as type_b does for arrays of frequency and magnitude,
+    the connector type and parameter are only matched once. Returns a list of arrays with the broadcast shape of
+    frequency and magnitude"""
+    return evaluate_uncertainty_model(get_uncertainty_model(wr_connector_type,parameter),'type_b',
+                                      wr_connector_type,frequency,magnitude,format)
+
+def get_compiled_uncertainty_model(wr_connector_type='Type-N', parameter='S11', uncertainty_type='S_NIST',
+                                   format='mag'):
+    """Returns the CompiledUncertaintyModel for wr_connector_type, parameter, uncertainty_type ('S_NIST' or 'type_b')
+    and format, compiling it on first use and storing it in COMPILED_UNCERTAINTY_MODELS"""
+    key=(wr_connector_type,get_uncertainty_model(wr_connector_type,parameter),uncertainty_type,format.lower())
+    if key not in COMPILED_UNCERTAINTY_MODELS:
+        COMPILED_UNCERTAINTY_MODELS[key]=CompiledUncertaintyModel(wr_connector_type=wr_connector_type,
+                                                                  parameter=parameter,
+                                                                  uncertainty_type=uncertainty_type,
+                                                                  format=format)
+    return COMPILED_UNCERTAINTY_MODELS[key]
+
+def compile_uncertainty_models(connector_types=CONNECTOR_TYPES,parameters=['S11','S21','Efficiency'],
+                               uncertainty_types=['S_NIST','type_b'],format='mag'):
+    """Compiles the uncertainty models for every combination of connector_types, parameters and
+    uncertainty_types into COMPILED_UNCERTAINTY_MODELS, returns COMPILED_UNCERTAINTY_MODELS"""
+    for connector_type in connector_types:
+        for parameter in parameters:
+            for uncertainty_type in uncertainty_types:
+                get_compiled_uncertainty_model(connector_type,parameter,uncertainty_type,format)
+    return COMPILED_UNCERTAINTY_MODELS
+
+def save_compiled_uncertainty_models(file_path):
+    """Saves COMPILED_UNCERTAINTY_MODELS to file_path as a pickle so that other processes can load them with
+    load_compiled_uncertainty_models instead of compiling them"""
+    with open(file_path,'wb') as out_file:
+        pickle.dump(COMPILED_UNCERTAINTY_MODELS,out_file,protocol=pickle.HIGHEST_PROTOCOL)
+
+def load_compiled_uncertainty_models(file_path):
+    """Loads compiled uncertainty models saved by save_compiled_uncertainty_models into
+    COMPILED_UNCERTAINTY_MODELS, returns COMPILED_UNCERTAINTY_MODELS"""
+    with open(file_path,'rb') as in_file:
+        COMPILED_UNCERTAINTY_MODELS.update(pickle.load(in_file))
+    return COMPILED_UNCERTAINTY_MODELS
+
+
 #-----------------------------------------------------------------------------
 # Module Classes
+class CompiledUncertaintyModel(object):
+    """CompiledUncertaintyModel holds an uncertainty model (see get_uncertainty_model) for a single connector type,
+    uncertainty type (S_NIST or type_b) and format. Terms that only depend on frequency are compiled into
+    piecewise cubic coefficient arrays on frequency_nodes (UNCERTAINTY_TABLE_FREQUENCIES and the band edges
+    UNCERTAINTY_BAND_EDGES by default), evaluate finds the interval with np.searchsorted and evaluates the cubic.
+    The tables are exact at the nodes and interpolate between them with the slopes of the model. Intervals where the
+    cubic is not within rtol of the model (near a pole or a change of sign) are marked in exact_intervals, and
+    they, terms that depend on magnitude and frequencies outside of the nodes are evaluated with the array
+    functions. The class only holds numpy arrays and strings so it pickles, see save_compiled_uncertainty_models"""
+    def __init__(self,**options):
+        """Initializes the CompiledUncertaintyModel, options are wr_connector_type, parameter,
+        uncertainty_type ('S_NIST' or 'type_b'), format ('mag' or 'DB'), frequency_nodes and rtol, the largest
+        relative error of the cubic in an interval before the interval is evaluated exactly"""
+        defaults={"wr_connector_type":'Type-N',"parameter":'S11',"uncertainty_type":'S_NIST',"format":'mag',
+                  "frequency_nodes":None,"rtol":1e-9}
+        self.options={}
+        for key,value in defaults.items():
+            self.options[key]=value
+        for key,value in options.items():
+            self.options[key]=value
+        self.wr_connector_type=self.options["wr_connector_type"]
+        self.uncertainty_type=self.options["uncertainty_type"]
+        self.format=self.options["format"]
+        self.model=get_uncertainty_model(self.wr_connector_type,self.options["parameter"])
+        # each term is compiled if it only depends on frequency, magnitude_scaled terms are
+        # abs(magnitude) times a frequency term and the rest are evaluated directly
+        if self.model in ['coax_s11','coax_power','waveguide_s11','waveguide_power'] and \
+                not (self.model in ['coax_s11'] and self.uncertainty_type in ['type_b']):
+            self.term_types=["frequency" for term in self.evaluate_model(1.)]
+        elif self.model in ['coax_s12'] and self.uncertainty_type in ['type_b']:
+            self.term_types=["frequency","frequency"]
+            if re.search('mag',self.format,re.IGNORECASE):
+                self.term_types[0]="magnitude_scaled"
+        else:
+            self.term_types=[]
+        self.frequency_nodes=None
+        self.coefficients=None
+        self.exact_intervals=None
+        if self.term_types:
+            if self.options["frequency_nodes"] is None:
+                frequency_nodes=np.union1d(UNCERTAINTY_TABLE_FREQUENCIES,UNCERTAINTY_BAND_EDGES)
+            else:
+                frequency_nodes=np.unique(np.asarray(self.options["frequency_nodes"],dtype=np.float64))
+            self.compile(frequency_nodes)
+
+    def evaluate_model(self,frequency,magnitude=1.0):
+        """Evaluates the uncertainty model directly with the array functions"""
+        return evaluate_uncertainty_model(self.model,self.uncertainty_type,self.wr_connector_type,
+                                          frequency,magnitude,self.format)
+
+    def compile(self,frequency_nodes):
+        """Compiles the frequency terms into cubic coefficients for each interval of frequency_nodes and the exact
+        values at the nodes. Each interval is sampled just inside of its ends so jumps at band edges are kept,
+        and the slopes are one sided second order differences"""
+        self.frequency_nodes=frequency_nodes
+        width=np.diff(frequency_nodes)
+        left=frequency_nodes[:-1]+1e-10*width
+        right=frequency_nodes[1:]-1e-10*width
+        step=1e-4*width
+        sample_frequencies=np.concatenate([frequency_nodes,left,left+step,left+2*step,
+                                           right-2*step,right-step,right])
+        sample_values=np.array(self.evaluate_model(sample_frequencies)[:len(self.term_types)])
+        self.node_values=sample_values[:,:len(frequency_nodes)]
+        [left_value,left_step,left_2_step,right_2_step,right_step,right_value]=np.split(
+            sample_values[:,len(frequency_nodes):],6,axis=1)
+        left_slope=(-3*left_value+4*left_step-left_2_step)/(2*step)
+        right_slope=(3*right_value-4*right_step+right_2_step)/(2*step)
+        self.coefficients=np.stack([left_value,
+                                    width*left_slope,
+                                    3*(right_value-left_value)-width*(2*left_slope+right_slope),
+                                    2*(left_value-right_value)+width*(left_slope+right_slope)])
+        # check the cubic against the model inside of each interval, intervals that miss by more than rtol,
+        # change sign or are not finite (for instance around the pole of the 1/(400-.75*f*exp(.04*f)) model)
+        # are evaluated exactly
+        check_positions=np.array([.1,.25,.5,.75,.9])
+        check_frequencies=frequency_nodes[:-1]+np.outer(check_positions,width)
+        check_values=np.array(self.evaluate_model(check_frequencies.ravel())[:len(self.term_types)]).reshape(
+            len(self.term_types),len(check_positions),len(width))
+        [constant,linear,quadratic,cubic]=[coefficient[:,np.newaxis,:] for coefficient in self.coefficients]
+        position=check_positions[:,np.newaxis]
+        cubic_values=constant+position*(linear+position*(quadratic+position*cubic))
+        with np.errstate(invalid='ignore'):
+            inaccurate=~(np.abs(cubic_values-check_values)<=self.options["rtol"]*np.abs(check_values))
+            changes_sign=(left_value*right_value<=0)&(left_value!=right_value)
+        self.exact_intervals=np.any(inaccurate,axis=(0,1))|np.any(changes_sign,axis=0)|\
+                             ~np.all(np.isfinite(self.coefficients),axis=(0,1))
+
+    def evaluate(self,frequency,magnitude=1.0):
+        """Returns the uncertainty terms for arrays of frequency and magnitude as a list of arrays,
+        the same as S_NIST_array or type_b_array"""
+        if self.coefficients is None:
+            return self.evaluate_model(frequency,magnitude)
+        magnitude=np.asarray(magnitude,dtype=np.float64)
+        frequency=np.asarray(frequency,dtype=np.float64)
+        shape=np.broadcast(frequency,magnitude).shape
+        frequency=np.broadcast_to(frequency,shape)
+        interval=np.clip(np.searchsorted(self.frequency_nodes,frequency,side='right')-1,0,
+                         len(self.frequency_nodes)-2)
+        position=(frequency-self.frequency_nodes[interval])/(self.frequency_nodes[interval+1]-
+                                                             self.frequency_nodes[interval])
+        [constant,linear,quadratic,cubic]=self.coefficients[:,:,interval]
+        values=constant+position*(linear+position*(quadratic+position*cubic))
+        on_node=frequency==self.frequency_nodes[interval]
+        if np.any(on_node):
+            values[:,on_node]=self.node_values[:,interval[on_node]]
+        exact=(frequency<self.frequency_nodes[0])|(frequency>self.frequency_nodes[-1])
+        if self.exact_intervals is not None:
+            exact|=self.exact_intervals[interval]&~on_node
+        if np.any(exact):
+            values[:,exact]=np.array(self.evaluate_model(frequency[exact],1.0)[:len(self.term_types)])
+        out=[]
+        for term_index,term_type in enumerate(self.term_types):
+            if term_type in ['magnitude_scaled']:
+                out.append(np.abs(np.broadcast_to(magnitude,shape))*values[term_index])
+            else:
+                out.append(values[term_index])
+        return out
 
 #-----------------------------------------------------------------------------
 # Module Scripts
@@ -485,7 +930,45 @@ def test_uncertainty():
     s11_mag_thru=[0 for i in range(1000)]
     s12_mag_thru=[1 for i in range(1000)]
 
+def test_uncertainty_array(connector_types=CONNECTOR_TYPES,parameters=['magS11','argS11','magS21','argS21','Eff']):
+    """Tests that S_NIST_array and type_b_array agree with S_NIST and type_b"""
+    frequency=np.linspace(.1,18,1000)
+    magnitude=np.linspace(.001,1,1000)
+    for connector_type in connector_types:
+        for parameter in parameters:
+            for [function,array_function] in [[S_NIST,S_NIST_array],[type_b,type_b_array]]:
+                array_out=array_function(connector_type,frequency,parameter,magnitude,format='mag')
+                scalar_out=np.array([function(connector_type,frequency[index],parameter,magnitude[index],format='mag')
+                                     for index in range(len(frequency))]).T
+                print(("{0} for {1} {2} agrees: {3}".format(array_function.__name__,connector_type,parameter,
+                                                            np.allclose(scalar_out,array_out,rtol=1e-12))))
+
+def test_compiled_uncertainty_model(connector_types=CONNECTOR_TYPES,parameters=['magS11','magS21','Eff'],
+                                    file_path="Compiled_Uncertainty_Models.pkl"):
+    """Tests that the compiled uncertainty models agree with S_NIST_array and type_b_array and that they
+    can be saved and loaded, frequency covers all of the nodes and the pole of the coax_s11 S_NIST model at ~56 GHz"""
+    frequency=np.concatenate([np.geomspace(UNCERTAINTY_TABLE_FREQUENCIES[0],UNCERTAINTY_TABLE_FREQUENCIES[-1],9001),
+                              np.linspace(55.,57.5,997),UNCERTAINTY_BAND_EDGES])
+    magnitude=np.linspace(.001,1,len(frequency))
+    compile_uncertainty_models(connector_types,parameters)
+    for connector_type in connector_types:
+        for parameter in parameters:
+            for [uncertainty_type,array_function] in [['S_NIST',S_NIST_array],['type_b',type_b_array]]:
+                compiled_model=get_compiled_uncertainty_model(connector_type,parameter,uncertainty_type)
+                array_out=np.array(array_function(connector_type,frequency,parameter,magnitude))
+                compiled_out=np.array(compiled_model.evaluate(frequency,magnitude))
+                print(("The compiled {0} {1} {2} model with terms {3} agrees: {4}".format(
+                    connector_type,parameter,uncertainty_type,compiled_model.term_types,
+                    np.allclose(compiled_out,array_out,rtol=1e-8,atol=0))))
+    save_compiled_uncertainty_models(file_path)
+    number_models=len(COMPILED_UNCERTAINTY_MODELS)
+    COMPILED_UNCERTAINTY_MODELS.clear()
+    load_compiled_uncertainty_models(file_path)
+    print(("Saved and loaded {0} of {1} compiled models".format(len(COMPILED_UNCERTAINTY_MODELS),number_models)))
+    os.remove(file_path)
+
 #-----------------------------------------------------------------------------
 # Module Runner
 if __name__ == '__main__':
-    pass
\ No newline at end of file
+    test_uncertainty_array()
+    test_compiled_uncertainty_model()
\ No newline at end of file
@@ -705,7 +705,8 @@ class CheckStandardReport(HTMLReport):
                            mime_types=["text/plain",
                                        'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'],
                            **options):
-        """Adds a table of downloadable files"""
+        """Adds a table of downloadable files, the formats of each file are made concurrently by a pool of
+        workers (workers=1 makes them serially)"""
         defaults = {"clear_before": False,
                     "download_files": [self.raw_measurement, self.calrep_measurement, self.results_file,
                                        self.mean_frame, self.device_history],
@@ -716,7 +717,8 @@ class CheckStandardReport(HTMLReport):
                                                   "Historical_Database.txt",
                                                   "Mean_Database.txt",
                                                   "Device_History.txt"],
-                    "style": "display:none;border:1;"}
+                    "style": "display:none;border:1;",
+                    "workers": None}
 
         add_options = {}
         for key, value in defaults.items():
@@ -748,7 +750,8 @@ class CheckStandardReport(HTMLReport):
                                                      base_name=add_options["download_files_base_names"][index],
                                                      nodes=download_formats,
                                                      extensions=download_extensions,
-                                                     mime_types=mime_types)
+                                                     mime_types=mime_types,
+                                                     workers=add_options["workers"])
 
                 download_table = download_table + "<tr><td>{0}</td><td>{1}</td></tr>".format(ascii_download, download_links)
             except:
@@ -29,7 +29,6 @@ Requirements
 + [math](https://docs.python.org/2/library/math.html)
 + [cmath](https://docs.python.org/2/library/cmath.html)
 + [numpy](https://docs.scipy.org/doc/)
-+ [scipy](https://docs.scipy.org/doc/)
 + [pandas](http://pandas.pydata.org/)
 + [matplotlib](http://matplotlib.org/)
 + [pyMez](https://github.com/aricsanders/pyMez)
@@ -52,6 +51,8 @@ import datetime
 import sys
 import cmath
 import math
+import time
+import concurrent.futures
 
 #-----------------------------------------------------------------------------
 # Third Party Imports
@@ -67,14 +68,6 @@ try:
 except:
     print("Pandas was not imported")
     pass
-try:
-    from scipy.stats.mstats import gmean
-except:
-    print("The function gmean from the package scipy.stats.mstats did not import correctly ")
-try:
-    from statsmodels.robust.scale import mad
-except:
-    print("The function mad from the package statsmodels.robust.scale did not import correctly ")
 try:
     #Todo: this could lead to a cyclic dependency, it really should import only the models it analyzes
     #Todo: If analysis is to be in the top import, none of the models should rely on it
@@ -144,10 +137,12 @@ def add_white_noise_s2p(s2p_model,noise_level=.0005):
 def frequency_model_collapse_multiple_measurements(model, **options):
     """Returns a model with a single set of frequencies. Default is to average values together
     but geometric mean, std, variance, rss, mad and median are options.
-    Geometric means of odd number of negative values fails"""
+    Geometric means of odd number of negative values fails. To keep other columns separate use group_by, for
+    example group_by=["Direction","Connect"], non-numeric columns that are not grouped keep their first value.
+    The groups are reduced in a single vectorized pass by group_by_aggregate"""
     if type(model) in [pandas.DataFrame]:
         model_1 = DataFrame_to_AsciiDataTable(model)
-    defaults = {"method": "mean"}
+    defaults = {"method": "mean", "group_by": None}
     # load other options from model
     for option, value in model.options.items():
         if not re.search('begin_line|end_line', option):
@@ -164,29 +159,15 @@ def frequency_model_collapse_multiple_measurements(model, **options):
         collapse_options[key] = value
     for key, value in options.items():
         collapse_options[key] = value
-    unique_frequency_list = sorted(list(set(model["Frequency"])))
-    frequency_selector = model.column_names.index("Frequency")
-    out_data = []
-    for index, frequency in enumerate(unique_frequency_list):
-        data_row = [x for x in model.data[:] if x[frequency_selector] == frequency]
-        if re.search('mean|av', collapse_options["method"], re.IGNORECASE):
-            new_row = np.mean(np.array(data_row), axis=0).tolist()
-        elif re.search('median', collapse_options["method"], re.IGNORECASE):
-            new_row = np.median(np.array(data_row), axis=0).tolist()
-        elif re.search('geometric', collapse_options["method"], re.IGNORECASE):
-            new_row = gmean(np.array(data_row), axis=0).tolist()
-        elif re.search('st', collapse_options["method"], re.IGNORECASE):
-            new_row = np.std(np.array(data_row), axis=0).tolist()
-        elif re.search('var', collapse_options["method"], re.IGNORECASE):
-            new_row = np.var(np.array(data_row), axis=0, dtype=np.float64).tolist()
-        elif re.search('rms', collapse_options["method"], re.IGNORECASE):
-            new_row = np.sqrt(np.mean(np.square(np.array(data_row)), axis=0, dtype=np.float64)).tolist()
-        elif re.search('rss', collapse_options["method"], re.IGNORECASE):
-            new_row = np.sqrt(np.sum(np.square(np.array(data_row)), axis=0, dtype=np.float64)).tolist()
-        elif re.search('mad', collapse_options["method"], re.IGNORECASE):
-            new_row = mad(np.array(data_row), axis=0).tolist()
-        new_row[frequency_selector]=frequency
-        out_data.append(new_row)
+    group_column_names = ["Frequency"]
+    if collapse_options["group_by"]:
+        if isinstance(collapse_options["group_by"], StringType):
+            collapse_options["group_by"] = [collapse_options["group_by"]]
+        for column_name in collapse_options["group_by"]:
+            if column_name not in group_column_names:
+                group_column_names.append(column_name)
+    group_selectors = [model.column_names.index(column_name) for column_name in group_column_names]
+    out_data = group_by_aggregate(model.data, group_selectors, method=collapse_options["method"])
 
     collapse_options["data"] = out_data
 
@@ -267,10 +248,120 @@ def frequency_model_difference(model_1, model_2, **options):
     return result
 
 
+def reference_curve_partial_aggregate(file_paths, format="RI", nominal_data=None):
+    """Parses the touchstone files in file_paths and returns a partial aggregate of their data as a dictionary
+    {"frequencies","count","mean","sum_squared_deviations","sum_squares","minimum","maximum","number_files"},
+    the arrays have a row for each unique frequency. If nominal_data (an array of rows [frequency,values..]) is given
+    the aggregate is of nominal_data minus the file data at the frequencies they have in common, as in
+    frequency_model_difference. Used by build_reference_curve_aggregate in worker processes"""
+    frequency_list = []
+    value_list = []
+    for file_path in file_paths:
+        snp_file = SNP(file_path)
+        snp_file.change_data_format(format)
+        data = np.array(snp_file.data, dtype=np.float64)
+        if nominal_data is not None:
+            unique_frequencies, first_rows = np.unique(data[:, 0], return_index=True)
+            positions = np.minimum(np.searchsorted(unique_frequencies, nominal_data[:, 0]),
+                                   len(unique_frequencies) - 1)
+            in_file = unique_frequencies[positions] == nominal_data[:, 0]
+            data = np.concatenate([nominal_data[in_file, :1],
+                                   nominal_data[in_file, 1:] - data[first_rows[positions[in_file]], 1:]], axis=1)
+        frequency_list.append(data[:, 0])
+        value_list.append(data[:, 1:])
+    frequencies = np.concatenate(frequency_list)
+    values = np.concatenate(value_list)
+    unique_frequencies, group_indices = np.unique(frequencies, return_inverse=True)
+    group_indices = group_indices.reshape(-1)
+    order = np.argsort(group_indices, kind='stable')
+    count = np.bincount(group_indices, minlength=len(unique_frequencies))
+    starts = np.concatenate(([0], np.cumsum(count)[:-1]))
+    sorted_values = values[order]
+    mean = np.add.reduceat(sorted_values, starts, axis=0) / count[:, np.newaxis]
+    deviations = values - mean[group_indices]
+    return {"frequencies": unique_frequencies, "count": count.astype(np.float64), "mean": mean,
+            "sum_squared_deviations": np.add.reduceat((deviations ** 2)[order], starts, axis=0),
+            "sum_squares": np.add.reduceat(sorted_values ** 2, starts, axis=0),
+            "minimum": np.minimum.reduceat(sorted_values, starts, axis=0),
+            "maximum": np.maximum.reduceat(sorted_values, starts, axis=0),
+            "number_files": len(file_paths)}
+
+def merge_reference_curve_aggregates(aggregate_1, aggregate_2):
+    """Merges two partial aggregates from reference_curve_partial_aggregate aligning them by frequency, the mean and
+    sum of squared deviations are combined with the parallel form of Welford's method"""
+    if aggregate_1 is None:
+        return aggregate_2
+    frequencies = np.union1d(aggregate_1["frequencies"], aggregate_2["frequencies"])
+    number_columns = aggregate_1["mean"].shape[1]
+    aligned = []
+    for aggregate in [aggregate_1, aggregate_2]:
+        rows = np.searchsorted(frequencies, aggregate["frequencies"])
+        new_aggregate = {"count": np.zeros(len(frequencies))}
+        new_aggregate["count"][rows] = aggregate["count"]
+        for key, fill_value in [("mean", 0.), ("sum_squared_deviations", 0.), ("sum_squares", 0.),
+                                ("minimum", np.inf), ("maximum", -np.inf)]:
+            new_aggregate[key] = np.full((len(frequencies), number_columns), fill_value)
+            new_aggregate[key][rows] = aggregate[key]
+        aligned.append(new_aggregate)
+    [aligned_1, aligned_2] = aligned
+    count = aligned_1["count"] + aligned_2["count"]
+    weight_1 = (aligned_1["count"] / count)[:, np.newaxis]
+    weight_2 = (aligned_2["count"] / count)[:, np.newaxis]
+    delta = aligned_2["mean"] - aligned_1["mean"]
+    return {"frequencies": frequencies, "count": count,
+            "mean": aligned_1["mean"] + delta * weight_2,
+            "sum_squared_deviations": aligned_1["sum_squared_deviations"] + aligned_2["sum_squared_deviations"] +
+                                      delta ** 2 * weight_1 * aligned_2["count"][:, np.newaxis],
+            "sum_squares": aligned_1["sum_squares"] + aligned_2["sum_squares"],
+            "minimum": np.minimum(aligned_1["minimum"], aligned_2["minimum"]),
+            "maximum": np.maximum(aligned_1["maximum"], aligned_2["maximum"]),
+            "number_files": aggregate_1["number_files"] + aggregate_2["number_files"]}
+
+def build_reference_curve_aggregate(file_paths, format="RI", nominal_data=None, **options):
+    """Parses file_paths in a process pool, each task builds a partial aggregate of chunk_size files with
+    reference_curve_partial_aggregate and the partial aggregates are merged as they finish. If verbose is True the
+    progress and throughput of the parse and reduce stages are printed. Returns the merged aggregate"""
+    defaults = {"workers": None, "chunk_size": None, "verbose": False}
+    aggregate_options = {}
+    for key, value in defaults.items():
+        aggregate_options[key] = value
+    for key, value in options.items():
+        aggregate_options[key] = value
+    workers = aggregate_options["workers"]
+    if workers is None:
+        workers = os.cpu_count() or 1
+    chunk_size = aggregate_options["chunk_size"]
+    if chunk_size is None:
+        chunk_size = max(1, int(math.ceil(len(file_paths) / float(4 * workers))))
+    chunks = [file_paths[index:index + chunk_size] for index in range(0, len(file_paths), chunk_size)]
+    aggregate = None
+    number_parsed = 0
+    reduce_time = 0.
+    start_time = time.time()
+    with concurrent.futures.ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = [pool.submit(reference_curve_partial_aggregate, chunk, format, nominal_data) for chunk in chunks]
+        for future in concurrent.futures.as_completed(futures):
+            partial_aggregate = future.result()
+            number_parsed += partial_aggregate["number_files"]
+            if aggregate_options["verbose"]:
+                elapsed_time = time.time() - start_time
+                print(("Parsed {0}/{1} files in {2:.2f} s ({3:.1f} files/s)".format(
+                    number_parsed, len(file_paths), elapsed_time, number_parsed / max(elapsed_time, 1e-9))))
+            reduce_start = time.time()
+            aggregate = merge_reference_curve_aggregates(aggregate, partial_aggregate)
+            reduce_time += time.time() - reduce_start
+    if aggregate_options["verbose"]:
+        print(("Reduced {0} partial aggregates in {1:.3f} s, total time {2:.2f} s".format(
+            len(chunks), reduce_time, time.time() - start_time)))
+    return aggregate
+
 def create_monte_carlo_reference_curve(monte_carlo_directory, **options):
     """Creates a standard curve from a montecarlo directory (from MUF). The standard curve
-    has a mean or median and a standard deviation for the uncertainty"""
-    defaults = {"method": "mean", "format": "RI", "filter": "s\d+p"}
+    has a mean or median and a standard deviation for the uncertainty. If workers is not 1 and the method is mean the
+    files are parsed and reduced in parallel by build_reference_curve_aggregate (workers=None uses all processors),
+    verbose=True prints the progress"""
+    defaults = {"method": "mean", "format": "RI", "filter": "s\d+p", "workers": 1, "chunk_size": None,
+                "verbose": False}
     reference_options = {}
     for key, value in defaults.items():
         reference_options[key] = value
@@ -286,15 +377,34 @@ def create_monte_carlo_reference_curve(monte_carlo_directory, **options):
     initial_file = SNP(os.path.join(monte_carlo_directory, file_names[0]))
     initial_file.change_data_format(reference_options["format"])
     combined_table = Snp_to_AsciiDataTable(initial_file)
-
-    for file_name in file_names[1:]:
-        snp_file = SNP(os.path.join(monte_carlo_directory, file_name))
-        snp_file.change_data_format(reference_options["format"])
-        table = Snp_to_AsciiDataTable(snp_file)
-        combined_table + table
-    mean_table = frequency_model_collapse_multiple_measurements(combined_table, method=reference_options["method"])
-    standard_deviation = frequency_model_collapse_multiple_measurements(combined_table,
-                                                                        method='std')
+    if reference_options["workers"] != 1 and get_aggregate_method(reference_options["method"]) in ['mean']:
+        aggregate = build_reference_curve_aggregate([os.path.join(monte_carlo_directory, file_name)
+                                                     for file_name in file_names],
+                                                    reference_options["format"],
+                                                    workers=reference_options["workers"],
+                                                    chunk_size=reference_options["chunk_size"],
+                                                    verbose=reference_options["verbose"])
+        frequencies = aggregate["frequencies"][:, np.newaxis]
+        # the mean rows have one row per frequency so the collapse only sets the options as in the serial case
+        combined_table.data = np.concatenate([frequencies, aggregate["mean"]], axis=1).tolist()
+        mean_table = frequency_model_collapse_multiple_measurements(combined_table,
+                                                                    method=reference_options["method"])
+        standard_deviation = AsciiDataTable(None, column_names=combined_table.column_names[:],
+                                            column_types=['float' for column in combined_table.column_names],
+                                            data=np.concatenate([frequencies,
+                                                                 np.sqrt(aggregate["sum_squared_deviations"] /
+                                                                         aggregate["count"][:, np.newaxis])],
+                                                                axis=1).tolist())
+    else:
+        for file_name in file_names[1:]:
+            snp_file = SNP(os.path.join(monte_carlo_directory, file_name))
+            snp_file.change_data_format(reference_options["format"])
+            table = Snp_to_AsciiDataTable(snp_file)
+            combined_table + table
+        mean_table = frequency_model_collapse_multiple_measurements(combined_table,
+                                                                    method=reference_options["method"])
+        standard_deviation = frequency_model_collapse_multiple_measurements(combined_table,
+                                                                            method='std')
     new_column_names = ['Frequency'] + ['u' + name for name in standard_deviation.column_names[1:]]
     standard_deviation.column_names = new_column_names
     reference_curve = ascii_data_table_join("Frequency", mean_table, standard_deviation)
@@ -304,8 +414,10 @@ def create_monte_carlo_reference_curve(monte_carlo_directory, **options):
 
 def create_sensitivity_reference_curve(sensitivity_directory,nominal_file_path="../DUT_0.s2p",**options):
     """Creates a standard curve from a sensitivity_directory usually called Covariance(from MUF). The standard curve
-    has a mean or median and a RMS variance from the nominal value for the uncertainty"""
-    defaults = {"format": "RI", "filter": "s\d+p"}
+    has a mean or median and a RMS variance from the nominal value for the uncertainty. If workers is not 1 the
+    files are parsed and reduced in parallel by build_reference_curve_aggregate (workers=None uses all processors),
+    verbose=True prints the progress"""
+    defaults = {"format": "RI", "filter": "s\d+p", "workers": 1, "chunk_size": None, "verbose": False}
     reference_options = {}
     for key, value in defaults.items():
         reference_options[key] = value
@@ -320,21 +432,34 @@ def create_sensitivity_reference_curve(sensitivity_directory,nominal_file_path="
     # print file_names
     nominal_file=SNP(os.path.join(sensitivity_directory, nominal_file_path))
     nominal_file.change_data_format(reference_options["format"])
-    initial_file = SNP(os.path.join(sensitivity_directory, file_names[0]))
-    initial_file.change_data_format(reference_options["format"])
-    initial_difference=frequency_model_difference(nominal_file,initial_file)
-    #print initial_difference.column_names
-    combined_table = initial_difference
-    for file_name in file_names[1:]:
-        snp_file = SNP(os.path.join(sensitivity_directory, file_name))
-        snp_file.change_data_format(reference_options["format"])
-        difference=frequency_model_difference(nominal_file,snp_file)
-        #print difference.column_names
-#         table = Snp_to_AsciiDataTable(difference)
-        combined_table + difference
-    #print combined_table.options["column_types"]
-    variance = frequency_model_collapse_multiple_measurements(combined_table,
-                                                                        method='rss')
+    if reference_options["workers"] != 1:
+        aggregate = build_reference_curve_aggregate([os.path.join(sensitivity_directory, file_name)
+                                                     for file_name in file_names],
+                                                    reference_options["format"],
+                                                    nominal_data=np.array(nominal_file.data, dtype=np.float64),
+                                                    workers=reference_options["workers"],
+                                                    chunk_size=reference_options["chunk_size"],
+                                                    verbose=reference_options["verbose"])
+        variance = AsciiDataTable(None, column_names=nominal_file.column_names[:],
+                                  column_types=['float' for column in nominal_file.column_names],
+                                  data=np.concatenate([aggregate["frequencies"][:, np.newaxis],
+                                                       np.sqrt(aggregate["sum_squares"])], axis=1).tolist())
+    else:
+        initial_file = SNP(os.path.join(sensitivity_directory, file_names[0]))
+        initial_file.change_data_format(reference_options["format"])
+        initial_difference=frequency_model_difference(nominal_file,initial_file)
+        #print initial_difference.column_names
+        combined_table = initial_difference
+        for file_name in file_names[1:]:
+            snp_file = SNP(os.path.join(sensitivity_directory, file_name))
+            snp_file.change_data_format(reference_options["format"])
+            difference=frequency_model_difference(nominal_file,snp_file)
+            #print difference.column_names
+    #         table = Snp_to_AsciiDataTable(difference)
+            combined_table + difference
+        #print combined_table.options["column_types"]
+        variance = frequency_model_collapse_multiple_measurements(combined_table,
+                                                                            method='rss')
     new_column_names = ['Frequency'] + ['u' + name for name in variance.column_names[1:]]
     mean_table=Snp_to_AsciiDataTable(nominal_file)
     variance.column_names = new_column_names
@@ -480,7 +605,15 @@ def calrep(raw_model,**options):
     Differs from the HP BASIC program in that it keeps the metadata Needs to be checked, returns 4 error terms for power
     Also does not calculate all the same rows for power, expansion factor is set to 2, requires that the raw model
     has the attribute raw_model.metadata["Connector_Type_Measurement"] defined. If the columns passed in raw_model
-    do not have repeat values or contain text the result will set connect uncertainty to zero"""
+    do not have repeat values or contain text the result will set connect uncertainty to zero. If
+    compiled_uncertainty is True the uncertainties are evaluated with the compiled tables from
+    get_compiled_uncertainty_model instead of type_b_array and S_NIST_array"""
+    defaults={"compiled_uncertainty":False}
+    calrep_options={}
+    for key,value in defaults.items():
+        calrep_options[key]=value
+    for key,value in options.items():
+        calrep_options[key]=value
     try:
         mean_file=frequency_model_collapse_multiple_measurements(raw_model)
     except:
@@ -502,60 +635,61 @@ def calrep(raw_model,**options):
     if "Direction" in standard_deviation_file.column_names and "Connect" in standard_deviation_file.column_names:
         standard_deviation_file.remove_column("Direction")
         standard_deviation_file.remove_column("Connect")
-    new_data=[]
+    new_columns=[]
     new_column_names=[]
     expansion_factor=2
     frequency_index=mean_file.column_names.index("Frequency")
-    for row_index,row in enumerate(mean_file.data[:]):
-        new_data_row=[]
-        for column_index,column_name in enumerate(mean_file.column_names[:]):
-            if re.search("frequency",column_name,re.IGNORECASE):
-                if row_index==0:
-                    new_column_names.append("Frequency")
-                new_data_row.append(row[column_index])
+    frequency=np.array([row[frequency_index] for row in mean_file.data],dtype=np.float64)
+    # each column is calculated in a single pass with the array versions of type_b and S_NIST
+    for column_index,column_name in enumerate(mean_file.column_names[:]):
+        mean_column=[row[column_index] for row in mean_file.data]
+        if re.search("frequency",column_name,re.IGNORECASE):
+            new_column_names.append("Frequency")
+            new_columns.append(mean_column)
+        else:
+            if re.search("mag",column_name,re.IGNORECASE):
+                error_selector=0
+                error_letter="M"
+                error_parameter=column_name.replace("mag","")
+            elif re.search("arg|phase",column_name,re.IGNORECASE):
+                error_selector=1
+                error_letter="A"
+                error_parameter=column_name.replace("arg","")
+            elif re.search("Eff",column_name,re.IGNORECASE):
+                error_selector=0
+                error_letter="E"
+                error_parameter=""
+            else:
+                error_selector=0
+            new_column_names.append(column_name)
+            new_column_names.append("u"+error_letter+"b"+error_parameter)
+            new_column_names.append("u"+error_letter+"a"+error_parameter)
+            new_column_names.append("u"+error_letter+"d"+error_parameter)
+            new_column_names.append("u"+error_letter+"g"+error_parameter)
+            magnitude=np.array(mean_column,dtype=np.float64)
+            if calrep_options["compiled_uncertainty"]:
+                # Type B
+                ub=get_compiled_uncertainty_model(mean_file.metadata["Connector_Type_Measurement"],column_name,
+                                                  "type_b","mag").evaluate(frequency,magnitude)[error_selector]
+                # Type A or SNIST
+                ua=get_compiled_uncertainty_model(mean_file.metadata["Connector_Type_Measurement"],column_name,
+                                                  "S_NIST","mag").evaluate(frequency,magnitude)[error_selector]
             else:
-                if re.search("mag",column_name,re.IGNORECASE):
-                    error_selector=0
-                    error_letter="M"
-                    error_parameter=column_name.replace("mag","")
-                elif re.search("arg|phase",column_name,re.IGNORECASE):
-                    error_selector=1
-                    error_letter="A"
-                    error_parameter=column_name.replace("arg","")
-                elif re.search("Eff",column_name,re.IGNORECASE):
-                    error_selector=0
-                    error_letter="E"
-                    error_parameter=""
-                else:
-                    error_selector=0
-                if row_index==0:
-                    # If this is the first row build the column names list
-                    new_column_names.append(column_name)
-                    new_column_names.append("u"+error_letter+"b"+error_parameter)
-                    new_column_names.append("u"+error_letter+"a"+error_parameter)
-                    new_column_names.append("u"+error_letter+"d"+error_parameter)
-                    new_column_names.append("u"+error_letter+"g"+error_parameter)
-
-                # Mean Value
-                new_data_row.append(row[column_index])
                 # Type B
-                ub=type_b(wr_connector_type=mean_file.metadata["Connector_Type_Measurement"],
-                         frequency=row[frequency_index],parameter=column_name,magnitude=row[column_index],format="mag")
-                #print("{0} is {1}".format("ub",ub))
-                new_data_row.append(ub[error_selector])
+                ub=type_b_array(wr_connector_type=mean_file.metadata["Connector_Type_Measurement"],
+                                frequency=frequency,parameter=column_name,magnitude=magnitude,
+                                format="mag")[error_selector]
                 # Type A or SNIST
-                ua=S_NIST(wr_connector_type=mean_file.metadata["Connector_Type_Measurement"],
-                         frequency=row[frequency_index],parameter=column_name,magnitude=row[column_index],format="mag")
-                new_data_row.append(ua[error_selector])
-
-                # Standard Deviation
-                ud=standard_deviation_file.data[row_index][column_index]
-                new_data_row.append(ud)
-                # Total Uncertainty
-                #print(" ua is {0}, ub is {1} and ud is {2}".format(ua,ub,ud))
-                total_uncertainty=expansion_factor*math.sqrt(ua[error_selector]**2+ub[error_selector]**2+ud**2)
-                new_data_row.append(total_uncertainty)
-        new_data.append(new_data_row)
+                ua=S_NIST_array(wr_connector_type=mean_file.metadata["Connector_Type_Measurement"],
+                                frequency=frequency,parameter=column_name,magnitude=magnitude,
+                                format="mag")[error_selector]
+            # Standard Deviation
+            ud_column=[row[column_index] for row in standard_deviation_file.data]
+            ud=np.array(ud_column,dtype=np.float64)
+            # Total Uncertainty
+            total_uncertainty=expansion_factor*np.sqrt(ua**2+ub**2+ud**2)
+            new_columns+=[mean_column,ub.tolist(),ua.tolist(),ud_column,total_uncertainty.tolist()]
+    new_data=[list(row) for row in zip(*new_columns)]
     sorted_keys=sorted(mean_file.metadata.keys())
     header=["{0} = {1}".format(key,mean_file.metadata[key]) for key in sorted_keys]
     column_types=["float" for column in new_column_names]
@@ -724,55 +858,135 @@ def unwrap_phase(phase_list):
     return phase_list_copy
 
 
+def two_port_complex_to_array(complex_data):
+    """two_port_complex_to_array takes a list of [[frequency,S11,S21,S12,S22],..] and returns a tuple
+    (frequency_list, sparameter_array) where sparameter_array is a complex array of shape (N,2,2) with
+    sparameter_array[i]=[[S11,S12],[S21,S22]]. It is the array version of two_port_complex_to_matrix_form"""
+    frequency_list=[row[0] for row in complex_data]
+    sparameter_array=np.array([row[1:5] for row in complex_data],dtype=np.complex128).reshape((-1,2,2))
+    # rows are S11,S21,S12,S22 so the reshaped matrix is transposed
+    return frequency_list,sparameter_array.transpose((0,2,1))
+
+def S_to_T_array(sparameter_array):
+    """Converts a complex array of S-parameter matrices, shape (N,2,2) [[S11,S12],[S21,S22]], to T matrices
+    in a single vectorized step. The array version of S_to_T"""
+    S11=sparameter_array[...,0,0]
+    S12=sparameter_array[...,0,1]
+    S21=sparameter_array[...,1,0]
+    S22=sparameter_array[...,1,1]
+    t_array=np.empty(sparameter_array.shape,dtype=np.complex128)
+    t_array[...,0,0]=-(S11*S22-S12*S21)/S21
+    t_array[...,0,1]=S11/S21
+    t_array[...,1,0]=-S22/S21
+    t_array[...,1,1]=1/S21
+    return t_array
+
+def T_to_S_array(t_array):
+    """Converts a complex array of T matrices, shape (N,2,2), to S-parameter matrices in a single vectorized step.
+    The array version of T_to_S"""
+    T11=t_array[...,0,0]
+    T12=t_array[...,0,1]
+    T21=t_array[...,1,0]
+    T22=t_array[...,1,1]
+    sparameter_array=np.empty(t_array.shape,dtype=np.complex128)
+    sparameter_array[...,0,0]=T12/T22
+    sparameter_array[...,0,1]=(T11*T22-T12*T21)/T22
+    sparameter_array[...,1,0]=1/T22
+    sparameter_array[...,1,1]=-T21/T22
+    return sparameter_array
+
+def reciprocal_mean_array(S21,S12):
+    """Returns the geometric mean sqrt(S21*S12) of the arrays S21 and S12, choosing the root at each frequency so the
+    phase is continuous. This is the same root selection as the reciprocal option of the correction functions (the
+    other root is taken if the phase jumps by more than 90 and less than 270 degrees from the last value) with the
+    frequency by frequency decision found as a cumulative parity instead of a loop"""
+    geometric_mean=np.sqrt(np.asarray(S21,dtype=np.complex128)*np.asarray(S12,dtype=np.complex128))
+    if geometric_mean.size==0:
+        return geometric_mean
+    phase_new=np.angle(geometric_mean)
+    # the phase of the last value if its root was kept or if it was flipped
+    phase_kept=np.concatenate(([0.],phase_new[:-1]))
+    phase_flipped=np.concatenate(([0.],np.angle(-geometric_mean[:-1])))
+
+    def jumps(phase_last):
+        phase_difference=np.abs(phase_new-phase_last)
+        return (phase_difference>math.pi/2)&(phase_difference<3*math.pi/2)
+
+    flip_if_kept=jumps(phase_kept)
+    flip_if_flipped=jumps(phase_flipped)
+    flip_if_flipped[0]=flip_if_kept[0]
+    # each step either sets the choice (both cases agree), or copies or negates the last choice
+    is_set=flip_if_kept==flip_if_flipped
+    negation_count=np.cumsum(flip_if_kept&~flip_if_flipped)
+    positions=np.arange(len(geometric_mean))
+    last_set=np.maximum.accumulate(np.where(is_set,positions,-1))
+    base_value=np.where(last_set>=0,flip_if_kept[np.maximum(last_set,0)],False)
+    base_count=np.where(last_set>=0,negation_count[np.maximum(last_set,0)],0)
+    flip=base_value^((negation_count-base_count)%2==1)
+    return np.where(flip,-geometric_mean,geometric_mean)
+
+def two_port_array_to_complex_form(frequency_list,sparameter_array,reciprocal=False,transpose=False):
+    """Returns a list in the form [[frequency,S11,S21,S12,S22],..] from a frequency list and a (N,2,2) array.
+    If reciprocal is True S21 and S12 are replaced with their phase continuous geometric mean. If transpose is True
+    the off diagonal terms are written as [frequency,S11,S12,S21,S22], the order of two_port_matrix_to_complex_form"""
+    S11=sparameter_array[:,0,0]
+    S21=sparameter_array[:,1,0]
+    S12=sparameter_array[:,0,1]
+    S22=sparameter_array[:,1,1]
+    if transpose:
+        S21,S12=S12,S21
+    if reciprocal:
+        S21=S12=reciprocal_mean_array(S21,S12)
+    columns=[S11.tolist(),S21.tolist(),S12.tolist(),S22.tolist()]
+    return [[frequency]+list(row) for frequency,row in zip(frequency_list,zip(*columns))]
+
+def correct_sparameters_eight_term_array(sparameter_array,s1_array,s2_array):
+    """Applies the eight term correction to a (N,2,2) complex array of sparameters. s1_array and s2_array are the
+    (N,2,2) arrays of the error boxes for port 1 and port 2. All frequencies are corrected at once,
+    T_corrected=inv(X)*T*inv(Y)"""
+    x_inverse=np.linalg.inv(S_to_T_array(s1_array))
+    y_inverse=np.linalg.inv(S_to_T_array(s2_array))
+    return T_to_S_array(np.matmul(np.matmul(x_inverse,S_to_T_array(sparameter_array)),y_inverse))
+
+def uncorrect_sparameters_eight_term_array(sparameter_array,s1_array,s2_array):
+    """Removes the eight term correction from a (N,2,2) complex array of sparameters, the inverse of
+    correct_sparameters_eight_term_array"""
+    x_array=S_to_T_array(s1_array)
+    y_array=S_to_T_array(s2_array)
+    return T_to_S_array(np.matmul(np.matmul(x_array,S_to_T_array(sparameter_array)),y_array))
+
+def correct_sparameters_sixteen_term_array(sparameter_array,s11_array,s12_array,s21_array,s22_array):
+    """Applies the sixteen term correction to a (N,2,2) complex array of sparameters, the correction is given as the
+    four (N,2,2) blocks of the 4 port error box. All frequencies are corrected at once"""
+    inverse=np.linalg.inv
+    return inverse(np.matmul(np.matmul(s21_array,inverse(sparameter_array-s11_array)),s12_array)+s22_array)
+
+def uncorrect_sparameters_sixteen_term_array(sparameter_array,s11_array,s12_array,s21_array,s22_array):
+    """Removes the sixteen term correction from a (N,2,2) complex array of sparameters, the inverse of
+    correct_sparameters_sixteen_term_array"""
+    inverse=np.linalg.inv
+    return inverse(np.matmul(np.matmul(inverse(s21_array),inverse(sparameter_array)-s22_array),
+                             inverse(s12_array)))+s11_array
+
+def sixteen_term_correction_to_arrays(sixteen_term_correction):
+    """Converts a sixteen term correction list [[frequency, S11, S12, S13,S14,S21, S22,..S44],..] to the four (N,2,2)
+    blocks [[S11,S12],[S21,S22]], [[S13,S14],[S23,S24]], [[S31,S32],[S41,S42]] and [[S33,S34],[S43,S44]]"""
+    correction_array=np.array([row[1:17] for row in sixteen_term_correction],dtype=np.complex128).reshape((-1,4,4))
+    return [correction_array[:,0:2,0:2],correction_array[:,0:2,2:4],
+            correction_array[:,2:4,0:2],correction_array[:,2:4,2:4]]
+
 def correct_sparameters_eight_term(sparameters_complex,eight_term_correction,reciprocal=True):
     """Applies the eight term correction to sparameters_complex and returns
     a correct complex list in the form of [[frequency,S11,S21,S12,S22],..]. The eight term
     correction should be in the form [[frequency,S1_11,S1_21,S1_12,S1_22,S2_11,S2_21,S2_12,S2_22]..]
-    Use s2p.sparameter_complex as input."""
-    # first transform both lists to matrices
-    s2p_matrix_list=two_port_complex_to_matrix_form(sparameters_complex)
-    s1_list=[[row[0],row[1],row[2],row[3],row[4]] for row in eight_term_correction]
-    s2_list=[[row[0],row[5],row[6],row[7],row[8]] for row in eight_term_correction]
-    s1_matrix_list=two_port_complex_to_matrix_form(s1_list)
-    s2_matrix_list=two_port_complex_to_matrix_form(s2_list)
-    # now transform to T matrices
-    t_matrix_list=S_to_T(s2p_matrix_list)
-    x_matrix_list=S_to_T(s1_matrix_list)
-    y_matrix_list=S_to_T(s2_matrix_list)
-    # now invert x
-    x_inverse_matrix_list=invert_two_port_matrix_list(x_matrix_list)
-    y_inverse_matrix_list=invert_two_port_matrix_list(y_matrix_list)
-    # now apply the correction
-    t_corrected_list=[]
-    for index,row in enumerate(t_matrix_list):
-        frequency=row[0]
-        t_corrected=x_inverse_matrix_list[index][1]*row[1]*y_inverse_matrix_list[index][1]
-        t_corrected_list.append([frequency,t_corrected])
-    # now transform back to S
-    s_corrected_matrix_list =T_to_S(t_corrected_list)
-    # now put back into single row form
-    s_corrected_list=two_port_matrix_to_complex_form(s_corrected_matrix_list)
-    # now we take the geometric average and replace S12 and S21 with it
-    if reciprocal:
-        s_averaged_corrected=[]
-        phase_last=0
-        for row in s_corrected_list:
-            [frequency,S11,S21,S12,S22]=row
-            # S12 and S21 are averaged together in a weird way that makes phase continuous
-            geometric_mean=cmath.sqrt(S21*S12)
-            root_select=1
-            phase_new=cmath.phase(geometric_mean)
-            # if the phase jumps by >180 but less than 270, then pick the other root
-            if abs(phase_new-phase_last)>math.pi/2 and abs(phase_new-phase_last)<3*math.pi/2:
-                root_select=-1
-            mean_S12_S21=root_select*cmath.sqrt(S21*S12)
-            s_averaged_corrected.append([frequency,S11,mean_S12_S21,mean_S12_S21,S22])
-            phase_last=cmath.phase(mean_S12_S21)
-        s_corrected_list=s_averaged_corrected
-    else:
-        pass
-
-    return s_corrected_list
+    Use s2p.sparameter_complex as input. All frequencies are corrected at once with
+    correct_sparameters_eight_term_array"""
+    frequency_list,sparameter_array=two_port_complex_to_array(sparameters_complex)
+    s1_array=two_port_complex_to_array([[row[0],row[1],row[2],row[3],row[4]] for row in eight_term_correction])[1]
+    s2_array=two_port_complex_to_array([[row[0],row[5],row[6],row[7],row[8]] for row in eight_term_correction])[1]
+    corrected_array=correct_sparameters_eight_term_array(sparameter_array,s1_array,s2_array)
+    # two_port_matrix_to_complex_form writes the off diagonal terms as S12, S21
+    return two_port_array_to_complex_form(frequency_list,corrected_array,reciprocal=reciprocal,transpose=True)
 
 def uncorrect_sparameters_eight_term(sparameters_complex,eight_term_correction,reciprocal=True):
     """Removes the eight term correction to sparameters_complex and returns
@@ -780,49 +994,11 @@ def uncorrect_sparameters_eight_term(sparameters_complex,eight_term_correction,r
      complex list in the form of [[frequency,S11,S21,S12,S22],..]. The eight term
     correction should be in the form [[frequency,S1_11,S1_21,S1_12,S1_22,S2_11,S2_21,S2_12,S2_22]..]
     Use s2p.sparameter_complex as input."""
-    # first transform both lists to matrices
-    s2p_matrix_list=two_port_complex_to_matrix_form(sparameters_complex)
-    s1_list=[[row[0],row[1],row[2],row[3],row[4]] for row in eight_term_correction]
-    s2_list=[[row[0],row[5],row[6],row[7],row[8]] for row in eight_term_correction]
-    s1_matrix_list=two_port_complex_to_matrix_form(s1_list)
-    s2_matrix_list=two_port_complex_to_matrix_form(s2_list)
-    # now transform to T matrices
-    t_matrix_list=S_to_T(s2p_matrix_list)
-    x_matrix_list=S_to_T(s1_matrix_list)
-    y_matrix_list=S_to_T(s2_matrix_list)
-
-
-    # now apply the correction
-    t_uncorrected_list=[]
-    for index,row in enumerate(t_matrix_list):
-        frequency=row[0]
-        t_corrected=x_matrix_list[index][1]*row[1]*y_matrix_list[index][1]
-        t_uncorrected_list.append([frequency,t_corrected])
-    # now transform back to S
-    s_uncorrected_matrix_list =T_to_S(t_uncorrected_list)
-    # now put back into single row form
-    s_uncorrected_list=two_port_matrix_to_complex_form(s_uncorrected_matrix_list)
-    # now we take the geometric average and replace S12 and S21 with it
-    if reciprocal:
-        s_averaged_corrected=[]
-        phase_last=0
-        for row in s_uncorrected_list:
-            [frequency,S11,S21,S12,S22]=row
-            # S12 and S21 are averaged together in a weird way that makes phase continuous
-            geometric_mean=cmath.sqrt(S21*S12)
-            root_select=1
-            phase_new=cmath.phase(geometric_mean)
-            # if the phase jumps by >180 but less than 270, then pick the other root
-            if abs(phase_new-phase_last)>math.pi/2 and abs(phase_new-phase_last)<3*math.pi/2:
-                root_select=-1
-            mean_S12_S21=root_select*cmath.sqrt(S21*S12)
-            s_averaged_corrected.append([frequency,S11,mean_S12_S21,mean_S12_S21,S22])
-            phase_last=cmath.phase(mean_S12_S21)
-        s_uncorrected_list=s_averaged_corrected
-    else:
-        pass
-
-    return s_uncorrected_list
+    frequency_list,sparameter_array=two_port_complex_to_array(sparameters_complex)
+    s1_array=two_port_complex_to_array([[row[0],row[1],row[2],row[3],row[4]] for row in eight_term_correction])[1]
+    s2_array=two_port_complex_to_array([[row[0],row[5],row[6],row[7],row[8]] for row in eight_term_correction])[1]
+    uncorrected_array=uncorrect_sparameters_eight_term_array(sparameter_array,s1_array,s2_array)
+    return two_port_array_to_complex_form(frequency_list,uncorrected_array,reciprocal=reciprocal,transpose=True)
 
 def correct_sparameters_sixteen_term(sparameters_complex,sixteen_term_correction):
     """Applies the sixteen term correction to sparameters and returns a new sparameter list.
@@ -830,32 +1006,10 @@ def correct_sparameters_sixteen_term(sparameters_complex,sixteen_term_correction
     The sixteen term correction should be a list of
     [frequency, S11, S12, S13,S14,S21, S22,S23,S24,S31,S32,S33,S34,S41,S42,S43,S44], etc are complex numbers
     Designed to use S2P.sparameter_complex and SNP.sparameter_complex"""
-
-    # first create 4 separate matrix lists for 16 term correction
-    s1_matrix_list=[]
-    s2_matrix_list=[]
-    s3_matrix_list=[]
-    s4_matrix_list=[]
-    # Then populate them with the right values
-    for index,correction in enumerate(sixteen_term_correction):
-        [frequency, S11, S12, S13,S14,S21, S22,S23,S24,S31,S32,S33,S34,S41,S42,S43,S44]=correction
-        s1_matrix_list.append([frequency,np.matrix([[S11,S12],[S21,S22]])])
-        s2_matrix_list.append([frequency,np.matrix([[S13,S14],[S23,S24]])])
-        s3_matrix_list.append([frequency,np.matrix([[S31,S32],[S41,S42]])])
-        s4_matrix_list.append([frequency,np.matrix([[S33,S34],[S43,S44]])])
-    sparameter_matrix_list=two_port_complex_to_matrix_form(sparameters_complex)
-    # Apply the correction
-    sparameter_out=[]
-    for index,sparameter in enumerate(sparameter_matrix_list):
-        frequency=sparameter[0]
-        s_matrix=sparameter[1]
-        [s11_matrix,s12_matrix,s21_matrix,s22_matrix]=[s1_matrix_list[index][1],s2_matrix_list[index][1],
-                                                   s3_matrix_list[index][1],s4_matrix_list[index][1]]
-        corrected_s_matrix=np.linalg.inv(s21_matrix*np.linalg.inv(s_matrix-s11_matrix)*s12_matrix+s22_matrix)
-        # This flips S12 and S21
-        sparameter_out.append([frequency,corrected_s_matrix[0,0],corrected_s_matrix[1,0],
-                                corrected_s_matrix[0,1],corrected_s_matrix[1,1]])
-    return sparameter_out
+    frequency_list,sparameter_array=two_port_complex_to_array(sparameters_complex)
+    correction_arrays=sixteen_term_correction_to_arrays(sixteen_term_correction)
+    corrected_array=correct_sparameters_sixteen_term_array(sparameter_array,*correction_arrays)
+    return two_port_array_to_complex_form(frequency_list,corrected_array)
 
 def uncorrect_sparameters_sixteen_term(sparameters_complex,sixteen_term_correction):
     """Removes the sixteen term correction to sparameters and returns a new sparameter list.
@@ -864,34 +1018,43 @@ def uncorrect_sparameters_sixteen_term(sparameters_complex,sixteen_term_correcti
     [frequency, S11, S12, S13,S14,S21, S22,S23,S24,S31,S32,S33,S34,S41,S42,S43,S44], etc are complex numbers
     Designed to use S2P.sparameter_complex and SNP.sparameter_complex.
     Inverse of correct_sparameters_sixteen_term"""
-
-    # first create 4 separate matrix lists for 16 term correction
-    s1_matrix_list=[]
-    s2_matrix_list=[]
-    s3_matrix_list=[]
-    s4_matrix_list=[]
-    # Then populate them with the right values
-    for index,correction in enumerate(sixteen_term_correction):
-        [frequency, S11, S12, S13,S14,S21, S22,S23,S24,S31,S32,S33,S34,S41,S42,S43,S44]=correction
-        s1_matrix_list.append([frequency,np.matrix([[S11,S12],[S21,S22]])])
-        s2_matrix_list.append([frequency,np.matrix([[S13,S14],[S23,S24]])])
-        s3_matrix_list.append([frequency,np.matrix([[S31,S32],[S41,S42]])])
-        s4_matrix_list.append([frequency,np.matrix([[S33,S34],[S43,S44]])])
-    sparameter_matrix_list=two_port_complex_to_matrix_form(sparameters_complex)
-    # Apply the correction
-    sparameter_out=[]
-    for index,sparameter in enumerate(sparameter_matrix_list):
-        frequency=sparameter[0]
-        s_matrix=sparameter[1]
-        [s11_matrix,s12_matrix,s21_matrix,s22_matrix]=[s1_matrix_list[index][1],s2_matrix_list[index][1],
-                                                   s3_matrix_list[index][1],s4_matrix_list[index][1]]
-        uncorrected_s_matrix=np.linalg.inv(np.linalg.inv(s21_matrix)*(np.linalg.inv(s_matrix)-s22_matrix)*\
-                                            np.linalg.inv(s12_matrix))+s11_matrix
-
-        # This flips S12 and S21
-        sparameter_out.append([frequency,uncorrected_s_matrix[0,0],uncorrected_s_matrix[1,0],
-                               uncorrected_s_matrix[0,1],uncorrected_s_matrix[1,1]])
-    return sparameter_out
+    frequency_list,sparameter_array=two_port_complex_to_array(sparameters_complex)
+    correction_arrays=sixteen_term_correction_to_arrays(sixteen_term_correction)
+    uncorrected_array=uncorrect_sparameters_sixteen_term_array(sparameter_array,*correction_arrays)
+    return two_port_array_to_complex_form(frequency_list,uncorrected_array)
+
+def correct_sparameters_twelve_term_array(sparameter_array,twelve_term_array):
+    """Applies the twelve term correction to a (N,2,2) complex array of sparameters, twelve_term_array is a (N,12)
+    complex array with columns Edf,Esf,Erf,Exf,Elf,Etf,Edr,Esr,Err,Exr,Elr,Etr. Returns the (N,2,2) corrected array"""
+    [Edf,Esf,Erf,Exf,Elf,Etf,Edr,Esr,Err,Exr,Elr,Etr]=[twelve_term_array[:,index] for index in range(12)]
+    Sm11=sparameter_array[:,0,0]
+    Sm12=sparameter_array[:,0,1]
+    Sm21=sparameter_array[:,1,0]
+    Sm22=sparameter_array[:,1,1]
+    D =(1+(Sm11-Edf)*(Esf/Erf))*(1+(Sm22-Edr)*(Esr/Err))-(Sm12*Sm21*Elf*Elr)/(Etf*Etr)
+    corrected_array=np.empty(sparameter_array.shape,dtype=np.complex128)
+    corrected_array[:,0,0]=(Sm11-Edf)/(D*Erf)*(1+(Sm22-Edr)*(Esr/Err))-(Sm12*Sm21*Elf)/(D*Etf*Etr)
+    corrected_array[:,1,0]=((Sm21-Exr)/(D*Etf))*(1+(Sm22-Edr)*(Esr-Elf)/Err)
+    corrected_array[:,0,1]=((Sm12-Exf)/(D*Etr))*(1+(Sm11-Edf)*(Esf-Elr)/Erf)
+    corrected_array[:,1,1]=(Sm22-Edr)/(D*Err)*(1+(Sm11-Edf)*(Esf/Erf))-(Sm12*Sm21*Elr)/(D*Etf*Etr)
+    return corrected_array
+
+def uncorrect_sparameters_twelve_term_array(sparameter_array,twelve_term_array):
+    """Removes the twelve term correction from a (N,2,2) complex array of sparameters, twelve_term_array is a (N,12)
+    complex array with columns Edf,Esf,Erf,Exf,Elf,Etf,Edr,Esr,Err,Exr,Elr,Etr. Returns the (N,2,2) uncorrected
+    array"""
+    [Edf,Esf,Erf,Exf,Elf,Etf,Edr,Esr,Err,Exr,Elr,Etr]=[twelve_term_array[:,index] for index in range(12)]
+    Sa11=sparameter_array[:,0,0]
+    Sa12=sparameter_array[:,0,1]
+    Sa21=sparameter_array[:,1,0]
+    Sa22=sparameter_array[:,1,1]
+    delta=Sa11*Sa22-Sa12*Sa21
+    uncorrected_array=np.empty(sparameter_array.shape,dtype=np.complex128)
+    uncorrected_array[:,0,0]=Edf+(Erf)*(Sa11-Elf*delta)/(1-Esf*Sa11-Elf*Sa22+Esf*Elf*delta)
+    uncorrected_array[:,1,0]=Etf*(Sa21)/(1-Esf*Sa11-Elf*Sa22-Esf*Elf*delta)
+    uncorrected_array[:,0,1]=Etr*(Sa12)/(1-Elr*Sa11-Esr*Sa22-Esr*Elr*delta)
+    uncorrected_array[:,1,1]=Edr+Err*(Sa22-Elr*delta)/(1-Elr*Sa11-Esr*Sa22-Esr*Elr*delta)
+    return uncorrected_array
 
 def correct_sparameters_twelve_term(sparameters_complex,twelve_term_correction,reciprocal=True):
     """Applies the twelve term correction to sparameters and returns a new sparameter list.
@@ -900,35 +1063,12 @@ def correct_sparameters_twelve_term(sparameters_complex,twelve_term_correction,r
     [frequency,Edf,Esf,Erf,Exf,Elf,Etf,Edr,Esr,Err,Exr,Elr,Etr] where Edf, etc are complex numbers"""
     if len(sparameters_complex) != len(twelve_term_correction):
         raise TypeError("s parameter and twelve term correction must be the same length")
-    sparameter_out=[]
-    phase_last=0.
-    for index,row in enumerate(sparameters_complex):
-        frequency=row[0]
-        Sm=np.matrix(row[1:]).reshape((2,2))
-        [frequency,Edf,Esf,Erf,Exf,Elf,Etf,Edr,Esr,Err,Exr,Elr,Etr]=twelve_term_correction[index]
-        #        frequency Edf Esf Erf Exf Elf Etf Edr Esr Err Exr Elr Etr.
-#         print [frequency,Edf,Esf,Erf,Exf,Elf,Etf,Edr,Esr,Err,Exr,Elr,Etr]
-#         print Sm[0,0]
-        D =(1+(Sm[0,0]-Edf)*(Esf/Erf))*(1+(Sm[1,1]-Edr)*(Esr/Err))-(Sm[0,1]*Sm[1,0]*Elf*Elr)/(Etf*Etr)
-#         print D
-        S11 =(Sm[0,0]-Edf)/(D*Erf)*(1+(Sm[1,1]-Edr)*(Esr/Err))-(Sm[0,1]*Sm[1,0]*Elf)/(D*Etf*Etr)
-        S21 =((Sm[1,0]-Exr)/(D*Etf))*(1+(Sm[1,1]-Edr)*(Esr-Elf)/Err)
-        S12 = ((Sm[0,1]-Exf)/(D*Etr))*(1+(Sm[0,0]-Edf)*(Esf-Elr)/Erf)
-        S22 = (Sm[1,1]-Edr)/(D*Err)*(1+(Sm[0,0]-Edf)*(Esf/Erf))-(Sm[0,1]*Sm[1,0]*Elr)/(D*Etf*Etr)
-        # S12 and S21 are averaged together in a weird way that makes phase continuous
-        geometric_mean=cmath.sqrt(S21*S12)
-        root_select=1
-        phase_new=cmath.phase(geometric_mean)
-        # if the phase jumps by >180 but less than 270, then pick the other root
-        if abs(phase_new-phase_last)>math.pi/2 and abs(phase_new-phase_last)<3*math.pi/2:
-            root_select=-1
-        mean_S12_S21=root_select*cmath.sqrt(S21*S12)
-        if reciprocal:
-            sparameter_out.append([frequency,S11,mean_S12_S21,mean_S12_S21,S22])
-        else:
-            sparameter_out.append([frequency,S11,S21,S12,S22])
-        phase_last=cmath.phase(mean_S12_S21)
-    return sparameter_out
+    frequency_list=[row[0] for row in twelve_term_correction]
+    # the measured matrix is Sm=[[S11,S21],[S12,S22]] (the row reshaped), as in the original formulation
+    sparameter_array=np.array([row[1:5] for row in sparameters_complex],dtype=np.complex128).reshape((-1,2,2))
+    twelve_term_array=np.array([row[1:13] for row in twelve_term_correction],dtype=np.complex128).reshape((-1,12))
+    corrected_array=correct_sparameters_twelve_term_array(sparameter_array,twelve_term_array)
+    return two_port_array_to_complex_form(frequency_list,corrected_array,reciprocal=reciprocal)
 
 def uncorrect_sparameters_twelve_term(sparameters_complex,twelve_term_correction,reciprocal=True):
     """Removes the twelve term correction to sparameters and returns a new sparameter list.
@@ -937,35 +1077,12 @@ def uncorrect_sparameters_twelve_term(sparameters_complex,twelve_term_correction
     [frequency,Edf,Esf,Erf,Exf,Elf,Etf,Edr,Esr,Err,Exr,Elr,Etr] where Edf, etc are complex numbers"""
     if len(sparameters_complex) != len(twelve_term_correction):
         raise TypeError("s parameter and twelve term correction must be the same length")
-    sparameter_out=[]
-    phase_last=0.
-    for index,row in enumerate(sparameters_complex):
-        frequency=row[0]
-        Sa=np.matrix(row[1:]).reshape((2,2))
-        [frequency,Edf,Esf,Erf,Exf,Elf,Etf,Edr,Esr,Err,Exr,Elr,Etr]=twelve_term_correction[index]
-        #        frequency Edf Esf Erf Exf Elf Etf Edr Esr Err Exr Elr Etr.
-#         print [frequency,Edf,Esf,Erf,Exf,Elf,Etf,Edr,Esr,Err,Exr,Elr,Etr]
-#         print Sm[0,0]
-        delta=Sa[0,0]*Sa[1,1]-Sa[0,1]*Sa[1,0]
-#         print D
-        S11 =Edf+(Erf)*(Sa[0,0]-Elf*delta)/(1-Esf*Sa[0,0]-Elf*Sa[1,1]+Esf*Elf*delta)
-        S21 =Etf*(Sa[1,0])/(1-Esf*Sa[0,0]-Elf*Sa[1,1]-Esf*Elf*delta)
-        S12 = Etr*(Sa[0,1])/(1-Elr*Sa[0,0]-Esr*Sa[1,1]-Esr*Elr*delta)
-        S22 = Edr+Err*(Sa[1,1]-Elr*delta)/(1-Elr*Sa[0,0]-Esr*Sa[1,1]-Esr*Elr*delta)
-        # S12 and S21 are averaged together in a weird way that makes phase continuous
-        geometric_mean=cmath.sqrt(S21*S12)
-        root_select=1
-        phase_new=cmath.phase(geometric_mean)
-        # if the phase jumps by >180 but less than 270, then pick the other root
-        if abs(phase_new-phase_last)>math.pi/2 and abs(phase_new-phase_last)<3*math.pi/2:
-            root_select=-1
-        mean_S12_S21=root_select*cmath.sqrt(S21*S12)
-        if reciprocal:
-            sparameter_out.append([frequency,S11,mean_S12_S21,mean_S12_S21,S22])
-        else:
-            sparameter_out.append([frequency,S11,S21,S12,S22])
-        phase_last=cmath.phase(mean_S12_S21)
-    return sparameter_out
+    frequency_list=[row[0] for row in twelve_term_correction]
+    # the measured matrix is Sa=[[S11,S21],[S12,S22]] (the row reshaped), as in the original formulation
+    sparameter_array=np.array([row[1:5] for row in sparameters_complex],dtype=np.complex128).reshape((-1,2,2))
+    twelve_term_array=np.array([row[1:13] for row in twelve_term_correction],dtype=np.complex128).reshape((-1,12))
+    uncorrected_array=uncorrect_sparameters_twelve_term_array(sparameter_array,twelve_term_array)
+    return two_port_array_to_complex_form(frequency_list,uncorrected_array,reciprocal=reciprocal)
 #TODO: Check that this works the way it should
 def correct_sparameters(sparameters,correction,**options):
     """Correction sparamters trys to return a corrected set of sparameters given uncorrected sparameters
@@ -2566,9 +2683,42 @@ def test_compare_s2p_plots(file_list=["thru.s2p",'20160301_30ft_cable_0.s2p','Tw
     compare_s2p_plots(tables,format=format)
     format="DB"
     compare_s2p_plots(tables,format=format,display_legend=False)
+def test_correct_sparameters_array():
+    """Tests that the batched eight and sixteen term corrections undo each other"""
+    frequency_list=np.linspace(1.e9,10.e9,1001)
+    random_complex=lambda shape:np.random.normal(size=shape)+1j*np.random.normal(size=shape)
+    sparameter_array=random_complex((len(frequency_list),2,2))
+    s1_array=random_complex((len(frequency_list),2,2))
+    s2_array=random_complex((len(frequency_list),2,2))
+    corrected_array=correct_sparameters_eight_term_array(sparameter_array,s1_array,s2_array)
+    uncorrected_array=uncorrect_sparameters_eight_term_array(corrected_array,s1_array,s2_array)
+    print(("The largest eight term round trip error is {0}".format(np.max(np.abs(uncorrected_array-sparameter_array)))))
+    correction_arrays=[random_complex((len(frequency_list),2,2)) for i in range(4)]
+    corrected_array=correct_sparameters_sixteen_term_array(sparameter_array,*correction_arrays)
+    uncorrected_array=uncorrect_sparameters_sixteen_term_array(corrected_array,*correction_arrays)
+    print(("The largest sixteen term round trip error is {0}".format(np.max(np.abs(uncorrected_array-sparameter_array)))))
+    sparameters_complex=two_port_array_to_complex_form(frequency_list.tolist(),sparameter_array)
+    print(("The first row in complex list form is {0}".format(sparameters_complex[0])))
+
+def test_reference_curve_aggregate(file_list=["thru.s2p",'20160301_30ft_cable_0.s2p','704b.S2P']):
+    """Tests that merging the partial aggregates of file_list gives the same mean, standard deviation, minimum and
+    maximum as a single aggregate, and that build_reference_curve_aggregate agrees when run in a process pool"""
+    file_paths=[os.path.join(TESTS_DIRECTORY,file_name) for file_name in file_list]
+    aggregate=reference_curve_partial_aggregate(file_paths,"RI")
+    merged_aggregate=None
+    for file_path in file_paths:
+        merged_aggregate=merge_reference_curve_aggregates(merged_aggregate,
+                                                          reference_curve_partial_aggregate([file_path],"RI"))
+    pool_aggregate=build_reference_curve_aggregate(file_paths,"RI",workers=2,chunk_size=1,verbose=True)
+    for key in ["frequencies","count","mean","sum_squared_deviations","sum_squares","minimum","maximum"]:
+        print(("The merged and pooled {0} agree with a single aggregate: {1}, {2}".format(key,
+               np.allclose(aggregate[key],merged_aggregate[key]),np.allclose(aggregate[key],pool_aggregate[key]))))
+
 #-----------------------------------------------------------------------------
 # Module Runner
 if __name__ == '__main__':
     #test_average_one_port_sparameters()
     #test_comparison()
-    test_compare_s2p_plots()
\ No newline at end of file
+    test_compare_s2p_plots()
+    test_correct_sparameters_array()
+    test_reference_curve_aggregate()
\ No newline at end of file
@@ -21,6 +21,7 @@ Requirements
 + [os](https://docs.python.org/2/library/os.html)
 + [re](https://docs.python.org/2/library/re.html)
 + [math](https://docs.python.org/2/library/math.html)
++ [numpy](https://docs.scipy.org/doc/)
 + [pyMez](https://github.com/aricsanders/pyMez)
 
 Help
@@ -43,6 +44,12 @@ import re
 #-----------------------------------------------------------------------------
 # Third Party Imports
 sys.path.append(os.path.join(os.path.dirname( __file__ ), '..','..'))
+try:
+    import numpy as np
+except:
+    print("The module numpy was not found,"
+          "please put it on the python path")
+    raise ImportError
 try:
     from Code.DataHandlers.NISTModels import *
 except:
@@ -68,6 +75,45 @@ def standard_error(value_1,uncertainty_value_1,value_2,uncertainty_value_2=0,exp
     """calculates the standard errror (delta value/ (expansion factor * Sqrt(ua^2+ub^2)))"""
     return abs((value_2-value_1))/(math.sqrt(uncertainty_value_1**2+uncertainty_value_2**2)*expansion_factor)
 
+def align_table_rows(table_1,table_2,column_name="Frequency"):
+    """Aligns table_1 and table_2 on the values in column_name with a sort-merge. Returns [table_1_rows,
+    table_2_rows,aligned_values] where table_1_rows and table_2_rows are lists of row indices. Every row of table_2
+    with a value that is also in table_1 is paired with the first row of table_1 with that value, the pairs are
+    sorted by value and rows of table_2 with the same value keep their order"""
+    values_1=np.asarray(table_1[column_name])
+    values_2=np.asarray(table_2[column_name])
+    unique_values_1,first_rows_1=np.unique(values_1,return_index=True)
+    table_2_order=np.argsort(values_2,kind='stable')
+    sorted_values_2=values_2[table_2_order]
+    positions=np.searchsorted(unique_values_1,sorted_values_2)
+    in_table_1=positions<len(unique_values_1)
+    in_table_1[in_table_1]=unique_values_1[positions[in_table_1]]==sorted_values_2[in_table_1]
+    table_1_rows=first_rows_1[positions[in_table_1]]
+    table_2_rows=table_2_order[in_table_1]
+    return [table_1_rows.tolist(),table_2_rows.tolist(),values_1[table_1_rows].tolist()]
+
+def table_uncertainty_array(table,rows,values,uncertainty_type=None,uncertainty_column_names=None,
+                            uncertainty=None,uncertainty_function=None):
+    """Returns an array of the uncertainties of values (an array of the value columns for table.data[rows]) for
+    standard_error_data_table. The uncertainty_type can be None (0), table or list (the columns
+    uncertainty_column_names of table), constant or fixed (uncertainty), fractional (uncertainty*value) or
+    function (uncertainty_function(value))"""
+    if uncertainty_type is None:
+        return np.zeros(values.shape)
+    elif re.search("table|list",uncertainty_type,re.IGNORECASE):
+        column_selectors=[table.column_names.index(uncertainty_column_names[column_index])
+                          for column_index in range(values.shape[1])]
+        return np.array([[table.data[row_index][column_selector] for column_selector in column_selectors]
+                         for row_index in rows],dtype=np.float64).reshape(values.shape)
+    elif re.search("con|fixed",uncertainty_type,re.IGNORECASE):
+        return np.full(values.shape,float(uncertainty))
+    elif re.search("fract",uncertainty_type,re.IGNORECASE):
+        return float(uncertainty)*values
+    elif re.search("func",uncertainty_type,re.IGNORECASE):
+        return np.array([uncertainty_function(value) for value in values.flat],dtype=np.float64).reshape(values.shape)
+    else:
+        return np.zeros(values.shape)
+
 def standard_error_data_table(table_1,table_2,**options):
     """standard error data table takes two tables and creates a table that is the standard error of the two tables,
     at least one table must have uncertainties associated with it. The input tables are assumed to have data
@@ -108,79 +154,47 @@ def standard_error_data_table(table_1,table_2,**options):
         expansion_factor=float(error_options["expansion_factor"])
     else:
         expansion_factor=1
-    # first find a unique list of the independent variable for both curves
+    # first align the tables on the independent variable, sorting each table once
     if error_options["debug"]:
         begin_time=datetime.datetime.utcnow()
-        print(("started finding intersection of"
+        print(("started aligning "
               "table_1[{0}] and table_2[{1}] at {2}".format(error_options["independent_variable_column_name"],
                                                            error_options["independent_variable_column_name"],
                                                            begin_time)))
-    x_set_table_1=set(table_1[error_options["independent_variable_column_name"]])
-    x_set_table_2=set(table_2[error_options["independent_variable_column_name"]])
-    unique_x=sorted(list(x_set_table_1.intersection(x_set_table_2)))
+    [table_1_rows,table_2_rows,aligned_x]=align_table_rows(table_1,table_2,
+                                                           error_options["independent_variable_column_name"])
     if error_options["debug"]:
         end_time=datetime.datetime.utcnow()
-        print(("finished finding intersection at {0}".format(end_time)))
+        print(("finished aligning at {0}".format(end_time)))
         delta_time=end_time-begin_time
-        print(("it took {0} to find the intersection that contained {1} points".format(delta_time,len(unique_x))))
-    if not unique_x:
+        print(("it took {0} to align the tables that had {1} points in common".format(delta_time,
+                                                                                     len(set(aligned_x)))))
+    if not aligned_x:
         raise StandardErrorError("No points in the intersection, please either interpolate one data set or compare"
                                  "with another data set")
 
-    # next build the new data set
-    out_data=[]
-    x_column_index_table_1=table_1.column_names.index(error_options["independent_variable_column_name"])
-    x_column_index_table_2=table_2.column_names.index(error_options["independent_variable_column_name"])
-    # we choose the row by using unique_x
-    for x_value in unique_x:
-        # here if there are multiple values for x_value we ignore them
-        table_1_row=list(filter(lambda x: x[x_column_index_table_1]==x_value,table_1.data))[0]
-        # we begin a new_row
-        table_2_rows=[x for x in table_2.data if x[x_column_index_table_2]==x_value]
-        if error_options["debug"]:
-            print(("{0} is {1}".format("table_2_rows",table_2_rows)))
-        for table_2_row in table_2_rows:
-            new_row=[x_value]
-            for column_index,column_name in enumerate(error_options["value_column_names"]):
-                value_1_column_selector=table_1.column_names.index(column_name)
-                value_2_column_selector=table_2.column_names.index(column_name)
-                value_1=table_1_row[value_1_column_selector]
-                value_2=table_2_row[value_2_column_selector]
-                # now we assign the error to value 1
-                if error_options["table_1_uncertainty_type"] is None:
-                    error_1=0
-                elif re.search("table|list",error_options["table_1_uncertainty_type"],re.IGNORECASE):
-                    error_1_column_selector=table_1.column_names.index(error_options["table_1_uncertainty_column_names"][column_index])
-                    error_1=table_1_row[error_1_column_selector]
-                elif re.search("con|fixed",error_options["table_1_uncertainty_type"],re.IGNORECASE):
-                    error_1=float(error_options["uncertainty_table_1"])
-                elif re.search("fract",error_options["table_1_uncertainty_type"],re.IGNORECASE):
-                    error_1=float(error_options["uncertainty_table_1"])*value_1
-                elif re.search("func",error_options["table_1_uncertainty_type"],re.IGNORECASE):
-                    error_1=error_options["uncertainty_table_1_function"](value_1)
-                else:
-                    error_1=0
-                # now the same for table 2
-                if error_options["table_2_uncertainty_type"] is None:
-                    error_2=0
-                elif re.search("table|list",error_options["table_2_uncertainty_type"],re.IGNORECASE):
-                    error_2_column_selector=table_2.column_names.index(error_options["table_2_uncertainty_column_names"][column_index])
-                    error_2=table_2_row[error_2_column_selector]
-                elif re.search("con|fixed",error_options["table_2_uncertainty_type"],re.IGNORECASE):
-                    error_2=float(error_options["uncertainty_table_2"])
-                elif re.search("fract",error_options["table_2_uncertainty_type"],re.IGNORECASE):
-                    error_2=float(error_options["uncertainty_table_2"])*value_2
-                elif re.search("func",error_options["table_2_uncertainty_type"],re.IGNORECASE):
-                    error_2=error_options["uncertainty_table_2_function"](value_2)
-                else:
-                    error_2=0
-                # now calculate the value and append
-                try:
-                    standard_error=(value_1-value_2)/(expansion_factor*math.sqrt(error_1**2+error_2**2))
-                except:
-                    standard_error=0
-                new_row.append(standard_error)
-            out_data.append(new_row)
+    # next build the new data set, the column selectors and uncertainty types are resolved once for all rows
+    value_1_column_selectors=[table_1.column_names.index(column_name)
+                              for column_name in error_options["value_column_names"]]
+    value_2_column_selectors=[table_2.column_names.index(column_name)
+                              for column_name in error_options["value_column_names"]]
+    values_1=np.array([[table_1.data[row_index][column_selector] for column_selector in value_1_column_selectors]
+                       for row_index in table_1_rows],dtype=np.float64)
+    values_2=np.array([[table_2.data[row_index][column_selector] for column_selector in value_2_column_selectors]
+                       for row_index in table_2_rows],dtype=np.float64)
+    error_1=table_uncertainty_array(table_1,table_1_rows,values_1,error_options["table_1_uncertainty_type"],
+                                    error_options["table_1_uncertainty_column_names"],
+                                    error_options["uncertainty_table_1"],
+                                    error_options.get("uncertainty_table_1_function"))
+    error_2=table_uncertainty_array(table_2,table_2_rows,values_2,error_options["table_2_uncertainty_type"],
+                                    error_options["table_2_uncertainty_column_names"],
+                                    error_options["uncertainty_table_2"],
+                                    error_options.get("uncertainty_table_2_function"))
+    denominator=expansion_factor*np.sqrt(error_1**2+error_2**2)
+    # points with no uncertainty have a standard error of 0
+    with np.errstate(divide='ignore',invalid='ignore'):
+        standard_errors=np.where(denominator==0,0.,(values_1-values_2)/denominator)
+    out_data=[[x_value]+standard_error_row for x_value,standard_error_row in zip(aligned_x,standard_errors.tolist())]
         # now we handle the standard error table creation
     standard_error_column_names=[error_options["independent_variable_column_name"]]
     for column_name in error_options["value_column_names"]:
@@ -211,8 +225,31 @@ def test_standard_error(test_list=None):
     print(("The standard_error is {0}".format(standard_error(first_value,
                                                             first_error,
                                                             second_value,second_error))))
+
+def test_standard_error_data_table(number_points=50000):
+    """Tests standard_error_data_table on two tables with number_points rows, the second table has every
+    frequency of the first table twice and a constant uncertainty"""
+    frequency=np.linspace(.01,18,number_points)
+    column_names=["Frequency","magS11","argS11","uMgS11","uAgS11"]
+    table_1_data=np.column_stack([frequency,np.cos(frequency),np.sin(frequency),
+                                  np.full(number_points,.01),np.full(number_points,.1)]).tolist()
+    table_2_data=np.column_stack([np.concatenate([frequency,frequency[::-1]]),
+                                  np.cos(np.concatenate([frequency,frequency[::-1]]))+.001,
+                                  np.sin(np.concatenate([frequency,frequency[::-1]]))-.01]).tolist()
+    table_1=AsciiDataTable(None,column_names=column_names,data=table_1_data,
+                           column_types=['float' for column in column_names])
+    table_2=AsciiDataTable(None,column_names=column_names[:3],data=table_2_data,
+                           column_types=['float' for column in column_names[:3]])
+    start_time=datetime.datetime.utcnow()
+    standard_error_table=standard_error_data_table(table_1,table_2,value_column_names=["magS11","argS11"],
+                                                   table_1_uncertainty_column_names=["uMgS11","uAgS11"],
+                                                   table_2_uncertainty_type="constant",uncertainty_table_2=.001)
+    print(("standard_error_data_table compared {0} and {1} rows in {2}".format(len(table_1.data),len(table_2.data),
+                                                                            datetime.datetime.utcnow()-start_time)))
+    print(("The result has {0} rows, the first rows are {1}".format(len(standard_error_table.data),
+                                                                   standard_error_table.data[:2])))
 #-----------------------------------------------------------------------------
 # Module Runner
 if __name__ == '__main__':
-    pass
+    test_standard_error_data_table()
     
\ No newline at end of file
@@ -10,6 +10,10 @@
  column modeled table (like excel or a csv table) and a footer. Made a change 10/19/2018 to AsciiDataTable
  that now by default saves a .schema file and looks for one to open the table (save_schema=True,
  open_with_schema =True ) Currently it is great for small ~1MB or less files. If it is extremely slow use numpy.loadtxt
+ For large tables the option columnar_storage=True stores data as one numpy array per column (ColumnarData) so that
+ column selection, unit changes and arithmetic (table.get_column_array("Frequency")) are vectorized. Files that are too
+ large to read can be opened with memory_map=True, the file is memory mapped and data rows are only parsed when they
+ are accessed (table.get_row(i), table.get_column("Frequency"), table.data[i:j]).
 
 
 Examples
@@ -47,6 +51,7 @@ import os
 import pickle
 import sys
 import copy
+import mmap
 #-----------------------------------------------------------------------------
 # Third Party Imports
 sys.path.append(os.path.join(os.path.dirname( __file__ ), '..','..'))
@@ -84,6 +89,11 @@ TESTS_DIRECTORY=os.path.join(os.path.dirname(os.path.realpath(__file__)),'Tests'
 # General Regular Expression For matching a number
 NUMBER_MATCH_STRING=r'[+-]?(\d+(\.\d*)?|\.\d+)([eE][+-]?\d+)?'
 "Regular expression that matches a number of any format."
+MAD_SCALE=0.6744897501960817
+"Scale of the median absolute deviation (the .75 quantile of the normal distribution) as in statsmodels mad."
+AGGREGATE_METHODS=[('mean|av','mean'),('median','median'),('geometric','geometric'),('st','std'),('var','var'),
+                   ('rms','rms'),('rss','rss'),('mad','mad')]
+"Regular expressions matched in order to an aggregate method name by get_aggregate_method."
 
 #-----------------------------------------------------------------------------
 # Module Functions
@@ -107,18 +117,17 @@ def check_arg_type(arg,arg_type):
         print(("{0} was not {1} but {2}".format(arg,arg_type,type(arg))))
 
 def string_list_collapse(list_of_strings,string_delimiter='\n'):
-    """ Makes a list of strings a single string"""
+    """ Makes a list of strings a single string with string_delimiter between the items and not after the last
+    one. Note: before the loop was replaced with join the last item of lists of more than 257 strings also got a
+    string_delimiter (the index is len-1 test only worked for small integers), so str() and save of long tables
+    ended with a newline"""
     check_arg_type(list_of_strings,ListType)
     if list_of_strings is None:
         return
     if string_delimiter is None:
         string_delimiter=""
-    out_string=''
-    for index,item in enumerate(list_of_strings):
-        if index is len(list_of_strings)-1:
-            out_string=out_string+item
-        else:
-            out_string=out_string+item+string_delimiter
+    # join is linear in the total length, adding strings in a loop is quadratic for long tables
+    out_string=string_delimiter.join(list_of_strings)
     return out_string
 def list_to_string(row_list,data_delimiter=None,row_formatter_string=None,begin=None,end=None):
     """Given a list of values returns a string, if row_formatter is specifed
@@ -131,11 +140,7 @@ def list_to_string(row_list,data_delimiter=None,row_formatter_string=None,begin=
         data_delimiter=','
     string_out=""
     if row_formatter_string is None:
-        for index,item in enumerate(row_list):
-            if index is len(row_list)-1:
-                string_out=string_out+str(item)
-            else:
-                string_out=string_out+str(item)+data_delimiter
+        string_out=data_delimiter.join([str(item) for item in row_list])
     else:
         string_out=row_formatter_string.format(*row_list,delimiter=data_delimiter)
     if end is None:
@@ -144,6 +149,54 @@ def list_to_string(row_list,data_delimiter=None,row_formatter_string=None,begin=
         begin=""
     return begin+string_out+end
 
+def compile_row_formatter(data_delimiter=None,row_formatter_string=None):
+    """Returns a function that converts a row (list of values) to a string the same way as list_to_string without
+    begin and end. The delimiter is substituted into row_formatter_string once so each row is a single format call"""
+    if data_delimiter is None:
+        data_delimiter=','
+    if row_formatter_string is None:
+        def format_row(row):
+            return data_delimiter.join([str(item) for item in row])
+    elif "{{" in row_formatter_string or "}}" in row_formatter_string:
+        def format_row(row):
+            return row_formatter_string.format(*row,delimiter=data_delimiter)
+    else:
+        template=row_formatter_string.replace("{delimiter}",data_delimiter.replace("{","{{").replace("}","}}"))
+        def format_row(row):
+            return template.format(*row)
+    return format_row
+
+def iter_list_list_strings(list_lists,data_delimiter=None,row_formatter_string=None,line_begin=None,line_end=None,
+                           chunk_size=10000):
+    """Yields the string form of list_list_to_string in pieces of chunk_size rows, so a large table can be written to
+    a file without building the whole string. list_lists can also be a ColumnarData or MappedData object, a
+    ColumnarData with only numeric columns and no row_formatter_string is converted to strings a column at a time"""
+    if line_end is None:
+        line_end="\n"
+    if line_begin is None:
+        line_begin=""
+    if line_end=="\n":
+        last_end=""
+    else:
+        last_end=re.sub("\n","",line_end,count=1)
+    if data_delimiter is None:
+        data_delimiter=','
+    format_row=compile_row_formatter(data_delimiter,row_formatter_string)
+    number_rows=len(list_lists)
+    numeric_columns=isinstance(list_lists,ColumnarData) and row_formatter_string is None and \
+                    all([column.dtype.kind in ['i','u','f'] for column in list_lists.columns])
+    for chunk_begin in range(0,number_rows,chunk_size):
+        chunk_end=min(chunk_begin+chunk_size,number_rows)
+        if numeric_columns:
+            row_strings=[data_delimiter.join(row) for row in
+                         zip(*[column[chunk_begin:chunk_end].astype(str).tolist() for column in list_lists.columns])]
+        else:
+            row_strings=[format_row(row) for row in list_lists[chunk_begin:chunk_end]]
+        if chunk_end==number_rows:
+            yield line_begin+(line_end+line_begin).join(row_strings)+last_end
+        else:
+            yield line_begin+(line_end+line_begin).join(row_strings)+line_end
+
 def list_list_to_string(list_lists,data_delimiter=None,row_formatter_string=None,line_begin=None,line_end=None):
     """Repeatedly calls list to string on each element of a list and string adds the result
     . ie coverts a list of lists to a string. If line end is None the value defaults to "\n", for no seperator use ''
@@ -151,20 +204,9 @@ def list_list_to_string(list_lists,data_delimiter=None,row_formatter_string=None
     if line_end is None:
         line_end="\n"
     check_arg_type(list_lists,ListType)
-    string_out=""
-    for index,row in enumerate(list_lists):
-        if index==len(list_lists)-1:
-            if line_end is "\n":
-                last_end=""
-            else:
-                last_end=re.sub("\n","",line_end,count=1)
-            string_out=string_out+list_to_string(row,data_delimiter=data_delimiter,
-                                             row_formatter_string=row_formatter_string,
-                                             begin=line_begin,end=last_end)
-        else:
-            string_out=string_out+list_to_string(row,data_delimiter=data_delimiter,
-                                             row_formatter_string=row_formatter_string,
-                                             begin=line_begin,end=line_end)
+    string_out="".join(iter_list_list_strings(list_lists,data_delimiter=data_delimiter,
+                                              row_formatter_string=row_formatter_string,
+                                              line_begin=line_begin,line_end=line_end))
     return string_out
 
 def line_comment_string(comment,comment_begin=None,comment_end=None):
@@ -369,14 +411,137 @@ def convert_row(row_list_strings,column_types=None):
                 out_row[index]=row_list_strings[index]
     return out_row
 
+def get_column_converters(column_types):
+    """Returns a list of functions that convert a value to each of column_types, the same conversions as
+    convert_row with the column type matched once instead of once for every row"""
+    converters=[]
+    for column_type in column_types:
+        if re.match('int',column_type,re.IGNORECASE):
+            converters.append(int)
+        elif re.match('float',column_type,re.IGNORECASE):
+            converters.append(float)
+        elif re.match('str|char|object',column_type,re.IGNORECASE):
+            converters.append(str)
+        elif re.match('com',column_type,re.IGNORECASE):
+            converters.append(complex)
+        elif re.match('list',column_type,re.IGNORECASE):
+            converters.append(list)
+        elif re.match('dict',column_type,re.IGNORECASE):
+            converters.append(dict)
+        else:
+            converters.append(None)
+    return converters
+
 def convert_all_rows(list_rows,column_types=None):
     "Converts all the rows (list of strings) in a list of rows using column types "
     check_arg_type(list_rows,ListType)
+    if column_types is None or len(list_rows)==0:
+        out_list=[]
+        for index,row in enumerate(list_rows):
+            out_list.append(convert_row(row,column_types))
+        return out_list
+    converters=list(enumerate(get_column_converters(column_types)))
     out_list=[]
-    for index,row in enumerate(list_rows):
-        out_list.append(convert_row(row,column_types))
+    for row in list_rows:
+        if len(row) != len(column_types):
+            # convert_row reports the error
+            convert_row(row,column_types)
+        for index,converter in converters:
+            if converter is not None:
+                row[index]=converter(row[index])
+        out_list.append(row)
     return out_list
 
+def is_numeric_column_types(column_types):
+    """Returns True if column_types is a list of only int and float types"""
+    if not isinstance(column_types,(ListType,tuple)) or len(column_types)==0:
+        return False
+    for column_type in column_types:
+        if not isinstance(column_type,StringType) or not re.match('int|float',column_type,re.IGNORECASE):
+            return False
+    return True
+
+def parse_numeric_rows(row_list,delimiter=None,column_types=None,output='list_list'):
+    """Fast path for split_all_rows followed by convert_all_rows when every column is an int or float and the
+    delimiter is a literal string. All of the rows are tokenized in one split and converted column by column by numpy.
+    Returns a list of lists (output='list_list'), a ColumnarData object (output='columnar') or None if the rows can not
+    be parsed this way, in which case the row by row functions should be used"""
+    if delimiter is None or not is_numeric_column_types(column_types):
+        return None
+    if set(delimiter) & set('.^$*+?{}[]\\|()'):
+        return None
+    try:
+        number_columns=len(column_types)
+        stripped_rows=[row.strip() for row in row_list]
+        for row in stripped_rows:
+            if row.count(delimiter)!=number_columns-1:
+                return None
+        if not stripped_rows:
+            return None
+        tokens=np.array(delimiter.join(stripped_rows).split(delimiter)).reshape(len(stripped_rows),number_columns)
+        columns=[tokens[:,index].astype(column_type_to_dtype(column_type))
+                 for index,column_type in enumerate(column_types)]
+    except:
+        return None
+    if output in ['columnar']:
+        return ColumnarData(columns=columns,column_types=column_types)
+    return [list(row) for row in zip(*[column.tolist() for column in columns])]
+
+def get_line_offsets(mapped_file,chunk_size=2**24):
+    """Returns a numpy array of the byte offsets of the beginning of each line in mapped_file (an mmap or bytes),
+    with the size of the file as the last element so that line i is mapped_file[offsets[i]:offsets[i+1]]. The file
+    is scanned in chunks of chunk_size bytes so memory use does not depend on the size of the file"""
+    file_size=len(mapped_file)
+    offsets=[np.zeros(1,dtype=np.int64)]
+    for chunk_begin in range(0,file_size,chunk_size):
+        chunk=np.frombuffer(mapped_file[chunk_begin:chunk_begin+chunk_size],dtype=np.uint8)
+        offsets.append(np.flatnonzero(chunk==10).astype(np.int64)+chunk_begin+1)
+    offsets=np.concatenate(offsets)
+    if offsets[-1]!=file_size:
+        offsets=np.append(offsets,file_size)
+    return offsets
+
+def column_type_to_dtype(column_type=None):
+    """Returns the numpy dtype used to store a column of type column_type (a column_types string such as 'float',
+    'int', 'complex' or 'str'). Strings and unknown types are stored as objects so that cells keep their python type"""
+    if column_type is None:
+        return None
+    if isinstance(column_type,np.dtype):
+        return column_type
+    if re.match('int',column_type,re.IGNORECASE):
+        return np.dtype('int64')
+    elif re.match('float',column_type,re.IGNORECASE):
+        return np.dtype('float64')
+    elif re.match('com',column_type,re.IGNORECASE):
+        return np.dtype('complex128')
+    else:
+        return np.dtype('object')
+
+def column_to_array(column_data,column_type=None):
+    """Converts a list of values to a one dimensional numpy array using column_type, if column_type is None
+    the type is inferred and anything that is not a number is stored as an object array"""
+    dtype=column_type_to_dtype(column_type)
+    if dtype is None:
+        try:
+            out_array=np.array(column_data)
+            if out_array.ndim==1 and out_array.dtype.kind in ['b','i','u','f','c']:
+                return out_array
+        except:
+            pass
+        dtype=np.dtype('object')
+    if dtype.kind=='O':
+        out_array=np.empty(len(column_data),dtype=dtype)
+        for index,value in enumerate(column_data):
+            out_array[index]=value
+        return out_array
+    return np.array(column_data,dtype=dtype)
+
+def native_value(value):
+    """Returns the python equivalent of a numpy scalar (np.float64(1.0)->1.0), other values are returned unchanged"""
+    if isinstance(value,np.generic):
+        return value.item()
+    return value
+
 def insert_inline_comment(list_of_strings,comment="",line_number=None,string_position=None,begin_token='(*',end_token='*)'):
     "Inserts an inline comment in a list of strings, location is determined by line_number and string_position"
     if line_number is None or string_position is None:
@@ -402,7 +567,10 @@ def collect_inline_comments(list_of_strings,begin_token=None,end_token=None):
     match=re.compile('{0}(?P<inline_comments>.*){1}'.format(re.escape(begin_token),re.escape(end_token)))
     inline_comment_list=[]
     for index,line in enumerate(list_of_strings):
-        comment_match=re.search(match,line)
+        # the begin_token has to be in the line for it to match, this skips the regular expression for most lines
+        if begin_token not in line:
+            continue
+        comment_match=match.search(line)
         if comment_match:
             inline_comment_list.append([comment_match.group('inline_comments'),index,comment_match.start()])
     if inline_comment_list:
@@ -417,7 +585,10 @@ def strip_inline_comments(list_of_strings,begin_token='(*',end_token='*)'):
     match=re.compile('{0}(?P<inline_comments>.+){1}'.format(re.escape(begin_token),re.escape(end_token)))
     out_list=[]
     for index,line in enumerate(list_of_strings):
-        out_list.append(re.sub(match,'',line))
+        if begin_token in line:
+            out_list.append(match.sub('',line))
+        else:
+            out_list.append(line)
     return out_list
 
 
@@ -502,9 +673,125 @@ def parse_lines(string_list,**options):
         # Todo: Add the conversion to pandas
         return out_list
 
-def ascii_data_table_join(column_selector,table_1,table_2):
+def build_column_index(column_values):
+    """Returns a dictionary of {value:[row positions]} for a list of column values. The index is used to match rows
+    in joins without scanning the table"""
+    column_index={}
+    for row_position,value in enumerate(column_values):
+        column_index.setdefault(native_value(value),[]).append(row_position)
+    return column_index
+
+def merge_table_lines(lines_1,lines_2):
+    """Merges two headers or footers (lists of lines), if they are equal only one copy is kept"""
+    if lines_1 is None and lines_2 is None:
+        return None
+    elif lines_1 is None:
+        return lines_2[:]
+    elif lines_2 is None:
+        return lines_1[:]
+    elif lines_1==lines_2:
+        return lines_1[:]
+    else:
+        return lines_1[:]+lines_2[:]
+
+def get_column_type_list(table):
+    """Returns the column types of table as a list in column order or None if the table has no column_types"""
+    column_types=table.options["column_types"]
+    if column_types is None:
+        return None
+    elif isinstance(column_types,DictionaryType):
+        return [column_types.get(column_name) for column_name in table.column_names]
+    else:
+        return list(column_types)
+
+def ascii_data_table_join(column_selector,table_1,table_2,join_type=None):
     """Given a column selector (name or zero based index) and
     two tables a data_table with extra columns is returned. The options from table 1 are inherited
+    headers and footers are added. If join_type is None the columns of table 2 are added row by row and the tables
+    must have the same number of rows. If join_type is 'inner', 'left' or 'outer' rows are matched on the value in
+    the column_selector column using a hash index of table 2. Unmatched rows ('left' and 'outer') are filled with
+    table_1.options['empty_value'], or with nan in int and float columns if empty_value is None (int columns
+    that are filled become float)"""
+    if join_type is None:
+        return ascii_data_table_positional_join(column_selector,table_1,table_2)
+    if join_type not in ["inner","left","outer"]:
+        raise TypeError("join_type must be None, 'inner', 'left' or 'outer' not {0}".format(join_type))
+    if isinstance(column_selector,IntType):
+        column_selector_1=column_selector_2=column_selector
+    else:
+        column_selector_1=table_1.column_names.index(column_selector)
+        column_selector_2=table_2.column_names.index(column_selector)
+    column_names=table_1.column_names[:]+[column_name for index,column_name in enumerate(table_2.column_names)
+                                          if index != column_selector_2]
+    column_types_1=get_column_type_list(table_1)
+    column_types_2=get_column_type_list(table_2)
+    if column_types_1 is None and column_types_2 is None:
+        column_types=None
+    else:
+        if column_types_1 is None:
+            column_types_1=['string' for column_name in table_1.column_names]
+        if column_types_2 is None:
+            column_types_2=['string' for column_name in table_2.column_names]
+        column_types=column_types_1+[column_type for index,column_type in enumerate(column_types_2)
+                                     if index != column_selector_2]
+    # the value used for a missing entry in each column of the joined table
+    empty_values=[]
+    for column_index,column_name in enumerate(column_names):
+        empty_value=table_1.options["empty_value"]
+        if empty_value is None and column_types is not None and column_types[column_index] and \
+                re.match('int|float',column_types[column_index],re.IGNORECASE):
+            empty_value=float('nan')
+        empty_values.append(empty_value)
+    number_columns_1=len(table_1.column_names)
+    rows_1=table_1.data
+    rows_2=table_2.data
+    if isinstance(rows_1,(ColumnarData,MappedData)):
+        rows_1=rows_1.tolist()
+    if isinstance(rows_2,(ColumnarData,MappedData)):
+        rows_2=rows_2.tolist()
+    rows_1=[list(row) for row in rows_1]
+    rows_2=[[value for index,value in enumerate(row) if index != column_selector_2] for row in rows_2]
+    keys_2=table_2.get_column(column_index=column_selector_2)
+    index_2=build_column_index(keys_2)
+    filled_columns=set()
+    data=[]
+    for row in rows_1:
+        matches=index_2.get(native_value(row[column_selector_1]))
+        if matches:
+            for row_position in matches:
+                data.append(row+rows_2[row_position])
+        elif join_type in ["left","outer"]:
+            data.append(row+empty_values[number_columns_1:])
+            filled_columns.update(range(number_columns_1,len(column_names)))
+    if join_type in ["outer"]:
+        index_1=build_column_index(table_1.get_column(column_index=column_selector_1))
+        for row_position,key in enumerate(keys_2):
+            if native_value(key) not in index_1:
+                new_row=empty_values[:number_columns_1]
+                new_row[column_selector_1]=native_value(key)
+                data.append(new_row+rows_2[row_position])
+                filled_columns.update([index for index in range(number_columns_1) if index != column_selector_1])
+    if column_types is not None:
+        for column_index in filled_columns:
+            if isinstance(empty_values[column_index],FloatType) and re.match('int',column_types[column_index],
+                                                                             re.IGNORECASE):
+                column_types[column_index]='float'
+    options=table_1.options.copy()
+    for key in ["data","column_names","column_types","header","footer","column_descriptions"]:
+        options[key]=None
+    options["memory_map"]=False
+    new_table=AsciiDataTable(None,**options)
+    new_table.header=merge_table_lines(table_1.header,table_2.header)
+    new_table.footer=merge_table_lines(table_1.footer,table_2.footer)
+    new_table.column_names=column_names
+    new_table.options["column_types"]=column_types
+    new_table.data=data
+    new_table.update_model()
+    return new_table
+
+def ascii_data_table_positional_join(column_selector,table_1,table_2):
+    """Given a column selector (name or zero based index) and
+    two tables a data_table with extra columns is returned, the columns of table_2 are added row by row. The options from table 1 are inherited
     headers and footers are added, if the tables have a different number of rows problems may occur"""
     if len(table_1.data) != len(table_2.data):
         raise DataDimensionError('The dim {0} is not equal to {1}'.format(len(table_1.data),len(table_2.data)))
@@ -570,15 +857,244 @@ def ascii_data_table_join(column_selector,table_1,table_2):
 
     return new_table
 
-def join_ascii_data_table_list(table_list):
+def join_ascii_data_table_list(table_list,column_selector=None,join_type="outer"):
     """Joins a list of any subclass of AsciiDataTable returns a new table of the same type, input
-    is assume to be a list of AsciiDataTable objects or any sub class. """
+    is assume to be a list of AsciiDataTable objects or any sub class. If column_selector is specified the tables
+    are joined on that column with ascii_data_table_join using join_type ('inner','left' or 'outer') and the
+    result is an AsciiDataTable"""
     first=table_list[0]
+    if column_selector is not None:
+        joined_table=first
+        for table in table_list[1:]:
+            joined_table=ascii_data_table_join(column_selector,joined_table,table,join_type=join_type)
+        if len(table_list)==1:
+            joined_table=first.copy()
+        return joined_table
     joined_table=first.copy()
     for table in table_list[1:]:
         joined_table+table
     return joined_table
 
+def iter_rows(file_path,schema=None,output='list',**options):
+    """Returns a generator that yields the data rows of an AsciiDataTable file one at a time, converted with
+    column_types, without reading the file into memory or building a table. The table format is taken from schema
+    (a dictionary or the path to a schema file, defaults to the .schema file next to file_path) and options, which take
+    precedence. The data starts at data_begin_line or the line with data_begin_token and ends at data_end_line or the
+    line with data_end_token. If output='dict' each row is a dictionary {column_name:value}.
+    Example: mean=aggregate_rows(filter_rows(iter_rows("Big_Table.txt"),lambda row:row[0]>1e9),[1])[1].mean"""
+    row_options={"data_delimiter":",","column_names":None,"column_types":None,
+                 "column_names_delimiter":",","column_names_begin_line":None,
+                 "column_names_begin_token":None,"column_names_end_token":None,
+                 "data_begin_line":None,"data_end_line":None,"data_begin_token":None,"data_end_token":None,
+                 "row_begin_token":None,"row_end_token":None,"escape_character":None,
+                 "inline_comment_begin":None,"inline_comment_end":None}
+    if schema is None:
+        schema_path=change_extension(file_path,new_extension="schema")
+        if os.path.isfile(schema_path):
+            schema=read_schema(schema_path)
+    elif isinstance(schema,StringType):
+        schema=read_schema(schema)
+    if schema:
+        for key,value in schema.items():
+            row_options[key]=value
+    for key,value in options.items():
+        row_options[key]=value
+    data_tokens=[]
+    for token in [row_options["data_begin_token"],row_options["data_end_token"]]:
+        if token and token.replace("\n",""):
+            data_tokens.append(token.replace("\n",""))
+        else:
+            data_tokens.append(None)
+    begin_token,end_token=data_tokens
+    begin_line=row_options["data_begin_line"]
+    end_line=row_options["data_end_line"]
+    inline_match=None
+    if row_options["inline_comment_begin"] is not None and row_options["inline_comment_end"] is not None:
+        inline_match=re.compile('{0}(?P<inline_comments>.+){1}'.format(re.escape(row_options["inline_comment_begin"]),
+                                                                         re.escape(row_options["inline_comment_end"])))
+    column_names=row_options["column_names"]
+    file_in=open(file_path,'r')
+    try:
+        in_data=begin_line is None and begin_token is None
+        for line_number,line in enumerate(file_in):
+            if column_names is None and line_number==row_options["column_names_begin_line"]:
+                # the column names are saved in the file not the schema
+                column_names=strip_line_tokens(line.replace("\n",""),
+                                               begin_token=row_options["column_names_begin_token"],
+                                               end_token=row_options["column_names_end_token"])
+                column_names=split_row(column_names,delimiter=row_options["column_names_delimiter"],
+                                       escape_character=row_options["escape_character"])
+            if not in_data:
+                if begin_line is not None and line_number>=begin_line:
+                    in_data=True
+                elif begin_line is None and begin_token in line:
+                    in_data=True
+                else:
+                    continue
+            if end_line is not None and line_number>=end_line:
+                break
+            last_line=False
+            if end_token is not None and end_token in line:
+                last_line=True
+            for token in data_tokens:
+                if token is not None:
+                    line=line.replace(token,"")
+            if inline_match is not None:
+                line=re.sub(inline_match,"",line)
+            if line.strip():
+                row=strip_line_tokens(line,begin_token=row_options["row_begin_token"],
+                                      end_token=row_options["row_end_token"])
+                row=split_row(row,delimiter=row_options["data_delimiter"],
+                              escape_character=row_options["escape_character"])
+                if row_options["column_types"]:
+                    row=convert_row(row,row_options["column_types"])
+                if output in ['dict','dictionary','dict_list']:
+                    if column_names is None:
+                        column_names=["x"+str(index) for index in range(len(row))]
+                    yield dict(zip(column_names,row))
+                else:
+                    yield row
+            if last_line:
+                break
+    finally:
+        file_in.close()
+
+def filter_rows(rows,condition=None,**column_values):
+    """Returns a generator of the rows in the iterable rows for which condition(row) is True and, for dictionary
+    rows, row[column_name]==value for every column_name=value keyword. Meant to be chained with iter_rows"""
+    for row in rows:
+        if condition is not None and not condition(row):
+            continue
+        if column_values and not all([row[key]==value for key,value in column_values.items()]):
+            continue
+        yield row
+
+def aggregate_rows(rows,column_selectors=None):
+    """Consumes the iterable rows (lists or dictionaries) and returns a dictionary {column_selector:RunningStatistics}
+    with the count, mean, variance, minimum and maximum of each selected column found in a single pass. If
+    column_selectors is None every int or float column of the first row is used. Memory use does not depend on the
+    number of rows"""
+    statistics=None
+    for row in rows:
+        if statistics is None:
+            if column_selectors is None:
+                if isinstance(row,DictionaryType):
+                    keys=list(row.keys())
+                else:
+                    keys=list(range(len(row)))
+                column_selectors=[key for key in keys
+                                  if isinstance(row[key],(IntType,FloatType)) and not isinstance(row[key],bool)]
+            statistics={column_selector:RunningStatistics() for column_selector in column_selectors}
+        for column_selector in column_selectors:
+            statistics[column_selector].update(row[column_selector])
+    if statistics is None:
+        statistics={}
+        if column_selectors is not None:
+            statistics={column_selector:RunningStatistics() for column_selector in column_selectors}
+    return statistics
+
+def get_aggregate_method(method):
+    """Returns the aggregate method ('mean','median','geometric','std','var','rms','rss' or 'mad') that the string
+    method matches, using the order of AGGREGATE_METHODS (so 'geometric mean' is 'mean', use 'geometric')"""
+    for pattern,method_name in AGGREGATE_METHODS:
+        if re.search(pattern,method,re.IGNORECASE):
+            return method_name
+    raise TypeError("The aggregate method {0} is not mean, median, geometric, std, var, rms, rss or mad".format(method))
+
+def get_group_indices(key_columns):
+    """Given a list of key columns (sequences of the same length) returns a tuple (group_keys,group_indices).
+    group_keys is a list of the unique key tuples in sorted order and group_indices is an array with the position in
+    group_keys of each row. The keys are found with numpy.unique so the rows are only sorted once per key column"""
+    unique_values=[]
+    key_codes=[]
+    for key_column in key_columns:
+        values,inverse=np.unique(np.asarray(key_column),return_inverse=True)
+        unique_values.append(values.tolist())
+        key_codes.append(inverse.reshape(-1))
+    if len(key_codes)==1:
+        return [(value,) for value in unique_values[0]],key_codes[0]
+    shape=[len(values) for values in unique_values]
+    unique_codes,group_indices=np.unique(np.ravel_multi_index(key_codes,shape),return_inverse=True)
+    group_keys=[tuple([unique_values[key_index][code] for key_index,code in enumerate(codes)])
+                for codes in zip(*np.unravel_index(unique_codes,shape))]
+    return group_keys,group_indices.reshape(-1)
+
+def reduce_groups(values,group_indices,number_groups=None,method="mean"):
+    """Reduces the numeric array values in each group given by group_indices (see get_group_indices) with method,
+    one of mean, median, geometric (mean), std, var, rms, rss or mad. Returns an array with a value for each group.
+    The values are sorted by group once and reduced with numpy.add.reduceat, std and var are population values as
+    in numpy.std and mad is scaled by MAD_SCALE"""
+    method=get_aggregate_method(method)
+    values=np.asarray(values)
+    group_indices=np.asarray(group_indices)
+    if number_groups is None:
+        number_groups=int(group_indices.max())+1
+    order=np.argsort(group_indices,kind='stable')
+    counts=np.bincount(group_indices,minlength=number_groups)
+    starts=np.concatenate(([0],np.cumsum(counts)[:-1]))
+
+    def group_sum(group_values):
+        return np.add.reduceat(group_values[order],starts)
+
+    def group_median(group_values):
+        sorted_values=group_values[np.lexsort((group_values,group_indices))]
+        return (sorted_values[starts+(counts-1)//2]+sorted_values[starts+counts//2])/2.
+
+    if method in ['mean']:
+        return group_sum(values)/counts
+    elif method in ['median']:
+        return group_median(values)
+    elif method in ['geometric']:
+        with np.errstate(invalid='ignore',divide='ignore'):
+            return np.exp(group_sum(np.log(values))/counts)
+    elif method in ['std','var']:
+        deviations=values-(group_sum(values)/counts)[group_indices]
+        variance=group_sum(np.abs(deviations)**2)/counts
+        if method in ['std']:
+            return np.sqrt(variance)
+        return variance
+    elif method in ['rms']:
+        return np.sqrt(group_sum(np.square(values.astype(np.float64)))/counts)
+    elif method in ['rss']:
+        return np.sqrt(group_sum(np.square(values.astype(np.float64))))
+    elif method in ['mad']:
+        medians=group_median(values)
+        return group_median(np.abs(values-medians[group_indices]))/MAD_SCALE
+
+def group_by_aggregate(rows,group_column_indices,method="mean"):
+    """Groups rows (a list of lists or ColumnarData) by the values in the columns group_column_indices and returns
+    a list of rows with the same columns, one for each group in sorted order of the group values. The numeric columns
+    are reduced with method (see reduce_groups) and the other columns have the value of the first row in the group.
+    ie group_by_aggregate(table.data,[0,1],"median") for a table with Frequency and Direction columns"""
+    if isinstance(group_column_indices,IntType):
+        group_column_indices=[group_column_indices]
+    if isinstance(rows,ColumnarData):
+        columns=rows.columns
+    elif len(rows)==0:
+        return []
+    else:
+        if isinstance(rows,MappedData):
+            rows=rows.tolist()
+        columns=[np.asarray(column) for column in zip(*rows)]
+    if len(columns)==0 or len(columns[0])==0:
+        return []
+    group_keys,group_indices=get_group_indices([columns[column_index] for column_index in group_column_indices])
+    number_groups=len(group_keys)
+    first_rows=None
+    out_columns=[]
+    for column_index,column in enumerate(columns):
+        if column_index in group_column_indices:
+            key_index=group_column_indices.index(column_index)
+            out_columns.append([group_key[key_index] for group_key in group_keys])
+        elif column.dtype.kind in ['b','i','u','f','c']:
+            out_columns.append(reduce_groups(column,group_indices,number_groups,method).tolist())
+        else:
+            if first_rows is None:
+                counts=np.bincount(group_indices,minlength=number_groups)
+                first_rows=np.argsort(group_indices,kind='stable')[np.concatenate(([0],np.cumsum(counts)[:-1]))]
+            out_columns.append(column[first_rows].tolist())
+    return [list(row) for row in zip(*out_columns)]
+
 def structure_metadata(header_string,metadata_fact_delimiter=";",metadata_key_value_delimiter="=",comment_character="#"):
     """Strucutre Metadata returns a metadata string and returns a metadata dictionary"""
     string_list=re.split(metadata_fact_delimiter+'|\n',header_string.replace(comment_character,''))
@@ -602,6 +1118,419 @@ class TypeConversionError(Exception):
     """An error in the conversion of rows with provided types"""
     pass
 
+class RunningStatistics(object):
+    """RunningStatistics accumulates the count, mean, variance (Welford's method), minimum and maximum of a stream of
+    values one value at a time. The values can be numbers or equal shaped numpy arrays, in which case the statistics
+    are element by element. Two accumulators can be combined with merge, so partial results can be built separately
+    and reduced at the end."""
+    def __init__(self):
+        self.count=0
+        self.mean=None
+        self.sum_squared_deviations=None
+        self.minimum=None
+        self.maximum=None
+
+    def update(self,value):
+        """Adds a single value (or array of values) to the statistics"""
+        if isinstance(value,(ListType,tuple)):
+            value=np.array(value)
+        self.count+=1
+        if self.count==1:
+            self.mean=value*1.0
+            self.sum_squared_deviations=value*0.0
+            self.minimum=value
+            self.maximum=value
+            return
+        delta=value-self.mean
+        self.mean=self.mean+delta/float(self.count)
+        self.sum_squared_deviations=self.sum_squared_deviations+delta*(value-self.mean)
+        self.minimum=np.minimum(self.minimum,value)
+        self.maximum=np.maximum(self.maximum,value)
+
+    def merge(self,other):
+        """Combines the statistics of another RunningStatistics into this one and returns self"""
+        if other.count==0:
+            return self
+        if self.count==0:
+            self.count=other.count
+            self.mean=other.mean
+            self.sum_squared_deviations=other.sum_squared_deviations
+            self.minimum=other.minimum
+            self.maximum=other.maximum
+            return self
+        count=self.count+other.count
+        delta=other.mean-self.mean
+        self.mean=self.mean+delta*other.count/float(count)
+        self.sum_squared_deviations=self.sum_squared_deviations+other.sum_squared_deviations+\
+                                    delta**2*self.count*other.count/float(count)
+        self.minimum=np.minimum(self.minimum,other.minimum)
+        self.maximum=np.maximum(self.maximum,other.maximum)
+        self.count=count
+        return self
+
+    def get_variance(self,ddof=1):
+        """Returns the variance, ddof=1 is the sample variance and ddof=0 the population variance"""
+        if self.count-ddof<=0:
+            return None
+        return self.sum_squared_deviations/float(self.count-ddof)
+
+    def get_standard_deviation(self,ddof=1):
+        """Returns the standard deviation, see get_variance"""
+        variance=self.get_variance(ddof)
+        if variance is None:
+            return None
+        return np.sqrt(variance)
+
+    def get_summary(self,ddof=1):
+        """Returns a dictionary with the count, mean, variance, std, min and max"""
+        return {"count":self.count,"mean":self.mean,"variance":self.get_variance(ddof),
+                "std":self.get_standard_deviation(ddof),"min":self.minimum,"max":self.maximum}
+
+class ColumnarRow(object):
+    """A view of a single row of a ColumnarData object, it behaves like the row list of a list of lists table
+    (row[1], row[1]=2.0, len(row), list(row)) but reads and writes directly into the column arrays"""
+    def __init__(self,columnar_data,row_index):
+        self.columnar_data=columnar_data
+        self.row_index=row_index
+
+    def __len__(self):
+        return len(self.columnar_data.columns)
+
+    def __getitem__(self, column_index):
+        if isinstance(column_index,slice):
+            return self.tolist()[column_index]
+        return native_value(self.columnar_data.columns[column_index][self.row_index])
+
+    def __setitem__(self, column_index, value):
+        self.columnar_data.columns[column_index][self.row_index]=value
+
+    def __iter__(self):
+        for column in self.columnar_data.columns:
+            yield native_value(column[self.row_index])
+
+    def __eq__(self, other):
+        return self.tolist()==list(other)
+
+    def __ne__(self, other):
+        return not self.__eq__(other)
+
+    def __repr__(self):
+        return repr(self.tolist())
+
+    def tolist(self):
+        """Returns the row as a python list"""
+        return [native_value(column[self.row_index]) for column in self.columnar_data.columns]
+
+class MappedLines(object):
+    """MappedLines is a read only list of the lines in a file that is memory mapped instead of read. Only the
+    offsets of the lines are kept in memory, lines[i] and lines[i:j] are decoded when they are asked for. It is used
+    in place of AsciiDataTable.lines when the option memory_map is True"""
+    def __init__(self,file_path,encoding='utf-8'):
+        self.path=file_path
+        self.encoding=encoding
+        file_in=open(file_path,'rb')
+        try:
+            self.mapped_file=mmap.mmap(file_in.fileno(),0,access=mmap.ACCESS_READ)
+        finally:
+            file_in.close()
+        self.offsets=get_line_offsets(self.mapped_file)
+
+    def __len__(self):
+        return len(self.offsets)-1
+
+    def get_line(self,line_index):
+        """Returns a single line as a string, line_index must be positive"""
+        line=self.mapped_file[int(self.offsets[line_index]):int(self.offsets[line_index+1])]
+        return line.decode(self.encoding).replace('\r\n','\n')
+
+    def __getitem__(self, line_index):
+        if isinstance(line_index,slice):
+            return [self.get_line(index) for index in range(*line_index.indices(len(self)))]
+        if line_index<0:
+            line_index=len(self)+line_index
+        if line_index<0 or line_index>=len(self):
+            raise IndexError("MappedLines index out of range")
+        return self.get_line(line_index)
+
+    def __iter__(self):
+        for line_index in range(len(self)):
+            yield self.get_line(line_index)
+
+    def close(self):
+        """Closes the memory map"""
+        self.mapped_file.close()
+
+class MappedData(object):
+    """MappedData is the read only storage for AsciiDataTable.data when a table is opened with memory_map=True.
+    It holds the MappedLines of the file and the first and last data line, and a row is only stripped of its tokens,
+    split and converted when it is accessed (data[i], data[i:j], for row in data). Memory use is proportional to the
+    rows asked for, not to the size of the file. Use AsciiDataTable.load_data() to read all of the rows into
+    memory before changing the table"""
+    def __init__(self,lines,begin_line=None,end_line=None,options=None):
+        self.lines=lines
+        if options is None:
+            options={}
+        self.options=options
+        if begin_line is None:
+            begin_line=0
+        if end_line is None:
+            end_line=len(lines)
+        elif end_line<0:
+            end_line=len(lines)+end_line
+        self.begin_line=begin_line
+        self.end_line=min(end_line,len(lines))
+        # begin and end tokens on lines of their own are not rows
+        self.remove_tokens=[]
+        for token in [self.options.get("data_begin_token"),self.options.get("data_end_token")]:
+            if token:
+                token=token.replace('\n','')
+                if token:
+                    self.remove_tokens.append(token)
+        if self.remove_tokens:
+            if self.end_line>self.begin_line and self.strip_data_tokens(lines[self.begin_line]).strip()=="":
+                self.begin_line+=1
+            if self.end_line>self.begin_line and self.strip_data_tokens(lines[self.end_line-1]).strip()=="":
+                self.end_line-=1
+
+    def strip_data_tokens(self,line):
+        """Removes the data begin and end tokens from a line"""
+        for token in self.remove_tokens:
+            line=line.replace(token,"")
+        return line
+
+    def parse_rows(self,row_list):
+        """Converts a list of lines into a list of rows using the table options"""
+        if self.remove_tokens:
+            row_list=[self.strip_data_tokens(row) for row in row_list]
+        if self.options.get("row_begin_token") is None and self.options.get("row_end_token") is None \
+                and self.options.get("escape_character") is None:
+            fast_rows=parse_numeric_rows(row_list,delimiter=self.options.get("data_delimiter"),
+                                         column_types=self.options.get("column_types"))
+            if fast_rows is not None:
+                return fast_rows
+        row_list=strip_all_line_tokens(row_list,begin_token=self.options.get("row_begin_token"),
+                                       end_token=self.options.get("row_end_token"))
+        row_list=split_all_rows(row_list,delimiter=self.options.get("data_delimiter"),
+                                escape_character=self.options.get("escape_character"))
+        return convert_all_rows(row_list,self.options.get("column_types"))
+
+    def __len__(self):
+        return max(self.end_line-self.begin_line,0)
+
+    def __getitem__(self, row_index):
+        if isinstance(row_index,slice):
+            row_begin,row_end,step=row_index.indices(len(self))
+            rows=self.parse_rows(self.lines[self.begin_line+row_begin:self.begin_line+row_end])
+            if step!=1:
+                rows=rows[::step]
+            return rows
+        if row_index<0:
+            row_index=len(self)+row_index
+        if row_index<0 or row_index>=len(self):
+            raise IndexError("MappedData row index out of range")
+        return self.parse_rows([self.lines[self.begin_line+row_index]])[0]
+
+    def iter_chunks(self,chunk_size=65536):
+        """Yields the rows as lists of at most chunk_size rows"""
+        for row_begin in range(0,len(self),chunk_size):
+            yield self[row_begin:row_begin+chunk_size]
+
+    def __iter__(self):
+        for chunk in self.iter_chunks():
+            for row in chunk:
+                yield row
+
+    def get_column(self,column_index,chunk_size=65536):
+        """Returns a column as a list, rows are parsed chunk_size at a time"""
+        out_list=[]
+        for chunk in self.iter_chunks(chunk_size):
+            out_list.extend([row[column_index] for row in chunk])
+        return out_list
+
+    def __eq__(self, other):
+        if isinstance(other,(MappedData,ColumnarData)):
+            other=other.tolist()
+        try:
+            return self.tolist()==[list(row) for row in other]
+        except TypeError:
+            return False
+
+    def __ne__(self, other):
+        return not self.__eq__(other)
+
+    def __repr__(self):
+        return "<MappedData {0} rows of {1}>".format(len(self),self.lines.path)
+
+    def tolist(self):
+        """Returns all of the rows as a list of lists"""
+        return self[:]
+
+class ColumnarData(object):
+    """ColumnarData is a column major storage engine for AsciiDataTable.data. Each column is a single numpy array
+    with a dtype determined by column_types (int->int64, float->float64, complex->complex128, anything else is an
+    object array). It keeps the list of lists behavior that the rest of pyMez expects (len(data), data[i][j],
+    data.append(row), data.pop(i), for row in data) while letting column operations be done on whole arrays."""
+    def __init__(self,rows=None,column_types=None,columns=None):
+        """Creates the storage from a list of rows (list of lists) or a list of column arrays/lists"""
+        if isinstance(column_types,(ListType,tuple)):
+            column_types=list(column_types)
+        self.column_types=column_types
+        if columns is not None:
+            column_lists=columns
+        elif rows:
+            column_lists=[list(column) for column in zip(*[list(row) for row in rows])]
+        else:
+            column_lists=[]
+        self.columns=[]
+        for index,column in enumerate(column_lists):
+            self.columns.append(column_to_array(column,self.get_column_type(index)))
+        # over allocated arrays that append writes into, self.columns are views of them
+        self.buffers=None
+
+    def get_column_type(self,column_index):
+        """Returns the column type string for column_index or None if it is not defined"""
+        try:
+            return self.column_types[column_index]
+        except:
+            return None
+
+    def __len__(self):
+        if not self.columns:
+            return 0
+        return len(self.columns[0])
+
+    def __getitem__(self, row_index):
+        if isinstance(row_index,slice):
+            if not self.columns:
+                return []
+            return [list(row) for row in zip(*[column[row_index].tolist() for column in self.columns])]
+        if row_index<0:
+            row_index=len(self)+row_index
+        if row_index<0 or row_index>=len(self):
+            raise IndexError("ColumnarData row index out of range")
+        return ColumnarRow(self,row_index)
+
+    def __setitem__(self, row_index, row_data):
+        row_data=list(row_data)
+        if len(row_data)!=len(self.columns):
+            raise DataDimensionError('The dim {0} is not equal to {1}'.format(len(row_data),len(self.columns)))
+        for column_index,value in enumerate(row_data):
+            self.columns[column_index][row_index]=value
+
+    def __delitem__(self, row_index):
+        self.pop(row_index)
+
+    def __iter__(self):
+        for row_index in range(len(self)):
+            yield ColumnarRow(self,row_index)
+
+    def __eq__(self, other):
+        if isinstance(other,ColumnarData):
+            other=other.tolist()
+        try:
+            return self.tolist()==[list(row) for row in other]
+        except TypeError:
+            return False
+
+    def __ne__(self, other):
+        return not self.__eq__(other)
+
+    def __repr__(self):
+        return repr(self.tolist())
+
+    def append(self,row_data):
+        """Adds a row to the end of the table"""
+        row_data=list(row_data)
+        if not self.columns:
+            self.columns=[column_to_array([value],self.get_column_type(index))
+                          for index,value in enumerate(row_data)]
+            return
+        if len(row_data)!=len(self.columns):
+            raise DataDimensionError('The dim {0} is not equal to {1}'.format(len(row_data),len(self.columns)))
+        row_index=len(self)
+        if not self.has_capacity():
+            # the buffers grow geometrically so that appending n rows is O(n) instead of O(n**2)
+            capacity=max(2*row_index,16)
+            self.buffers=[]
+            for column in self.columns:
+                buffer=np.empty(capacity,dtype=column.dtype)
+                buffer[:row_index]=column
+                self.buffers.append(buffer)
+        for column_index,value in enumerate(row_data):
+            buffer=self.buffers[column_index]
+            buffer[row_index]=value
+            self.columns[column_index]=buffer[:row_index+1]
+
+    def has_capacity(self):
+        """Returns True if every column is a view of the start of its append buffer and the buffers have room for
+        another row. Any method that replaces the column arrays makes this False so the buffers are rebuilt"""
+        buffers=getattr(self,"buffers",None)
+        if not buffers or len(buffers)!=len(self.columns):
+            return False
+        for column,buffer in zip(self.columns,buffers):
+            if column.base is not buffer or len(buffer)<=len(column) or \
+                    column.__array_interface__["data"][0]!=buffer.__array_interface__["data"][0]:
+                return False
+        return True
+
+    def extend(self,rows):
+        """Adds a list of rows to the end of the table"""
+        new_data=ColumnarData(rows=rows,column_types=self.column_types)
+        if not self.columns:
+            self.columns=new_data.columns
+        else:
+            for column_index,column in enumerate(new_data.columns):
+                self.columns[column_index]=np.concatenate([self.columns[column_index],
+                                                           column.astype(self.columns[column_index].dtype)])
+
+    def insert(self,row_index,row_data):
+        """Inserts a row before row_index"""
+        row_data=list(row_data)
+        for column_index,value in enumerate(row_data):
+            self.columns[column_index]=np.insert(self.columns[column_index],row_index,
+                                                 column_to_array([value],self.columns[column_index].dtype))
+
+    def pop(self,row_index=-1):
+        """Removes and returns the row at row_index as a list"""
+        row=self[row_index].tolist()
+        if row_index<0:
+            row_index=len(self)+row_index
+        self.columns=[np.delete(column,row_index) for column in self.columns]
+        return row
+
+    def add_column(self,column_data,column_type=None,column_index=None):
+        """Adds a column array, at the end or before column_index"""
+        if self.columns and len(column_data)!=len(self):
+            raise DataDimensionError('The dim {0} is not equal to {1}'.format(len(column_data),len(self)))
+        new_column=column_to_array(column_data,column_type)
+        if column_index is None:
+            self.columns.append(new_column)
+        else:
+            self.columns.insert(column_index,new_column)
+        if self.column_types is not None:
+            if column_index is None:
+                self.column_types=list(self.column_types)+[column_type]
+            else:
+                self.column_types=list(self.column_types)
+                self.column_types.insert(column_index,column_type)
+
+    def remove_column(self,column_index):
+        """Removes the column at column_index and returns the array"""
+        if self.column_types is not None:
+            self.column_types=list(self.column_types)
+            self.column_types.pop(column_index)
+        return self.columns.pop(column_index)
+
+    def get_column(self,column_index):
+        """Returns the column array at column_index, this is not a copy"""
+        return self.columns[column_index]
+
+    def tolist(self):
+        """Returns the data as a list of lists"""
+        if not self.columns:
+            return []
+        return [list(row) for row in zip(*[column.tolist() for column in self.columns])]
+
 class AsciiDataTable(object):
     """ An AsciiDatable is a generalized model of a data table with optional header,
     column names,rectangular array of data, and footer """
@@ -662,6 +1591,8 @@ class AsciiDataTable(object):
                   "open_with_schema":True,
                   "use_alternative_parser":True,
                   "validate":False,
+                  "columnar_storage":False,
+                  "memory_map":False,
                   }
         #some of the options have the abiltiy to confilct with each other, so there has to be a
         #built-in way to determine the precedence of each option, for import lines first, then begin and then end
@@ -671,6 +1602,8 @@ class AsciiDataTable(object):
         for key,value in options.items():
             self.options[key]=value
         self.elements=['header','column_names','data','footer','inline_comments','metadata']
+        # column indexes {column_name:{value:[row positions]}} are created with create_index
+        self.column_indexes={}
         #Define Method Aliases if they are available
         #unqualified exec is not allowed in function '__init__' because it contains a nested function with free variables
         # This is because __init__ has nested functions
@@ -733,6 +1666,10 @@ class AsciiDataTable(object):
                     new_options=read_schema(change_extension(file_path,new_extension="schema"))
                     for key,value in new_options.items():
                         self.options[key]=value
+                    # how the table is stored in memory is not part of the file format
+                    for key in ["columnar_storage","memory_map"]:
+                        if key in options:
+                            self.options[key]=options[key]
             except:
                 pass
 
@@ -751,12 +1688,15 @@ class AsciiDataTable(object):
                     import_table.append(import_row)
                 elif item in ['inline_comments']:
                     self.inline_comments=self.options['inline_comments']
-            file_in=open(file_path,'r')
             # in order to parse the file we need to know line #'s, once we deduce them we use __parse__
-            self.lines=[]
-            for line in file_in:
-                self.lines.append(line)
-            file_in.close()
+            if self.options["memory_map"] and os.path.getsize(file_path)>0:
+                self.lines=MappedLines(file_path)
+            else:
+                file_in=open(file_path,'r')
+                self.lines=[]
+                for line in file_in:
+                    self.lines.append(line)
+                file_in.close()
             self.path=file_path
             if self.lines_defined():
                 self.__parse__()
@@ -834,6 +1774,7 @@ class AsciiDataTable(object):
                                     self.column_names =self. pandas_data_frame.columns.tolist()[:]
                                     self.data = self.pandas_data_frame.as_matrix().tolist()[:]
                                     self.options["column_types"] = [str(x) for x in self.pandas_data_frame.dtypes.tolist()[:]]
+                                    self.update_storage()
                                 except:
                                     print("FAILED to import file!")
                                     raise
@@ -908,6 +1849,11 @@ class AsciiDataTable(object):
             if element not in ['inline_comments','metadata'] and self.__dict__[element] is not None :
                 try:
                     if not None in [self.options['%s_begin_line'%element]]:
+                        if element in ['data'] and isinstance(self.lines,MappedLines):
+                            # the data rows are left in the file until they are accessed
+                            self.data=MappedData(self.lines,self.options['data_begin_line'],
+                                                 self.options['data_end_line'],self.options)
+                            continue
                         content_list=self.lines[
                                             self.options['%s_begin_line'%element]:self.options['%s_end_line'%element]]
                         self.__dict__[element]=content_list
@@ -917,6 +1863,8 @@ class AsciiDataTable(object):
         # Remove any defined begin and end tokens
         for index,element in enumerate(self.elements):
             if element not in ["inline_comments","metadata"] and self.__dict__[element] is not None:
+                        if isinstance(self.__dict__[element],MappedData):
+                            continue
                         for index,line in enumerate(self.__dict__[element]):
                             self.__dict__[element][index]=line
 
@@ -964,15 +1912,29 @@ class AsciiDataTable(object):
                 self.column_names[index]=line.replace('\n',"")
             # print("The result of parsing is self.{0} = {1}".format('column_names',self.column_names))
         # parse the data
-        if self.data is not None:
-            self.data=strip_all_line_tokens(self.data,begin_token=self.options["row_begin_token"],
-                                            end_token=self.options["row_end_token"])
-            #print("The result of parsing is self.{0} = {1}".format('data',self.data))
-            self.data=split_all_rows(self.data,delimiter=self.options["data_delimiter"],
-                                     escape_character=self.options["escape_character"])
-            #print("The result of parsing is self.{0} = {1}".format('data',self.data))
-            self.data=convert_all_rows(self.data,self.options["column_types"])
-            #print("The result of parsing is self.{0} = {1}".format('data',self.data))
+        if self.data is not None and not isinstance(self.data,MappedData):
+            fast_data=None
+            # the common case of a numeric table with no row tokens is tokenized and converted in one pass
+            if self.options["row_begin_token"] is None and self.options["row_end_token"] is None \
+                    and self.options["escape_character"] is None:
+                if self.options["columnar_storage"]:
+                    output='columnar'
+                else:
+                    output='list_list'
+                fast_data=parse_numeric_rows(self.data,delimiter=self.options["data_delimiter"],
+                                             column_types=self.options["column_types"],output=output)
+            if fast_data is not None:
+                self.data=fast_data
+            else:
+                self.data=strip_all_line_tokens(self.data,begin_token=self.options["row_begin_token"],
+                                                end_token=self.options["row_end_token"])
+                #print("The result of parsing is self.{0} = {1}".format('data',self.data))
+                self.data=split_all_rows(self.data,delimiter=self.options["data_delimiter"],
+                                         escape_character=self.options["escape_character"])
+                #print("The result of parsing is self.{0} = {1}".format('data',self.data))
+                self.data=convert_all_rows(self.data,self.options["column_types"])
+                #print("The result of parsing is self.{0} = {1}".format('data',self.data))
+            self.update_storage()
         # parse the footer
         if self.footer is not None:
             #print("The {0} variable is {1}".format('self.footer',self.footer))
@@ -1013,14 +1975,20 @@ class AsciiDataTable(object):
     def update_index(self):
         """ Updates the index column if it exits, otherwise exits quietly
         """
+        self.load_data()
         if 'index' not in self.column_names:
             return
         else:
             try:
                 #This should be 0 but just in case
                 index_column_number=self.column_names.index('index')
-                for i in range(len(self.data)):
-                    self.data[i][index_column_number]=i
+                if isinstance(self.data,ColumnarData):
+                    self.data.columns[index_column_number]=np.arange(len(self.data))
+                else:
+                    for i in range(len(self.data)):
+                        self.data[i][index_column_number]=i
+                if 'index' in getattr(self,"column_indexes",{}):
+                    self.create_index('index')
             except:
                 pass
 
@@ -1028,6 +1996,7 @@ class AsciiDataTable(object):
         """Updates the model after a change has been made. If you add anything to the attributes of the model,
         or change this updates the values. If the model has an index column it will make sure the numbers are correct.
         In addition, it will update the options dictionary to reflect added rows, changes in deliminators etc.  """
+        self.load_data()
         if self.column_names is not None and 'index' in self.column_names:
            self.update_index()
         #make sure there are no "\n" characters in the element lists (if so replace them with "") for data this is
@@ -1039,11 +2008,38 @@ class AsciiDataTable(object):
                     if isinstance(self.__dict__[element][index], StringType):
                         self.__dict__[element][index]=item.replace("\n","")
         self.update_column_names()
-        if self.data is not None:
+        if isinstance(self.data,ColumnarData):
+            if not self.options["columnar_storage"]:
+                self.data=convert_all_rows(self.data.tolist(),self.options["column_types"])
+        elif self.data is not None:
             self.data=convert_all_rows(self.data,self.options["column_types"])
+            self.update_storage()
+        self.update_column_indexes()
         self.string=self.build_string()
         self.lines=self.string.splitlines()
 
+    def load_data(self):
+        """Reads all of the rows of a table opened with memory_map=True into memory, after this the table
+        can be changed. Does nothing for tables that are already in memory"""
+        if isinstance(self.data,MappedData):
+            self.data=self.data.tolist()
+            self.update_storage()
+
+    def update_storage(self):
+        """Stores self.data as a ColumnarData object (one numpy array per column typed by column_types) if
+        self.options["columnar_storage"] is True, otherwise as a list of lists. The public methods behave the same
+        for both"""
+        try:
+            columnar_storage=self.options["columnar_storage"]
+        except KeyError:
+            columnar_storage=False
+        if self.data is None or isinstance(self.data,(StringType,MappedData)):
+            return
+        if columnar_storage and not isinstance(self.data,ColumnarData):
+            self.data=ColumnarData(rows=self.data,column_types=self.options["column_types"])
+        elif not columnar_storage and isinstance(self.data,ColumnarData):
+            self.data=self.data.tolist()
+
     def update_column_names(self):
         """Update column names adds the value x# for any column that exists in self.data that is not named"""
         if self.data is None:
@@ -1066,15 +2062,19 @@ class AsciiDataTable(object):
     def save(self,path=None,**temp_options):
         """" Saves the file, to save in another ascii format specify elements in temp_options, the options
         specified do not permanently change the object's options. If path is supplied it saves the file to that path
-        otherwise uses the object's attribute path to define the saving location """
+        otherwise uses the object's attribute path to define the saving location. Unless there are inline comments
+        the table is written to the file in chunks as it is formatted instead of being built as one string first"""
         original_options=self.options
         for key,value in temp_options.items():
             self.options[key]=value
-        out_string=self.build_string(**temp_options)
         if path is None:
             path=self.path
         file_out=open(path,'w')
-        file_out.write(out_string)
+        if self.inline_comments is None and type(self).build_string is AsciiDataTable.build_string:
+            for string_chunk in self.build_string_chunks(**temp_options):
+                file_out.write(string_chunk)
+        else:
+            file_out.write(self.build_string(**temp_options))
         file_out.close()
         if self.options["save_schema"]:
             self.save_schema(change_extension(path,new_extension="schema"))
@@ -1085,6 +2085,25 @@ class AsciiDataTable(object):
         Passing temp_options does not permanently change the model"""
         # store the original options to be put back after the string is made
         original_options=self.options
+        string_out="".join(self.build_string_chunks(**temp_options))
+        if self.inline_comments is None:
+            pass
+        else:
+            lines=string_out.splitlines()
+            for comment in self.inline_comments:
+                lines=insert_inline_comment(lines,comment=comment[0],line_number=comment[1],
+                                            string_position=comment[2],
+                                            begin_token=self.options['inline_comment_begin'],
+                                            end_token=self.options['inline_comment_end'])
+            string_out=string_list_collapse(lines,string_delimiter='\n')
+        self.options=original_options
+        return string_out
+
+    def build_string_chunks(self,**temp_options):
+        """Generator that yields the string representation of the data table (without inline comments) in pieces,
+        the data element is yielded in blocks of rows. The begin and end line options are set as in build_string,
+        the data end line is counted as the data is yielded"""
+        original_options=self.options
         for key,value in temp_options.items():
             self.options[key]=value
         section_end=0
@@ -1094,7 +2113,6 @@ class AsciiDataTable(object):
         else:
             # if header does not end in "\n" and
             inner_element_spacing=self.options['data_table_element_separator'].count('\n')
-        string_out=""
         between_section=""
         if self.options['data_table_element_separator'] is not None:
             between_section=self.options['data_table_element_separator']
@@ -1103,21 +2121,19 @@ class AsciiDataTable(object):
             pass
         else:
             self.options["header_begin_line"]=0
+            header_string=self.get_header_string()
             if self.data is None and self.column_names is None and self.footer is None:
-                string_out=self.get_header_string()
+                yield header_string
                 self.options["header_end_line"]=None
             else:
-                string_out=self.get_header_string()+between_section
-                #print("{0} is {1}".format("self.get_header_string()",self.get_header_string()))
-                header_end=self.get_header_string()[-1]
-                #print("{0} is {1}".format("header_end",header_end))
+                yield header_string+between_section
+                header_end=header_string[-1]
                 if header_end in ["\n"]:
                     adjust_header_lines=0
                 else:
                     adjust_header_lines=1
                 # I think this is wrong If header string ends in an "\n" fixed for now
-                inner_element_spacing=inner_element_spacing
-                last_header_line=self.get_header_string().count('\n')+adjust_header_lines
+                last_header_line=header_string.count('\n')+adjust_header_lines
                 self.options["header_end_line"]=last_header_line
                 next_section_begin=last_header_line+inner_element_spacing-adjust_header_lines
 
@@ -1126,18 +2142,18 @@ class AsciiDataTable(object):
             pass
         else:
             self.options["column_names_begin_line"]=next_section_begin
+            column_names_string=self.get_column_names_string()
             if self.data is None and self.footer is None:
                 self.options["column_names_end_line"]=None
-                string_out=string_out+self.get_column_names_string()
+                yield column_names_string
             else:
-                string_out=string_out+self.get_column_names_string()+between_section
-                column_names_end=self.get_column_names_string()[-1]
-                #print("{0} is {1}".format("column_names_end",column_names_end))
+                yield column_names_string+between_section
+                column_names_end=column_names_string[-1]
                 if column_names_end in ["\n"]:
                     adjust_column_names_lines=0
                 else:
                     adjust_column_names_lines=1
-                last_column_names_line=self.get_column_names_string().count('\n')+\
+                last_column_names_line=column_names_string.count('\n')+\
                                        self.options["column_names_begin_line"]+adjust_column_names_lines
                 self.options["column_names_end_line"]=last_column_names_line
                 next_section_begin=last_column_names_line+inner_element_spacing-adjust_column_names_lines
@@ -1148,17 +2164,22 @@ class AsciiDataTable(object):
             self.options["data_begin_line"]=next_section_begin
             if self.footer is None:
                 self.options["data_end_line"]=None
-                string_out=string_out+self.get_data_string()
+                for data_chunk in self.get_data_string_chunks():
+                    yield data_chunk
             else:
-                string_out=string_out+self.get_data_string()+between_section
-                data_end=self.get_data_string()[-1]
-                #print("{0} is {1}".format("column_names_end",column_names_end))
+                data_line_count=0
+                data_end=""
+                for data_chunk in self.get_data_string_chunks():
+                    if data_chunk:
+                        data_line_count+=data_chunk.count("\n")
+                        data_end=data_chunk[-1]
+                        yield data_chunk
+                yield between_section
                 if data_end in ["\n"]:
                     adjust_data_lines=0
                 else:
                     adjust_data_lines=1
-                last_data_line=self.get_data_string().count("\n")+\
-                                self.options["data_begin_line"]+adjust_data_lines
+                last_data_line=data_line_count+self.options["data_begin_line"]+adjust_data_lines
                 self.options["data_end_line"]=last_data_line
                 next_section_begin=last_data_line+inner_element_spacing-adjust_data_lines
         if not self.footer:
@@ -1166,21 +2187,10 @@ class AsciiDataTable(object):
             pass
         else:
             self.options["footer_begin_line"]=next_section_begin
-            string_out=string_out+self.get_footer_string()
+            yield self.get_footer_string()
             self.options['footer_end_line']=None
         # set the options back after the string has been made
-        if self.inline_comments is None:
-            pass
-        else:
-            lines=string_out.splitlines()
-            for comment in self.inline_comments:
-                lines=insert_inline_comment(lines,comment=comment[0],line_number=comment[1],
-                                            string_position=comment[2],
-                                            begin_token=self.options['inline_comment_begin'],
-                                            end_token=self.options['inline_comment_end'])
-            string_out=string_list_collapse(lines,string_delimiter='\n')
         self.options=original_options
-        return string_out
 
     def get_header_string(self):
         """Returns the header using options in self.options. If block comment is specified, and the header is a
@@ -1304,60 +2314,63 @@ class AsciiDataTable(object):
         "Returns the data as a string"
         #Todo:refactor to cut out unused lines
         string_out=""
-        if self.data is None:
+        data=self.data
+        if isinstance(data,(ColumnarData,MappedData)):
+            data=data.tolist()
+        if data is None:
             string_out= ""
         else:
-            if isinstance(self.data, StringType):
+            if isinstance(data, StringType):
                 if self.options['data_begin_token'] is None:
                        if self.options['data_end_token'] is None:
-                           string_out=self.data
+                           string_out=data
                        else:
-                           if re.search(self.options['data_end_token'],self.data):
-                               string_out=self.data
+                           if re.search(self.options['data_end_token'],data):
+                               string_out=data
                            else:
-                               string_out=self.data+self.options['data_end_token']
+                               string_out=data+self.options['data_end_token']
                 else:
                         if self.options['data_end_token'] is None:
-                            if re.match(self.options['data_begin_token'],self.data):
-                                string_out=self.data
+                            if re.match(self.options['data_begin_token'],data):
+                                string_out=data
                             else:
-                                string_out=self.options['data_begin_token']+self.data
-            elif isinstance(self.data,(ListType,np.ndarray)):
+                                string_out=self.options['data_begin_token']+data
+            elif isinstance(data,(ListType,np.ndarray)):
                 try:
                         #If the first row is a string, we should strip all the tokens and add them back in
-                        if isinstance(self.data[0], StringType):
+                        if isinstance(data[0], StringType):
                             if self.options['data_begin_token'] is None:
-                                string_out=string_list_collapse(self.data)
+                                string_out=string_list_collapse(data)
                             else:
-                                if re.match(self.options['data_begin_token'],self.data[0]):
+                                if re.match(self.options['data_begin_token'],data[0]):
                                     if self.options['data_end_token'] is None:
-                                        string_out=string_list_collapse(self.data)
+                                        string_out=string_list_collapse(data)
                                     else:
-                                        if re.search(self.options['data_end_token'],self.data[-1]):
-                                            string_out=string_list_collapse(self.data)
+                                        if re.search(self.options['data_end_token'],data[-1]):
+                                            string_out=string_list_collapse(data)
                                         else:
-                                            string_out=string_list_collapse(self.data)+self.options['data_end_token']
+                                            string_out=string_list_collapse(data)+self.options['data_end_token']
                                 else:
                                     if self.options['data_end_token'] is None:
-                                        string_out=self.options['data_begin_token']+string_list_collapse(self.data)
+                                        string_out=self.options['data_begin_token']+string_list_collapse(data)
                                     else:
-                                        if re.search(self.options['data_end_token'],self.data[-1]):
-                                            string_out=self.options['data_begin_token']+string_list_collapse(self.data)
+                                        if re.search(self.options['data_end_token'],data[-1]):
+                                            string_out=self.options['data_begin_token']+string_list_collapse(data)
                                         else:
                                             string_out=self.options['data_begin_token']+\
-                                                       string_list_collapse(self.data)+\
+                                                       string_list_collapse(data)+\
                                                        self.options['data_end_token']
 
-                        elif isinstance(self.data[0],(ListType,np.ndarray)):
+                        elif isinstance(data[0],(ListType,np.ndarray)):
                             prefix=""
                             if self.options['data_begin_token'] is None:
                                 if self.options['data_end_token'] is None:
-                                    string_out=list_list_to_string(self.data,data_delimiter=self.options['data_delimiter'],
+                                    string_out=list_list_to_string(data,data_delimiter=self.options['data_delimiter'],
                                                                    row_formatter_string=self.options['row_formatter_string'],
                                                                    line_begin=self.options["row_begin_token"],
                                                                    line_end=self.options["row_end_token"])
                                 else:
-                                    string_out=list_list_to_string(self.data,data_delimiter=self.options['data_delimiter'],
+                                    string_out=list_list_to_string(data,data_delimiter=self.options['data_delimiter'],
                                                                    row_formatter_string=self.options['row_formatter_string'],
                                                                    line_begin=self.options["row_begin_token"],
                                                                    line_end=self.options["row_end_token"])+\
@@ -1365,14 +2378,14 @@ class AsciiDataTable(object):
                             else:
                                 if self.options['data_end_token'] is None:
                                     string_out=self.options['data_begin_token']+\
-                                               list_list_to_string(self.data,
+                                               list_list_to_string(data,
                                                                    data_delimiter=self.options['data_delimiter'],
                                                                    row_formatter_string=self.options['row_formatter_string'],
                                                                    line_begin=self.options["row_begin_token"],
                                                                    line_end=self.options["row_end_token"])
                                 else:
                                     string_out=self.options['data_begin_token']+\
-                                               list_list_to_string(self.data,
+                                               list_list_to_string(data,
                                                                    data_delimiter=self.options['data_delimiter'],
                                                                    row_formatter_string=\
                                                                    self.options['row_formatter_string'],
@@ -1380,7 +2393,7 @@ class AsciiDataTable(object):
                                                                    line_end=self.options["row_end_token"])+\
                                                                     self.options['data_end_token']
                         else:
-                            string_out=list_to_string(self.data,
+                            string_out=list_to_string(data,
                                                       data_delimiter=self.options['data_delimiter'],
                                                       row_formatter_string=self.options['row_formatter_string'],
                                                       begin=self.options["row_begin_token"],
@@ -1389,11 +2402,47 @@ class AsciiDataTable(object):
                 except IndexError:
                     pass
             else:
-                string_out=ensure_string(self.data)
+                string_out=ensure_string(data)
         if string_out[-1] not in ["\n"] and self.footer is not None and self.options["data_table_element_separator"] is None:
             string_out=string_out+"\n"
         return string_out
 
+    def get_data_string_chunks(self,chunk_size=10000):
+        """Generator that yields the data as strings of chunk_size rows, joined the chunks equal get_data_string.
+        Data that is not a list of rows is yielded as a single string"""
+        data=self.data
+        if not isinstance(data,(ColumnarData,MappedData)):
+            if not isinstance(data,(ListType,np.ndarray)) or len(data)==0 or \
+                    not isinstance(data[0],(ListType,np.ndarray)):
+                yield self.get_data_string()
+                return
+        if self.options['data_begin_token'] is None:
+            data_begin=""
+        else:
+            data_begin=self.options['data_begin_token']
+        if self.options['data_end_token'] is None:
+            data_end=""
+        else:
+            data_end=self.options['data_end_token']
+        last_character=""
+        if data_begin:
+            last_character=data_begin[-1]
+            yield data_begin
+        for string_chunk in iter_list_list_strings(data,data_delimiter=self.options['data_delimiter'],
+                                                   row_formatter_string=self.options['row_formatter_string'],
+                                                   line_begin=self.options["row_begin_token"],
+                                                   line_end=self.options["row_end_token"],
+                                                   chunk_size=chunk_size):
+            if string_chunk:
+                last_character=string_chunk[-1]
+                yield string_chunk
+        if data_end:
+            last_character=data_end[-1]
+            yield data_end
+        if last_character not in ["\n"] and self.footer is not None and \
+                self.options["data_table_element_separator"] is None:
+            yield "\n"
+
     def get_footer_string(self):
         """Returns the footer using options in self.options. If block comment is specified, and the footer is a
         list it will block comment out the footer. If comment_begin and comment_end are specified it will use
@@ -1604,8 +2653,9 @@ class AsciiDataTable(object):
         return output
 
     def add_row(self,row_data):
-        """Adds a single row given row_data which can be an ordered list/tuple or a dictionary with
-        column names as keys"""
+        """Adds a single row given row_data which can be an ordered list/tuple/row of another table or a
+        dictionary with column names as keys"""
+        self.load_data()
         if self.data is None:
             self.data=[]
         if len(row_data) not in [len(self.column_names),len(self.column_names)]:
@@ -1616,10 +2666,19 @@ class AsciiDataTable(object):
         elif isinstance(row_data,DictionaryType):
             data_list=[row_data[column_name] for column_name in self.column_names]
             self.data.append(data_list)
+        else:
+            # tuples and ColumnarRow views of another table are copied into a list
+            self.data.append(list(row_data))
+        if getattr(self,"column_indexes",None):
+            row_position=len(self.data)-1
+            for column_name,column_index in self.column_indexes.items():
+                value=native_value(self.data[row_position][self.column_names.index(column_name)])
+                column_index.setdefault(value,[]).append(row_position)
 
     def remove_row(self,row_index):
         """Removes the row specified by row_index and updates the model. Note index is relative to the
         data attribute so to remove the first row use row_index=0 and the last data row is row_index=-1"""
+        self.load_data()
         self.data.pop(row_index)
         self.update_model()
 
@@ -1627,13 +2686,19 @@ class AsciiDataTable(object):
         """Adds a column with column_name, and column_type. If column data is supplied and it's length is the
         same as data(same number of rows) then it is added, else self.options['empty_character'] is added in each
         spot in the preceding rows"""
+        self.load_data()
         original_column_names=self.column_names[:]
         try:
             self.column_names=original_column_names+[column_name]
             if self.options["column_types"]:
                 old_column_types=self.options["column_types"][:]
                 self.options["column_types"]=old_column_types+[column_type]
-            if len(column_data) == len(self.data):
+            if isinstance(self.data,ColumnarData) and len(column_data) != len(self.data):
+                # padding with empty values is done row by row
+                self.data=self.data.tolist()
+            if isinstance(self.data,ColumnarData):
+                self.data.add_column(column_data,column_type=column_type)
+            elif len(column_data) == len(self.data):
                 for index,row in enumerate(self.data[:]):
                     #print("{0} is {1}".format('self.data[index]',self.data[index]))
                     #print("{0} is {1}".format('row',row))
@@ -1656,6 +2721,8 @@ class AsciiDataTable(object):
                                                                  '{delimiter}'+"{"+str(len(self.column_names)-1)+"}"
                 else:
                     self.options["row_formatter_string"]=self.options["row_formatter_string"]+format_string
+            self.update_storage()
+            self.update_column_indexes()
             #self.update_model()
         except:
             self.column_names=original_column_names
@@ -1665,6 +2732,7 @@ class AsciiDataTable(object):
     def remove_column(self,column_name=None,column_index=None):
         """Removes the column specified by column_name or column_index and updates the model. The column is removed from
         column_names, data and if present column_types, column_descriptions and row formatter"""
+        self.load_data()
         if self.column_names:
             number_of_columns=len(self.column_names[:])
         elif self.data:
@@ -1680,8 +2748,11 @@ class AsciiDataTable(object):
         #print("{0} is {1}".format("column_index",column_index))
         #print("{0} is {1}".format("type(column_index)",type(column_index)))
         self.column_names.pop(column_index)
-        for row in self.data:
-            row.pop(column_index)
+        if isinstance(self.data,ColumnarData):
+            self.data.remove_column(column_index)
+        else:
+            for row in self.data:
+                row.pop(column_index)
         if self.options["row_formatter_string"]:
             format_string="{"+str(column_index)+"}"+"{delimiter}"
             self.options["row_formatter_string"]=\
@@ -1692,19 +2763,24 @@ class AsciiDataTable(object):
                 new_format_string="{"+str(index-1)
                 self.options["row_formatter_string"]=\
                     self.options["row_formatter_string"].replace(old_format_string,new_format_string)
+        self.update_column_indexes()
 
         #Todo:Add remove column functionality
 
     def add_index(self):
         """Adds a column with name index and values that are 0 referenced indices, does nothing if there is
         already a column with name index, always inserts it at the 0 position"""
+        self.load_data()
         if 'index' in self.column_names:
             print("Add Index passed")
             pass
         else:
             self.column_names.insert(0,'index')
-            for index,row in enumerate(self.data):
-                self.data[index].insert(0,index)
+            if isinstance(self.data,ColumnarData):
+                self.data.add_column(np.arange(len(self.data)),column_type='int',column_index=0)
+            else:
+                for index,row in enumerate(self.data):
+                    self.data[index].insert(0,index)
             if self.options['column_types']:
                 self.options['column_types'].insert(0,'int')
             if self.options['row_formatter_string']:
@@ -1762,9 +2838,31 @@ class AsciiDataTable(object):
                 column_selector=column_index
         else:
             column_selector=self.column_names.index(column_name)
+        if isinstance(self.data,ColumnarData):
+            return self.data.get_column(column_selector).tolist()
+        elif isinstance(self.data,MappedData):
+            return self.data.get_column(column_selector)
         out_list=[self.data[i][column_selector] for i in range(len(self.data))]
         return out_list
 
+    def get_column_array(self,column_name=None,column_index=None):
+        """Returns a column as a numpy array given a column name or column index. For a table with
+        columnar_storage the array is the stored column (not a copy) so vectorized operations can be applied to it
+        directly"""
+        if column_name is None:
+            if column_index is None:
+                return
+            else:
+                column_selector=column_index
+        else:
+            column_selector=self.column_names.index(column_name)
+        if isinstance(self.data,ColumnarData):
+            return self.data.get_column(column_selector)
+        column_type=None
+        if isinstance(self.options["column_types"],ListType):
+            column_type=self.options["column_types"][column_selector]
+        return column_to_array(self.get_column(column_index=column_selector),column_type)
+
     def get_unique_column_values(self,column_name=None,column_index=None):
         """Returns the unique values in a  column as a list given a column name or column index"""
         if column_name is None:
@@ -1774,9 +2872,50 @@ class AsciiDataTable(object):
                 column_selector=column_index
         else:
             column_selector=self.column_names.index(column_name)
+        if self.column_names and self.column_names[column_selector] in self.column_indexes:
+            return list(self.column_indexes[self.column_names[column_selector]].keys())
+        if isinstance(self.data,(ColumnarData,MappedData)):
+            return list(set(self.get_column(column_index=column_selector)))
         out_list=list(set([self.data[i][column_selector] for i in range(len(self.data))]))
         return out_list
 
+    def create_index(self,column_name=None,column_index=None):
+        """Creates an index {value:[row positions]} for the column given by column_name or column_index so that
+        get_row_indices, get_rows_where and get_unique_column_values do not scan the table. The index is kept up to
+        date by add_row and rebuilt by the methods that change column values (update_model, remove_row, add_column,
+        remove_column, change_unit_prefix, update_index). Changes made directly to data need an update_model or
+        update_column_indexes"""
+        if column_name is None:
+            column_name=self.column_names[column_index]
+        self.column_indexes[column_name]=build_column_index(self.get_column(column_name))
+
+    def remove_index(self,column_name):
+        """Removes the index created by create_index for column_name"""
+        self.column_indexes.pop(column_name,None)
+
+    def update_column_indexes(self):
+        """Rebuilds the column indexes, indexes of columns that no longer exist are removed"""
+        if not getattr(self,"column_indexes",None):
+            return
+        for column_name in list(self.column_indexes.keys()):
+            if self.column_names is None or column_name not in self.column_names or self.data is None:
+                self.column_indexes.pop(column_name)
+            else:
+                self.column_indexes[column_name]=build_column_index(self.get_column(column_name))
+
+    def get_row_indices(self,column_name,value):
+        """Returns a list of the row positions where the column column_name is equal to value. If the column has an
+        index (create_index) the lookup does not scan the table"""
+        if column_name in self.column_indexes:
+            return self.column_indexes[column_name].get(native_value(value),[])[:]
+        return [row_position for row_position,column_value in enumerate(self.get_column(column_name))
+                if column_value==value]
+
+    def get_rows_where(self,column_name,value):
+        """Returns a list of the rows where the column column_name is equal to value,
+        ie table.get_rows_where("Frequency",1.0)"""
+        return [self.get_row(row_position) for row_position in self.get_row_indices(column_name,value)]
+
     def __getitem__(self, items):
         """Controls how the model responds to self["Item"]"""
         out_data=[]
@@ -1791,7 +2930,14 @@ class AsciiDataTable(object):
                 else:
                     #print self.column_names
                     column_selectors.append(self.column_names.index(item))
-            for row in self.data[:]:
+            if isinstance(self.data,ColumnarData):
+                return [list(row) for row in zip(*[self.data.get_column(selector).tolist()
+                                                   for selector in column_selectors])]
+            elif isinstance(self.data,MappedData):
+                rows=self.data
+            else:
+                rows=self.data[:]
+            for row in rows:
                 new_row=[]
                 for selector in column_selectors:
                     new_row.append(row[selector])
@@ -1852,6 +2998,7 @@ class AsciiDataTable(object):
                      "f":10.**-15,"atto":10.**-18,"a":10.**-18,"zepto":10.**-21,"z":10.**-21,
                      "yocto":10.**-24,"y":10.**-24}
         # change column name into column index
+        self.load_data()
         try:
             if old_prefix is None:
                 old_prefix=""
@@ -1861,17 +3008,29 @@ class AsciiDataTable(object):
             new_unit=new_prefix+unit
             if column_selector in self.column_names:
                 column_selector=self.column_names.index(column_selector)
-            for index,row in enumerate(self.data):
-                if isinstance(self.data[index][column_selector],FloatType):
-                    #print "{0:e}".format(multipliers[old_prefix]/multipliers[new_prefix])
-                    self.data[index][column_selector]=\
-                    (multipliers[old_prefix]/multipliers[new_prefix])*self.data[index][column_selector]
-                elif isinstance(self.data[index][column_selector],(StringType,IntType)):
-                    self.data[index][column_selector]=\
-                    str((multipliers[old_prefix]/multipliers[new_prefix])*float(self.data[index][column_selector]))
-                else:
-                    print(type(self.data[index][column_selector]))
-                    raise
+            if isinstance(self.data,ColumnarData) and self.data.get_column(column_selector).dtype.kind in ['i','u','f','c']:
+                # numeric columns are scaled in a single operation, integer columns become float
+                self.data.columns[column_selector]=\
+                    (multipliers[old_prefix]/multipliers[new_prefix])*self.data.get_column(column_selector)
+            elif not isinstance(self.data,ColumnarData) and \
+                    all([type(row[column_selector]) is FloatType for row in self.data]):
+                # a column of floats is scaled in one pass without checking the type of each value again
+                new_values=((multipliers[old_prefix]/multipliers[new_prefix])*
+                            np.array([row[column_selector] for row in self.data],dtype=np.float64)).tolist()
+                for index,row in enumerate(self.data):
+                    row[column_selector]=new_values[index]
+            else:
+                for index,row in enumerate(self.data):
+                    if isinstance(self.data[index][column_selector],FloatType):
+                        #print "{0:e}".format(multipliers[old_prefix]/multipliers[new_prefix])
+                        self.data[index][column_selector]=\
+                        (multipliers[old_prefix]/multipliers[new_prefix])*self.data[index][column_selector]
+                    elif isinstance(self.data[index][column_selector],(StringType,IntType)):
+                        self.data[index][column_selector]=\
+                        str((multipliers[old_prefix]/multipliers[new_prefix])*float(self.data[index][column_selector]))
+                    else:
+                        print(type(self.data[index][column_selector]))
+                        raise
             if self.options["column_descriptions"] is not None:
                 old=self.options["column_descriptions"][column_selector]
                 self.options["column_descriptions"][column_selector]=old.replace(old_unit,new_unit)
@@ -1881,6 +3040,8 @@ class AsciiDataTable(object):
             if re.search(old_unit,self.column_names[column_selector]):
                 old=self.column_names[column_selector]
                 self.column_names[column_selector]=old.replace(old_unit,new_unit)
+            # the values of the column changed so its index has to be rebuilt
+            self.update_column_indexes()
         except:
             print(("Could not change the unit prefix of column {0}".format(column_selector)))
             raise
@@ -2553,6 +3714,161 @@ def test_get_item():
     print(new_table["Frequency"])
     print(new_table[("Frequency",1)])
     print(new_table[["Frequency","c"]])
+def test_columnar_storage():
+    """Tests that a table with columnar_storage=True behaves the same as the default list of lists table"""
+    options={"column_names":["Frequency","b","c"],"column_names_delimiter":",","data":[[0.1*10**10,1,2],[2*10**10,3,4]],
+             "data_delimiter":'\t',
+             "header":['Hello There',"My Darling"],"column_names_begin_token":'#',"comment_begin":'!',
+             "comment_end":"\n",
+             "directory":TESTS_DIRECTORY,
+             "column_units":["Hz",None,None],
+             "column_descriptions":["Frequency in Hz",None,None],
+             "column_types":['float','int','float'],
+             "row_formatter_string":"{0:.2e}{delimiter}{1}{delimiter}{2}",
+             "treat_header_as_comment":True}
+    list_table=AsciiDataTable(None,**options)
+    options["columnar_storage"]=True
+    columnar_table=AsciiDataTable(None,**options)
+    print(("The type of columnar_table.data is {0}".format(type(columnar_table.data))))
+    for table in [list_table,columnar_table]:
+        table.add_row([0.3*10**10,5,6])
+        table.data[0][1]=7
+        table.change_unit_prefix(column_selector='Frequency',old_prefix=None,new_prefix='G',unit='Hz')
+        table.add_column(column_name='d',column_type='float',column_data=[1,2,3])
+        table.add_index()
+        table.update_model()
+    print(("The value of {0} is {1}".format('columnar_table.get_column_array("Frequency")',
+                                           columnar_table.get_column_array("Frequency"))))
+    print(columnar_table)
+    print(("The assertion that the list table is equal to the columnar table is {0}".format(
+        list_table==columnar_table)))
+    print(("The assertion that the columnar table is valid is {0}".format(columnar_table.is_valid())))
+def test_add_columnar_table(number_rows=5000):
+    """Tests adding a table with columnar_storage=True to a list of lists table and to a columnar table"""
+    options={"column_names":["Frequency","b","c"],"column_types":['float','int','float'],
+             "data":[[float(row),row,2.*row] for row in range(number_rows)]}
+    columnar_table=AsciiDataTable(None,columnar_storage=True,**options)
+    for columnar_storage in [False,True]:
+        new_options=options.copy()
+        new_options["data"]=[[0.5,1,1.5]]
+        new_options["columnar_storage"]=columnar_storage
+        table=AsciiDataTable(None,**new_options)
+        table+columnar_table
+        table+columnar_table
+        print(("With columnar_storage={0} the table has {1} rows, expected {2}".format(columnar_storage,
+                                                                                len(table.data),
+                                                                                2*number_rows+1)))
+        print(("The assertion that the last row is {0} is {1}".format(columnar_table.data[-1].tolist(),
+                                                                    table.data[-1]==columnar_table.data[-1])))
+def test_parse_numeric_rows():
+    """Tests that parse_numeric_rows gives the same result as split_all_rows and convert_all_rows"""
+    row_list=["1.0,2,3e9\n","4.5,6,7.25e-3\n"," 8.0,9,10.0 \n"]
+    column_types=['float','int','float']
+    print(("The value of {0} is {1}".format('parse_numeric_rows(row_list,",",column_types)',
+                                           parse_numeric_rows(row_list,",",column_types))))
+    print(("The assertion that the fast and row by row parsers agree is {0}".format(
+        parse_numeric_rows(row_list,",",column_types)==
+        convert_all_rows(split_all_rows(row_list,delimiter=","),column_types))))
+    print(("The value of {0} is {1}".format('parse_numeric_rows(row_list,",",["float","str","float"])',
+                                           parse_numeric_rows(row_list,",",["float","str","float"]))))
+def test_memory_map():
+    """Tests opening a table with memory_map=True"""
+    os.chdir(TESTS_DIRECTORY)
+    options={"column_names":["Frequency","b","c"],"data":[[0.1*10**10,1,2.],[2*10**10,3,4.],[3*10**10,5,6.]],
+             "data_delimiter":',',"header":['Hello There',"My Darling"],"comment_begin":'!',"comment_end":"\n",
+             "column_types":['float','int','float'],"data_begin_token":"BEGIN DATA\n","data_end_token":"\nEND DATA",
+             "treat_header_as_comment":True,"directory":TESTS_DIRECTORY}
+    new_table=AsciiDataTable(None,**options)
+    new_table.save()
+    mapped_table=AsciiDataTable(new_table.path,memory_map=True)
+    print(("The value of {0} is {1}".format('mapped_table.data',mapped_table.data)))
+    print(("The value of {0} is {1}".format('mapped_table.get_row(1)',mapped_table.get_row(1))))
+    print(("The value of {0} is {1}".format('mapped_table.get_column("Frequency")',
+                                           mapped_table.get_column("Frequency"))))
+    print(("The value of {0} is {1}".format('mapped_table[["b","c"]]',mapped_table[["b","c"]])))
+    print(("The assertion that the mapped table is equal to the built table is {0}".format(
+        mapped_table==new_table)))
+    mapped_table.add_row([4*10**10,7,8.])
+    print(("After add_row the type of mapped_table.data is {0}".format(type(mapped_table.data))))
+def test_iter_rows():
+    """Tests the iter_rows, filter_rows and aggregate_rows streaming functions"""
+    os.chdir(TESTS_DIRECTORY)
+    options={"column_names":["Frequency","b","c"],"data":[[0.1*10**10,1,2.],[2*10**10,3,4.],[3*10**10,5,6.]],
+             "data_delimiter":',',"header":['Hello There',"My Darling"],"comment_begin":'!',"comment_end":"\n",
+             "column_types":['float','int','float'],"data_begin_token":"BEGIN DATA\n","data_end_token":"\nEND DATA",
+             "treat_header_as_comment":True,"directory":TESTS_DIRECTORY}
+    new_table=AsciiDataTable(None,**options)
+    new_table.save()
+    for row in iter_rows(new_table.path,output='dict'):
+        print(row)
+    statistics=aggregate_rows(filter_rows(iter_rows(new_table.path),lambda row:row[0]>1e9),[1,2])
+    for column_selector,column_statistics in statistics.items():
+        print(("The statistics of column {0} for Frequency > 1 GHz are {1}".format(column_selector,
+                                                                                   column_statistics.get_summary())))
+
+def test_buffered_save():
+    """Tests that the chunked save writes the same file as build_string and sets the same line options"""
+    os.chdir(TESTS_DIRECTORY)
+    options={"column_names":["Frequency","b","c"],"data":[[0.1*10**10,1,2.],[2*10**10,3,4.],[3*10**10,5,6.]],
+             "data_delimiter":',',"header":['Hello There',"My Darling"],"comment_begin":'!',"comment_end":"\n",
+             "column_types":['float','int','float'],"data_begin_token":"BEGIN DATA\n","data_end_token":"\nEND DATA",
+             "footer":["The End"],"treat_header_as_comment":True,"directory":TESTS_DIRECTORY}
+    for columnar_storage in [False,True]:
+        options["columnar_storage"]=columnar_storage
+        new_table=AsciiDataTable(None,**options)
+        table_string=new_table.build_string()
+        new_table.save()
+        file_in=open(new_table.path,'r')
+        saved_string=file_in.read()
+        file_in.close()
+        print(("With columnar_storage={0} the saved file is the same as build_string: {1}".format(columnar_storage,
+                                                                                   saved_string==table_string)))
+        print(("The data begins on line {0} and ends on line {1}".format(new_table.options["data_begin_line"],
+                                                                         new_table.options["data_end_line"])))
+
+def test_ascii_data_table_join():
+    """Tests the inner, left and outer joins of ascii_data_table_join"""
+    table_1=AsciiDataTable(None,column_names=["Frequency","a"],column_types=['float','int'],
+                           data=[[1.,1],[2.,2],[3.,3]])
+    table_2=AsciiDataTable(None,column_names=["Frequency","b"],column_types=['float','float'],
+                           data=[[3.,.3],[1.,.1],[4.,.4]])
+    for join_type in [None,"inner","left","outer"]:
+        joined_table=ascii_data_table_join("Frequency",table_1,table_2,join_type=join_type)
+        print(("The {0} join of the tables is:".format(join_type)))
+        print(joined_table)
+    joined_table=join_ascii_data_table_list([table_1,table_2,table_2],column_selector="Frequency",join_type="inner")
+    print(("The column names of the inner join of 3 tables are {0}".format(joined_table.column_names)))
+
+def test_create_index():
+    """Tests create_index and the lookups that use it"""
+    table=AsciiDataTable(None,column_names=["Frequency","Direction","Magnitude"],
+                         column_types=['float','string','float'],
+                         data=[[1.,"Forward",.1],[2.,"Forward",.2],[1.,"Reverse",.3]])
+    table.create_index("Frequency")
+    print(("The index of Frequency is {0}".format(table.column_indexes["Frequency"])))
+    print(("The rows where Frequency is 1.0 are {0}".format(table.get_rows_where("Frequency",1.0))))
+    table.add_row([2.,"Reverse",.4])
+    print(("After add_row the rows where Frequency is 2.0 are {0}".format(table.get_rows_where("Frequency",2.0))))
+    table.remove_row(0)
+    print(("After remove_row the rows where Frequency is 1.0 are {0}".format(table.get_rows_where("Frequency",1.0))))
+    print(("The rows where Direction is Reverse are {0}".format(table.get_row_indices("Direction","Reverse"))))
+    table.change_unit_prefix("Frequency","","G","Hz")
+    print(("After change_unit_prefix to GHz the rows where Frequency is {0} are {1}, the rows where it is 2.0 are {2}".format(
+        2*10.**-9,table.get_rows_where("Frequency",2*10.**-9),table.get_rows_where("Frequency",2.0))))
+    print(("The assertion that the index agrees with a scan of the table is {0}".format(
+        table.get_row_indices("Frequency",2*10.**-9)==[row_position for row_position,value in
+                                                        enumerate(table.get_column("Frequency"))
+                                                        if value==2*10.**-9])))
+    table.create_index("Direction")
+    table.remove_column("Direction")
+    print(("After remove_column the indexed columns are {0}".format(sorted(table.column_indexes.keys()))))
+
+def test_group_by_aggregate():
+    """Tests group_by_aggregate with one and two grouping columns"""
+    data=[[1.,"Forward",1.],[1.,"Reverse",3.],[2.,"Forward",2.],[1.,"Forward",5.],[2.,"Reverse",4.]]
+    for method in ["mean","median","std","rms","mad"]:
+        print(("The {0} grouped by Frequency is {1}".format(method,group_by_aggregate(data,[0],method))))
+    print(("The mean grouped by Frequency and Direction is {0}".format(group_by_aggregate(data,[0,1],"mean"))))
 
 #-----------------------------------------------------------------------------
 # Module Runner
@@ -2572,3 +3888,12 @@ if __name__ == '__main__':
     test_copy_method()
     test_add_method()
     test_get_item()
+    test_columnar_storage()
+    test_add_columnar_table()
+    test_parse_numeric_rows()
+    test_memory_map()
+    test_iter_rows()
+    test_buffered_save()
+    test_ascii_data_table_join()
+    test_create_index()
+    test_group_by_aggregate()
@@ -49,6 +49,11 @@ import re
 import datetime
 import sys
 import os
+import collections
+import hashlib
+import pickle
+import copy
+import concurrent.futures
 
 #-----------------------------------------------------------------------------
 # Third Party Imports
@@ -121,6 +126,34 @@ def visit_and_print_all_nodes(graph):
         print((graph.data))
 
 
+def get_content_hash(data):
+    """Returns a sha1 hex digest of data to be used as a conversion cache key. Strings and bytes are hashed directly,
+    for a string that is an existing file name the modification time and size are hashed with it.
+    Any other object is pickled, if the object can not be pickled None is returned (do not cache)"""
+    try:
+        if isinstance(data, bytes):
+            content = b"bytes:" + data
+        elif isinstance(data, str):
+            content = ("str:" + data).encode("utf-8", "surrogatepass")
+            if os.path.isfile(data):
+                file_stat = os.stat(data)
+                content = content + ":{0}:{1}".format(file_stat.st_mtime_ns, file_stat.st_size).encode()
+        else:
+            content = pickle.dumps(data, protocol=pickle.HIGHEST_PROTOCOL)
+        return hashlib.sha1(content).hexdigest()
+    except:
+        return None
+
+def copy_cache_value(data):
+    """Returns a deep copy of data to store in or return from a conversion cache, strings, bytes, numbers and None
+    are returned as they are. Raises TypeError if data can not be copied"""
+    if data is None or isinstance(data, (str, bytes, int, float, complex, bool)):
+        return data
+    try:
+        return copy.deepcopy(data)
+    except Exception as error:
+        raise TypeError("{0} can not be copied: {1}".format(type(data).__name__, error))
+
 def to_node_name(node_data):
     """Creates a node name given an input object, does a bit of silly type selecting and name rearranging. This matches for 75%
     of the cases. There are a lot of user defined nodes without a clear path to generate a name. For instance the DataTableGraph
@@ -170,14 +203,16 @@ def to_node_name(node_data):
 
 
 def TableGraph_to_Links(table_graph, **options):
-    """Converts a table graph to a set of download links with embedded data in them"""
+    """Converts a table graph to a set of download links with embedded data in them, if workers is not 1 the
+    files are made concurrently with table_graph.export_all"""
     defaults = {"base_name": None,
                 "nodes": ['XmlFile', 'CsvFile', 'ExcelFile', 'OdsFile', 'MatFile', 'HtmlFile', 'JsonFile'],
                 "extensions": ['xml', 'csv', 'xlsx', 'ods', 'mat', 'html', 'json'],
                 "mime_types": ['application/xml', 'text/plain',
                                'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet',
                                'application/vnd.oasis.opendocument.spreadsheet',
-                               'application/x-matlab-data', 'text/html', 'application/json']}
+                               'application/x-matlab-data', 'text/html', 'application/json'],
+                "workers": 1}
     conversion_options = {}
     for key, value in defaults.items():
         conversion_options[key] = value
@@ -193,9 +228,14 @@ def TableGraph_to_Links(table_graph, **options):
     mime_types = conversion_options["mime_types"]
 
     out_links = ""
+    if conversion_options["workers"] != 1:
+        exported_files = table_graph.export_all(nodes, workers=conversion_options["workers"])
     for node_index, node in enumerate(nodes):
-        table_graph.move_to_node(node)
-        file_path = table_graph.data
+        if conversion_options["workers"] != 1:
+            file_path = exported_files[node]
+        else:
+            table_graph.move_to_node(node)
+            file_path = table_graph.data
         in_file = open(file_path, 'rb')
         content_string = in_file.read()
         link = String_to_DownloadLink(content_string,
@@ -277,6 +317,11 @@ class Graph(object):
     state is in the attribute graph.data. To move among the formats use graph.move_to_node('NodeName')
     need to recode the find_path method using a shortest path alogrithm like
     [Dijkstra](https://en.wikipedia.org/wiki/Dijkstra%27s_algorithm).
+    Setting the option cache_size to a positive integer turns on a least recently used cache of conversion
+    results keyed on (source content hash, source node, node), so that move_to_node and convert reuse the
+    intermediate formats of earlier conversions of the same data. The cache stores and returns deep copies, so
+    changing a converted result (or an edge changing its input) does not change later conversions. Results that
+    can not be copied are not cached.
     """
 
     def __init__(self, **options):
@@ -289,7 +334,8 @@ class Graph(object):
                     "state": [1, 0],
                     "data": "This is a test string\n it has to have multiple lines \n and many characters 34%6\n^",
                     "edge_2_to_1": edge_2_to_1,
-                    "edge_1_to_2": edge_1_to_2
+                    "edge_1_to_2": edge_1_to_2,
+                    "cache_size": 0
                     }
         self.options = {}
         for key, value in defaults.items():
@@ -301,6 +347,13 @@ class Graph(object):
             self.__dict__[element] = self.options[element]
         self.edges = []
         self.edge_matrices = []
+        # edge_table is {edge_name:(begin_node,end_node)}, path_cache is {first_node:{last_node:path}} and is
+        # cleared whenever an edge or jump is added
+        self.edge_table = {}
+        self.path_cache = {}
+        # conversion_cache is {(content_hash,source_node,node):data} in least recently used order
+        self.cache_size = self.options.get("cache_size", 0)
+        self.conversion_cache = collections.OrderedDict()
         self.state_matrix = np.matrix(self.state).T
         # Add the first 2 edges, required to intialize the graph properly
         self.display_graph = networkx.DiGraph()
@@ -344,6 +397,8 @@ class Graph(object):
         edge_name = "edge_{0}_{1}_{2:0>3d}".format(begin_node, end_node, iterator)
         self.__dict__[edge_name] = edge_function
         self.edges.append(edge_name)
+        self.edge_table[edge_name] = (begin_node, end_node)
+        self.path_cache = {}
         edge_matrix = np.zeros((len(self.state), len(self.state)))
         begin_position = self.node_names.index(begin_node)
         end_position = self.node_names.index(end_node)
@@ -367,6 +422,7 @@ class Graph(object):
         jump_name = "jump_{0}_{1}_{2:0>3d}".format(begin_node, end_node, iterator)
         self.__dict__[jump_name] = jump_function
         self.jumps.append(jump_name)
+        self.path_cache = {}
         self.display_graph.add_edge(begin_node, end_node)
         self.display_layout = networkx.spring_layout(self.display_graph)
 
@@ -383,16 +439,13 @@ class Graph(object):
             print(path)
         for index, edge in enumerate(path):
             # print edge
-            edge_pattern = 'edge_(?P<begin_node>\w+)_(?P<end_node>\w+)_(?P<iterator>\w+)'
-            match = re.match(edge_pattern, edge)
-            begin_node = match.groupdict()['begin_node']
-            end_node = match.groupdict()['end_node']
+            begin_node, end_node = self.edge_table[edge]
             if move_options["verbose"]:
                 print(("moving {0} -> {1}".format(begin_node, end_node)))
             # print self.data
             self.data = self.__dict__[edge](self.data)
             # print self.data
-            self.current_node = match.groupdict()['end_node']
+            self.current_node = end_node
             self.state = [0 for i in range(len(self.node_names))]
             position = self.node_names.index(self.current_node)
             self.state[position] = 1
@@ -515,52 +568,71 @@ class Graph(object):
 
     def get_entering_nodes(self, node):
         """Returns all nodes that have an edge that enter the specificed node"""
-        enter_edge_pattern = re.compile('edge_(?P<begin_node>\w+)_{0}_(?P<iterator>\w+)'.format(node))
         enter_nodes = []
         for index, edge in enumerate(self.edges):
-            enter_match = re.match(enter_edge_pattern, edge)
-            if enter_match:
-                enter_node = enter_match.groupdict()['begin_node']
-                enter_nodes.append(enter_node)
+            if self.edge_table[edge][1] == node:
+                enter_nodes.append(self.edge_table[edge][0])
         return enter_nodes
 
     def get_entering_edges(self, node):
         """Returns all edges that enter the specificed node"""
-        enter_edge_pattern = re.compile('edge_(?P<begin_node>\w+)_{0}_(?P<iterator>\w+)'.format(node))
         enter_edges = []
         for index, edge in enumerate(self.edges):
-            if re.match(enter_edge_pattern, edge):
+            if self.edge_table[edge][1] == node:
                 enter_edges.append(edge)
         return enter_edges
 
     def get_exiting_edges(self, node):
         """Returns all edges that exit the specificed node"""
-        exit_edge_pattern = re.compile('edge_{0}_(?P<end_node>\w+)_(?P<iterator>\w+)'.format(node))
         exit_edges = []
         for index, edge in enumerate(self.edges):
-            if re.match(exit_edge_pattern, edge):
+            if self.edge_table[edge][0] == node:
                 exit_edges.append(edge)
         return exit_edges
 
     def get_exiting_nodes(self, node):
         """Returns all nodes that have an edge leaving the specificed node"""
-        exit_edge_pattern = re.compile('edge_{0}_(?P<end_node>\w+)_(?P<iterator>\w+)'.format(node))
         exit_nodes = []
         for index, edge in enumerate(self.edges):
-            exit_match = re.match(exit_edge_pattern, edge)
-            if exit_match:
-                exit_node = exit_match.groupdict()['end_node']
-                exit_nodes.append(exit_node)
+            if self.edge_table[edge][0] == node:
+                exit_nodes.append(self.edge_table[edge][1])
         return exit_nodes
 
+    def get_paths_from(self, first_node):
+        """Returns a dictionary {last_node:path} of the paths from first_node to every node that can be reached. The
+        paths are found with a single breadth first search (the same paths as get_path) and cached until the next
+        edge is added"""
+        if first_node in self.path_cache:
+            return self.path_cache[first_node]
+        exiting_edges = {}
+        for edge in self.edges:
+            exiting_edges.setdefault(self.edge_table[edge][0], []).append(edge)
+        paths = {first_node: []}
+        queue = collections.deque([first_node])
+        while queue:
+            current_node = queue.popleft()
+            for edge in exiting_edges.get(current_node, []):
+                node = self.edge_table[edge][1]
+                if node not in paths:
+                    paths[node] = paths[current_node] + [edge]
+                    queue.append(node)
+        self.path_cache[first_node] = paths
+        return paths
+
     def get_path(self, first_node, last_node, **options):
-        """Returns the first path found between first node and last node, uses a breadth first search algorithm"""
-        defaults = {"debug": False, "method": "BreathFirst"}
+        """Returns the first path found between first node and last node, uses a breadth first search algorithm.
+        The paths are cached (see get_paths_from), to search the graph each time use method="BreathFirst" """
+        defaults = {"debug": False, "method": "Cached"}
         self.get_path_options = {}
         for key, value in defaults.items():
             self.get_path_options[key] = value
         for key, value in options.items():
             self.get_path_options[key] = value
+        if self.get_path_options["method"] in ["Cached"] and not self.get_path_options["debug"]:
+            path = self.get_paths_from(first_node).get(last_node)
+            if path is None:
+                return None
+            return path[:]
         unvisited_nodes = self.node_names[:]
         unvisited_nodes.remove(first_node)
         visited_nodes = [first_node]
@@ -610,7 +682,111 @@ class Graph(object):
     def move_to_node(self, node):
         """Moves from current_node to the specified node"""
         path = self.get_path(self.current_node, node)
-        self.move_to(path)
+        if self.cache_size and path:
+            self.set_state(node, self.cached_move(self.data, self.current_node, path))
+        else:
+            self.move_to(path)
+
+    def convert(self, data, from_node, to_node):
+        """Returns data (in the format of from_node) converted to the format of to_node along the shortest path, the
+        state of the graph is not changed"""
+        path = self.get_path(from_node, to_node)
+        if path is None:
+            raise TypeError("There is no path from {0} to {1}".format(from_node, to_node))
+        if self.cache_size and path:
+            return self.cached_move(data, from_node, path)
+        for edge in path:
+            data = self.__dict__[edge](data)
+        return data
+
+    def cached_move(self, data, from_node, path):
+        """Returns data (in the format of from_node) moved along path using the conversion cache. The move starts
+        at the furthest node of path already in the cache and stores every node it reaches. Copies are stored and
+        returned so that the cache can not be changed through a result. Results that are file names or can not be
+        copied are not stored, since the file can be rewritten by a later conversion"""
+        content_hash = get_content_hash(data)
+        if content_hash is None:
+            for edge in path:
+                data = self.__dict__[edge](data)
+            return data
+        start = 0
+        for index in range(len(path), 0, -1):
+            key = (content_hash, from_node, self.edge_table[path[index - 1]][1])
+            if key in self.conversion_cache:
+                self.conversion_cache.move_to_end(key)
+                data = copy_cache_value(self.conversion_cache[key])
+                start = index
+                break
+        for edge in path[start:]:
+            data = self.__dict__[edge](data)
+            if isinstance(data, str) and os.path.isfile(data):
+                continue
+            try:
+                self.conversion_cache[(content_hash, from_node, self.edge_table[edge][1])] = copy_cache_value(data)
+            except TypeError:
+                continue
+            while len(self.conversion_cache) > self.cache_size:
+                self.conversion_cache.popitem(last=False)
+        return data
+
+    def export_all(self, targets=None, workers=None, **options):
+        """Returns a dictionary {node:data} of the current data converted to each node in targets (all nodes if
+        None). The shortest path tree from current_node is computed once, every node on it is converted once
+        and the branches of the tree run concurrently in a pool of workers (executor="thread" or "process",
+        process requires edge functions and data that can be pickled). workers=1 converts serially.
+        Sibling branches share their input, so with workers other than 1 the edge functions must not change the
+        data they are given (the TableGraph edges from AsciiDataTable and DataFrame only read their input).
+        The state of the graph is not changed"""
+        defaults = {"executor": "thread"}
+        export_options = {}
+        for key, value in defaults.items():
+            export_options[key] = value
+        for key, value in options.items():
+            export_options[key] = value
+        if targets is None:
+            targets = self.node_names[:]
+        paths = self.get_paths_from(self.current_node)
+        # children is {node:[(edge,next_node),..]} for the branches of the shortest path tree that lead to targets
+        children = {}
+        tree_nodes = set([self.current_node])
+        for target in targets:
+            if target not in paths:
+                raise TypeError("There is no path from {0} to {1}".format(self.current_node, target))
+            for edge in paths[target]:
+                begin_node, end_node = self.edge_table[edge]
+                if end_node not in tree_nodes:
+                    tree_nodes.add(end_node)
+                    children.setdefault(begin_node, []).append((edge, end_node))
+        results = {self.current_node: self.data}
+        if workers == 1:
+            queue = collections.deque([self.current_node])
+            while queue:
+                node = queue.popleft()
+                for edge, next_node in children.get(node, []):
+                    results[next_node] = self.__dict__[edge](results[node])
+                    queue.append(next_node)
+        else:
+            if re.search("process", export_options["executor"], re.IGNORECASE):
+                pool = concurrent.futures.ProcessPoolExecutor(max_workers=workers)
+            else:
+                pool = concurrent.futures.ThreadPoolExecutor(max_workers=workers)
+            with pool:
+                futures = {}
+                for edge, next_node in children.get(self.current_node, []):
+                    futures[pool.submit(self.__dict__[edge], self.data)] = next_node
+                while futures:
+                    done, not_done = concurrent.futures.wait(futures,
+                                                             return_when=concurrent.futures.FIRST_COMPLETED)
+                    for future in done:
+                        node = futures.pop(future)
+                        results[node] = future.result()
+                        for edge, next_node in children.get(node, []):
+                            futures[pool.submit(self.__dict__[edge], results[node])] = next_node
+        return {target: results[target] for target in targets}
+
+    def clear_cache(self):
+        """Removes all stored conversion results"""
+        self.conversion_cache = collections.OrderedDict()
 
     def check_closed_path(self):
         """Checks that data is not changed for the first closed path found. Returns True if data==data after
@@ -898,7 +1074,9 @@ class MetadataGraph(Graph):
                              "HtmlFile",HtmlString_to_HtmlFile,node_description="HTML Table String")
 class TwoPortParameterGraph(Graph):
     """TwoPortParamterGraph is a content graph for two-port parameters,
-    it transforms between S,T,Y,Z,ABCD and H parameters and matrix versions.
+    it transforms between S,T,Y,Z,ABCD and H parameters and matrix versions. The FrequencyArray nodes
+    (SFrequencyArray, ZFrequencyArray, etc.) hold [frequency_array,(N,2,2) complex array] and convert a whole sweep
+    with numpy expressions.
         #!python
         defaults={"graph_name":"Two Port Parameter Graph",
                           "node_names":["SFrequencyList",'SFrequencyMatrixList'],
@@ -996,6 +1174,56 @@ class TwoPortParameterGraph(Graph):
         self.add_edge(begin_node="ABCDFrequencyList",
                         end_node="SFrequencyList",
                         edge_function=ABCDFrequencyList_to_SFrequencyList)
+        # Array nodes hold [frequency_array,(N,2,2) complex array] and convert a whole sweep at once
+        self.add_node("SFrequencyArray",
+                        "SFrequencyList",FrequencyList_to_FrequencyArray,
+                        "SFrequencyList",FrequencyArray_to_FrequencyList,
+                        "S Parameters as a frequency array and a (N,2,2) array")
+
+        self.add_node("TFrequencyArray",
+                        "SFrequencyArray",SFrequencyArray_to_TFrequencyArray,
+                        "SFrequencyArray",TFrequencyArray_to_SFrequencyArray,
+                        "T Parameters as a frequency array and a (N,2,2) array")
+
+        self.add_node("ZFrequencyArray",
+                        "SFrequencyArray",SFrequencyArray_to_ZFrequencyArray,
+                        "TFrequencyArray",ZFrequencyArray_to_TFrequencyArray,
+                        "Z Parameters as a frequency array and a (N,2,2) array")
+
+        self.add_node("YFrequencyArray",
+                        "ZFrequencyArray",ZFrequencyArray_to_YFrequencyArray,
+                        "ZFrequencyArray",YFrequencyArray_to_ZFrequencyArray,
+                        "Y Parameters as a frequency array and a (N,2,2) array")
+
+        self.add_node("ABCDFrequencyArray",
+                        "ZFrequencyArray",ZFrequencyArray_to_ABCDFrequencyArray,
+                        "ZFrequencyArray",ABCDFrequencyArray_to_ZFrequencyArray,
+                        "ABCD Parameters as a frequency array and a (N,2,2) array")
+
+        self.add_node("HFrequencyArray",
+                        "ABCDFrequencyArray",ABCDFrequencyArray_to_HFrequencyArray,
+                        "ZFrequencyArray",HFrequencyArray_to_ZFrequencyArray,
+                        "H Parameters as a frequency array and a (N,2,2) array")
+
+        self.add_edge(begin_node="ABCDFrequencyArray",
+                        end_node="YFrequencyArray",
+                        edge_function=ABCDFrequencyArray_to_YFrequencyArray)
+
+        self.add_edge(begin_node="YFrequencyArray",
+                        end_node="HFrequencyArray",
+                        edge_function=YFrequencyArray_to_HFrequencyArray)
+
+        self.add_edge(begin_node="ABCDFrequencyArray",
+                        end_node="SFrequencyArray",
+                        edge_function=ABCDFrequencyArray_to_SFrequencyArray)
+
+        for parameter in ["T","Z","Y","ABCD","H"]:
+            self.add_edge(begin_node="{0}FrequencyList".format(parameter),
+                          end_node="{0}FrequencyArray".format(parameter),
+                          edge_function=FrequencyList_to_FrequencyArray)
+            self.add_edge(begin_node="{0}FrequencyArray".format(parameter),
+                          end_node="{0}FrequencyList".format(parameter),
+                          edge_function=FrequencyArray_to_FrequencyList)
 class DataTableGraph(Graph):
     """     Class that transforms a row modelled header and metadata to several different data types
         #!python
@@ -1042,8 +1270,23 @@ class DataTableGraph(Graph):
 #-----------------------------------------------------------------------------
 # Module Scripts
 #TODO: Add test_Graph script currently lives in jupyter-notebooks
+def test_conversion_cache():
+    """Tests that changing a result of a cached conversion does not change the next conversion of the same data"""
+    graph=Graph(cache_size=8)
+    data=graph.data
+    converted=graph.convert(data,"n1","n2")
+    converted.append("A line added to the result")
+    print(("The assertion that the cached conversion is unchanged is {0}".format(
+        graph.convert(data,"n1","n2")==data.splitlines())))
+    graph.move_to_node("n2")
+    graph.data.append("A line added to the state")
+    graph.set_state("n1",data)
+    graph.move_to_node("n2")
+    print(("The assertion that move_to_node returns the unchanged conversion is {0}".format(
+        graph.data==data.splitlines())))
+    print(("The cache has {0} entries".format(len(graph.conversion_cache))))
 
 #-----------------------------------------------------------------------------
 # Module Runner
 if __name__ == '__main__':
-    pass
\ No newline at end of file
+    test_conversion_cache()
\ No newline at end of file
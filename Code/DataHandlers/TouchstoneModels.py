@@ -27,6 +27,9 @@ import os
 import cmath
 import math
 import sys
+import json
+import hashlib
+import tempfile
 #-----------------------------------------------------------------------------
 # Third Party Imports
 sys.path.append(os.path.join(os.path.dirname( __file__ ), '..','..'))
@@ -95,6 +98,17 @@ MINIMUM_DB_VALUE=-200
 "Decibel value assigned to any linear value that is zero in a touchstone file"
 MINIMUM_DB_ARG_VALUE=0
 "Value assigned to the phase of a zero linear value in a touchstone file"
+TOUCHSTONE_CACHE=None
+"""Set to a TouchstoneCache to load and store every touchstone file read by S1PV1, S2PV1 and SNP,
+a model can also be given one as the option cache"""
+TOUCHSTONE_CACHE_VERSION=1
+"Version of the binary cache format, cache files with a different version are ignored"
+TOUCHSTONE_CACHE_ATTRIBUTES=["comments","option_line","frequency_units","parameter","format",
+                             "reference_resistance","column_names","row_pattern"]
+"Attributes set by __read_and_fix__ that are stored in the touchstone cache along with the data"
+TOUCHSTONE_CACHE_OPTIONS=["option_line_line","sparameter_begin_line","sparameter_end_line",
+                          "noiseparameter_begin_line","noiseparameter_end_line"]
+"Options set by __read_and_fix__ that are stored in the touchstone cache"
 
 #-----------------------------------------------------------------------------
 # Module Functions
@@ -286,32 +300,149 @@ def parse_combined_float_list(float_string_list):
         parsed_data.append(new_row)
     return parsed_data
 
+def split_snp_lines(lines):
+    """Returns (data_lines,removed_lines) for the lines of a snp file, data_lines are the lines that are not empty,
+    option lines or comment lines (inline comments are not removed) and removed_lines the indices of the
+    empty lines"""
+    data_lines=[]
+    removed_lines=[]
+    option_line_pattern=re.compile(OPTION_LINE_PATTERN,re.IGNORECASE)
+    comment_pattern=re.compile(COMMENT_PATTERN,re.IGNORECASE)
+    for index,line in enumerate(lines):
+        # if the line is just '\n' ignore it
+        if line in ["","\n"]:
+            removed_lines.append(index)
+            continue
+        #if the line is an option line collect it, option lines contain # and comment lines begin with !
+        elif "#" in line and option_line_pattern.search(line):
+            continue
+        elif line[:1]=="!" and comment_pattern.match(line):
+            continue
+        else:
+            data_lines.append(line)
+    return data_lines,removed_lines
+
+def get_snp_line_layout(number_ports):
+    """Returns (number_lines_per_sparameter,wrap_value) the number of lines used for each frequency and the number of
+    values on each line after the first in a version 1 snp file, the first line also holds the frequency"""
+    if number_ports in [1,2]:
+        return 1,8
+    elif number_ports in [3]:
+        return 3,6
+    else:
+        return int(number_ports**2/4),8
+
+def parse_snp_data_lines(data_lines,number_ports,number_lines_per_sparameter=None):
+    """Parses a list of snp data lines (no comments or option line) in one pass and returns a float ndarray of shape
+    (number_frequencies,2*number_ports**2+1). Delimiters are whitespace or comma as in parse_combined_float_list.
+    Returns None if the number of values does not fit the layout of number_lines_per_sparameter lines per frequency,
+    for instance if there is noise data"""
+    if number_lines_per_sparameter is None:
+        number_lines_per_sparameter=get_snp_line_layout(number_ports)[0]
+    number_columns=2*number_ports**2+1
+    values=" ".join(data_lines).replace(",", " ").replace("|"," ").split()
+    if len(values)%number_columns!=0:
+        return None
+    number_rows=len(values)//number_columns
+    if len(data_lines)!=number_rows*number_lines_per_sparameter:
+        return None
+    return np.array(values,dtype=np.float64).reshape(number_rows,number_columns)
+
+def snp_data_to_complex_array(data,number_ports,format="RI"):
+    """Converts snp data (a list or array of rows [Frequency,value_1,value_2,..] in format RI, MA or DB) to a
+    frequency array and an (number_frequencies,number_ports,number_ports) complex array with [:,i,j]=S(i+1)(j+1).
+    Note 2 port data is in the order S11,S21,S12,S22"""
+    data=np.asarray(data,dtype=np.float64).reshape(-1,2*number_ports**2+1)
+    frequency=data[:,0]
+    sparameters=np.empty((data.shape[0],number_ports**2),dtype=np.complex128)
+    if re.match('ri',format,re.IGNORECASE):
+        sparameters.real=data[:,1::2]
+        sparameters.imag=data[:,2::2]
+    else:
+        if re.match('db',format,re.IGNORECASE):
+            magnitude=10.**(data[:,1::2]/20.)
+        elif re.match('ma',format,re.IGNORECASE):
+            magnitude=data[:,1::2]
+        else:
+            raise TypeError("format must be RI, DB or MA")
+        phase=(math.pi/180.)*data[:,2::2]
+        sparameters.real=magnitude*np.cos(phase)
+        sparameters.imag=magnitude*np.sin(phase)
+    sparameters=sparameters.reshape(-1,number_ports,number_ports)
+    if number_ports==2:
+        sparameters=sparameters.transpose(0,2,1)
+    return frequency,sparameters
+
+def complex_array_to_sparameter_complex(frequency,sparameters):
+    """Converts a frequency array and an (number_frequencies,number_ports,number_ports) complex array to the
+    sparameter_complex form [[Frequency,S11,..,SNN],..] used by the touchstone models"""
+    sparameters=np.asarray(sparameters)
+    number_ports=sparameters.shape[-1]
+    if number_ports==2:
+        sparameters=sparameters.transpose(0,2,1)
+    flat_sparameters=sparameters.reshape(-1,number_ports**2).tolist()
+    return [[frequency]+flat_sparameters[index] for index,frequency in enumerate(np.asarray(frequency).tolist())]
+
+def sparameter_complex_to_data(sparameter_complex,format="RI"):
+    """Converts sparameter_complex rows [[Frequency,S11,..],..] to data rows [[Frequency,value_1,value_2,..],..] in
+    format RI, MA or DB with numpy, angles are in degrees. Zero values are given MINIMUM_DB_VALUE and
+    MINIMUM_DB_ARG_VALUE in DB format"""
+    if len(sparameter_complex)==0:
+        return []
+    sparameter_array=np.array(sparameter_complex,dtype=np.complex128)
+    values=sparameter_array[:,1:]
+    data=np.empty((sparameter_array.shape[0],2*values.shape[1]+1),dtype=np.float64)
+    data[:,0]=sparameter_array[:,0].real
+    if re.match('ri',format,re.IGNORECASE):
+        data[:,1::2]=values.real
+        data[:,2::2]=values.imag
+    elif re.match('ma',format,re.IGNORECASE):
+        data[:,1::2]=np.abs(values)
+        data[:,2::2]=(180./math.pi)*np.angle(values)
+    elif re.match('db',format,re.IGNORECASE):
+        magnitude=np.abs(values)
+        zeros=magnitude==0
+        with np.errstate(divide="ignore"):
+            data[:,1::2]=np.where(zeros,MINIMUM_DB_VALUE,20.*np.log10(magnitude))
+        data[:,2::2]=np.where(zeros,MINIMUM_DB_ARG_VALUE,(180./math.pi)*np.angle(values))
+    else:
+        raise TypeError("format must be RI, DB or MA")
+    return data.tolist()
+
+def build_snp_lines(data,number_ports,delimiter="  ",precision=9):
+    """Returns the list of data lines for snp data (rows of [Frequency,value_1,value_2,..]) wrapped as in a version 1
+    snp file. A single formatter is built for all the lines of a frequency and applied to each row"""
+    number_lines_per_sparameter,wrap_value=get_snp_line_layout(number_ports)
+    number_columns=2*number_ports**2+1
+    line_formatters=[]
+    offset=0
+    for line_number in range(number_lines_per_sparameter):
+        if line_number==0:
+            span=min(wrap_value+1,number_columns)
+        else:
+            span=min(wrap_value,number_columns-offset)
+        line_formatters.append(delimiter.join(["{"+str(index)+":.%sg}"%precision
+                                               for index in range(offset,offset+span)]))
+        offset=offset+span
+    row_formatter="\n".join(line_formatters)
+    if len(data)==0:
+        return []
+    return "\n".join([row_formatter.format(*row) for row in data]).split("\n")
+
 def s2p_mean(list_s2p_models,**options):
     """Calculates the mean of the data of a list of
-    s2p model and returns a new s2p model. The formats should be the same. Note this is very slow for large number
-   of s2ps"""
-    #This will work on any table that the data is stored in data, need to add a sparameter version
+    s2p model and returns a new s2p model. The formats should be the same. The models are consumed one at a time by
+    SNPStatistics, so list_s2p_models can be any iterable of models or file paths"""
     defaults={"frequency_selector":0,"frequency_column_name":"Frequency"}
     average_options={}
     for key,value in defaults.items():
         average_options[key]=value
     for key,value in options.items():
         average_options[key]=value
-    frequency_list=[]
-    average_data=[]
-    for table in list_s2p_models:
-        frequency_list=frequency_list+table.get_column("Frequency")
-    unique_frequency_list=sorted(list(set(frequency_list)))
-    for frequency in unique_frequency_list:
-        new_row=[]
-        for table in list_s2p_models:
-            data_list=[x for x in table.data if x[average_options["frequency_selector"]]==frequency]
-            table_average=np.mean(np.array(data_list),axis=0)
-            new_row.append(table_average)
-            #print new_row
-        average_data.append(np.mean(new_row,axis=0).tolist())
-    average_options["data"]=average_data
-    average_options["option_line"]=list_s2p_models[0].option_line
+    statistics=SNPStatistics(frequency_selector=average_options["frequency_selector"])
+    statistics.add_models(list_s2p_models)
+    average_options["data"]=statistics.get_data(statistics.mean)
+    average_options["option_line"]=statistics.option_line
     new_s2p=S2PV1(None,**average_options)
     return new_s2p
 
@@ -350,12 +481,134 @@ def s2p_difference(s2p_one,s2p_two,**options):
 
 # TODO: make a SNPBase class that has save, change_frequency_units,get_column, __str__, methods
 # TODO: This doesnt work because .__init__ is so different for each class
+class TouchstoneCache():
+    """TouchstoneCache manages a directory of binary (.npz) copies of parsed touchstone files. Each cache file holds
+    data, frequency, sparameter_complex and noiseparameter_data as numpy arrays and the option line attributes and
+    comments as json. A cache file is valid only while the modification time and size of the source file are
+    unchanged, so editing a touchstone file causes it to be parsed again. A model loaded from the cache does not read
+    the source file, its lines and data_lines attributes are read from model.path the first time they are used.
+        #!python
+        >>cache=TouchstoneCache(directory="my_cache")
+        >>s2p=S2PV1("thru.s2p",cache=cache)
+        # or for all models
+        >>TouchstoneModels.TOUCHSTONE_CACHE=TouchstoneCache()
+    """
+    def __init__(self,directory=None):
+        """Initializes the cache, if directory is None it is pyMez_touchstone_cache in the temp directory"""
+        if directory is None:
+            directory=os.path.join(tempfile.gettempdir(),"pyMez_touchstone_cache")
+        self.directory=directory
+        if not os.path.isdir(self.directory):
+            os.makedirs(self.directory)
+
+    def get_cache_path(self,model):
+        """Returns the path of the cache file for model, the name depends on the absolute path of the file,
+        the class and the options that change how the file is parsed"""
+        key=[os.path.abspath(model.path),model.__class__.__name__,model.options["option_line"],
+             str(getattr(model,"number_ports",None)),str(TOUCHSTONE_CACHE_VERSION)]
+        return os.path.join(self.directory,hashlib.sha1("|".join(key).encode()).hexdigest()+".npz")
+
+    def load(self,model):
+        """Sets the attributes of model from the cache and returns True, returns False if there is no valid cache
+        file for model.path"""
+        cache_path=self.get_cache_path(model)
+        if not os.path.isfile(cache_path):
+            return False
+        try:
+            file_stat=os.stat(model.path)
+            with np.load(cache_path) as cache_file:
+                state=json.loads(str(cache_file["state"]))
+                if state["mtime"]!=file_stat.st_mtime_ns or state["size"]!=file_stat.st_size:
+                    return False
+                data=cache_file["data"].tolist()
+                frequency=cache_file["frequency"].tolist()
+                sparameter_complex=cache_file["sparameter_complex"].tolist()
+                noiseparameter_data=cache_file["noiseparameter_data"].tolist()
+        except:
+            return False
+        for key,value in state["attributes"].items():
+            model.__dict__[key]=value
+        for key,value in state["options"].items():
+            model.options[key]=value
+        model.data=data
+        model.sparameter_complex=[[frequency[index]]+row for index,row in enumerate(sparameter_complex)]
+        model.noiseparameter_data=noiseparameter_data
+        # lines and data_lines are read on first use, see SNPBase.__getattr__
+        model.__dict__.pop("lines",None)
+        model.__dict__.pop("data_lines",None)
+        model.lazy_lines=True
+        return True
+
+    def save(self,model):
+        """Stores the parsed state of model in the cache, models with rows of unequal length are not stored"""
+        try:
+            file_stat=os.stat(model.path)
+            state={"mtime":file_stat.st_mtime_ns,"size":file_stat.st_size,
+                   "attributes":{key:model.__dict__[key] for key in TOUCHSTONE_CACHE_ATTRIBUTES
+                                 if key in model.__dict__},
+                   "options":{key:model.options[key] for key in TOUCHSTONE_CACHE_OPTIONS if key in model.options}}
+            data=np.array(model.data,dtype=np.float64)
+            frequency=np.array([row[0] for row in model.sparameter_complex],dtype=np.float64)
+            sparameter_complex=np.array([row[1:] for row in model.sparameter_complex],dtype=np.complex128)
+            noiseparameter_data=np.array(model.noiseparameter_data,dtype=np.float64)
+            cache_path=self.get_cache_path(model)
+            # write to a temporary file and then replace so a reader never sees a partial file
+            temp_file,temp_path=tempfile.mkstemp(dir=self.directory,suffix=".tmp")
+            with os.fdopen(temp_file,'wb') as out_file:
+                np.savez(out_file,state=np.array(json.dumps(state)),data=data,frequency=frequency,
+                         sparameter_complex=sparameter_complex,noiseparameter_data=noiseparameter_data)
+            os.replace(temp_path,cache_path)
+            return True
+        except:
+            return False
+
+    def remove(self,model):
+        """Removes the cache file for model if it exists"""
+        cache_path=self.get_cache_path(model)
+        if os.path.isfile(cache_path):
+            os.remove(cache_path)
+
+    def clear(self):
+        """Removes all cache files in the cache directory"""
+        for file_name in os.listdir(self.directory):
+            if file_name.endswith(".npz"):
+                os.remove(os.path.join(self.directory,file_name))
+
 class SNPBase():
     """SNPBase is a class with methods that are common across all the Touchstone models.
     It is only meant as a base class to inherit, not to instantiate by itself"""
     def __init__(self):
         pass
 
+    def __getattr__(self, name):
+        """Reads the lines and data_lines attributes from self.path the first time they are used, for models that
+        were loaded from a TouchstoneCache without reading the file"""
+        if name in ["lines","data_lines"] and self.__dict__.get("lazy_lines"):
+            self.read_lines()
+            return self.__dict__[name]
+        raise AttributeError("{0!r} object has no attribute {1!r}".format(self.__class__.__name__,name))
+
+    def read_lines(self):
+        """Sets self.lines to the lines of self.path and self.data_lines to the lines that hold data, without
+        inline comments"""
+        in_file=open(self.path,'r')
+        self.lines=in_file.readlines()
+        in_file.close()
+        self.data_lines=strip_inline_comments(split_snp_lines(self.lines)[0],begin_token="!",end_token="\n")
+        self.lazy_lines=False
+
+    def read_file(self):
+        """Reads self.path with __read_and_fix__, if the option cache or the module constant TOUCHSTONE_CACHE is a
+        TouchstoneCache the parsed file is loaded from it when it is valid and stored in it when it is not"""
+        cache=self.options.get("cache")
+        if cache is None:
+            cache=TOUCHSTONE_CACHE
+        if cache is not None and cache.load(self):
+            return
+        self.__read_and_fix__()
+        if cache is not None:
+            cache.save(self)
+
     def __str__(self):
         "Controls how the model displays when print and str are called"
         self.string=self.build_string()
@@ -406,9 +659,22 @@ class SNPBase():
             return out_list
         except:raise
 
+    def get_sparameter_array(self):
+        """Returns the frequency array and an (number_frequencies,number_ports,number_ports) complex array of the
+        sparameters with [:,i,j]=S(i+1)(j+1), sparameter_complex is the source of the values"""
+        sparameter_complex=np.array(self.sparameter_complex,dtype=np.complex128)
+        number_ports=int(round(math.sqrt(sparameter_complex.shape[-1]-1)))
+        sparameters=sparameter_complex[:,1:].reshape(-1,number_ports,number_ports)
+        if number_ports==2:
+            sparameters=sparameters.transpose(0,2,1)
+        return sparameter_complex[:,0].real,sparameters
+
     def change_frequency_units(self,new_frequency_units=None):
         """Changes the frequency units from the current to new_frequency_units. Frequency units must be one
-        an accepted scientific prefix, function is case sensitive (mHz=milli Hertz, MHz=Mega Hertz) """
+        an accepted scientific prefix, function is case sensitive (mHz=milli Hertz, MHz=Mega Hertz).
+        The frequency column is scaled in one pass as floats. The values are always scaled from the frequencies
+        as they were before the first change (self.frequency_reference), so repeated changes do not accumulate
+        round off, unless the frequency column has been changed since the last unit change """
         multipliers={"yotta":10.**24,"Y":10.**24,"zetta":10.**21,"Z":10.**21,"exa":10.**18,"E":10.**18,"peta":10.**15,
                      "P":10.**15,"tera":10.**12,"T":10.**12,"giga":10.**9,"G":10.**9,"mega":10.**6,"M":10.**6,
                      "kilo":10.**3,"k":10.**3,"hecto":10.**2,"h":10.**2,"deka":10.,"da":10.,None:1.,"":1.,
@@ -431,32 +697,24 @@ class SNPBase():
             new_unit=new_prefix+unit
             if column_selector in self.column_names:
                 column_selector=self.column_names.index(column_selector)
-            for index,row in enumerate(self.data[:]):
-                if type(self.data[index][column_selector]) in [FloatType,LongType]:
-                    #print "{0:e}".format(multipliers[old_prefix]/multipliers[new_prefix])
-                    self.data[index][column_selector]=\
-                    (multipliers[old_prefix]/multipliers[new_prefix])*self.data[index][column_selector]
-                    self.sparameter_complex[index][column_selector]=\
-                    (multipliers[old_prefix]/multipliers[new_prefix])*self.sparameter_complex[index][column_selector]
-                elif type(self.data[index][column_selector]) in [StringType,IntType]:
-                    self.data[index][column_selector]=\
-                    str((multipliers[old_prefix]/multipliers[new_prefix])*float(self.data[index][column_selector]))
-                    self.sparameter_complex[index][column_selector]=\
-                    str((multipliers[old_prefix]/multipliers[new_prefix])*float(self.sparameter_complex[index][column_selector]))
-                else:
-                    print(type(self.data[index][column_selector]))
-                    raise
-            for index,row in enumerate(self.noiseparameter_data[:]):
-                if type(self.noiseparameter_data[index][column_selector]) in [FloatType,LongType]:
-                    #print "{0:e}".format(multipliers[old_prefix]/multipliers[new_prefix])
-                    self.noiseparameter_data[index][column_selector]=\
-                    (multipliers[old_prefix]/multipliers[new_prefix])*self.noiseparameter_data[index][column_selector]
-                elif type(self.noiseparameter_data[index][column_selector]) in [StringType,IntType]:
-                    self.noiseparameter_data[index][column_selector]=\
-                    str((multipliers[old_prefix]/multipliers[new_prefix])*float(self.noiseparameter_data[index][column_selector]))
-                else:
-                    print(type(self.noiseparameter_data[index][column_selector]))
-                    raise
+            frequency_column=[row[column_selector] for row in self.data]
+            if "frequency_reference" in self.__dict__ and self.frequency_reference[2]==frequency_column:
+                reference_values,reference_multiplier,last_values=self.frequency_reference
+            else:
+                reference_values=np.array(frequency_column,dtype=np.float64)
+                reference_multiplier=multipliers[old_prefix]
+            new_values=((reference_multiplier/multipliers[new_prefix])*reference_values).tolist()
+            for index,row in enumerate(self.data):
+                row[column_selector]=new_values[index]
+            for index,row in enumerate(self.sparameter_complex[:len(new_values)]):
+                row[column_selector]=new_values[index]
+            self.frequency_reference=[reference_values,reference_multiplier,new_values]
+            if self.noiseparameter_data:
+                noise_frequencies=np.array([row[column_selector] for row in self.noiseparameter_data],
+                                           dtype=np.float64)
+                noise_frequencies=((multipliers[old_prefix]/multipliers[new_prefix])*noise_frequencies).tolist()
+                for index,row in enumerate(self.noiseparameter_data):
+                    row[column_selector]=noise_frequencies[index]
             old_unit_pattern=re.compile(old_unit,re.IGNORECASE)
             self.frequency_units=new_frequency_units
             self.option_line=re.sub(old_unit_pattern,new_unit,self.option_line)
@@ -623,8 +881,8 @@ class S1PV1(SNPBase):
                   "path":None,
                   "column_units":None,
                   "sparameter_begin_line":1,
-                  "sparameter_end_line":None
-
+                  "sparameter_end_line":None,
+                  "cache":None
                   }
         self.options={}
         for key,value in defaults.items():
@@ -637,7 +895,7 @@ class S1PV1(SNPBase):
         self.metadata=self.options["metadata"]
         if file_path is not None:
             self.path=file_path
-            self.__read_and_fix__()
+            self.read_file()
         else:
             for element in self.elements:
                 self.__dict__[element]=self.options[element]
@@ -735,13 +993,15 @@ class S1PV1(SNPBase):
         self.sparameter_complex=[]
         self.options["sparameter_begin_line"]=self.options["sparameter_end_line"]=0
         data_lines=[]
+        row_pattern=re.compile(self.row_pattern)
         for index,line in enumerate(stripped_lines):
-            if re.search(self.row_pattern,line):
+            row_match=row_pattern.search(line)
+            if row_match:
                 data_lines.append(index)
-                #print re.search(self.row_pattern,line).groupdict()
-                row_data=re.search(self.row_pattern,line).groupdict()
+                row_data=row_match.groupdict()
                 self.add_sparameter_row(row_data=row_data)
-                self.add_sparameter_complex_row(row_data=row_data)
+        self.sparameter_complex=complex_array_to_sparameter_complex(*snp_data_to_complex_array(self.data,1,
+                                                                                              self.format))
         if data_lines != []:
             self.options["sparameter_begin_line"]=min(data_lines)+add_option_line
             self.options["sparameter_end_line"]=max(data_lines)+add_option_line
@@ -861,46 +1121,19 @@ class S1PV1(SNPBase):
     def change_data_format(self,new_format=None):
         """Changes the data format to new_format. Format must be one of the following: 'DB','MA','RI'
         standing for Decibel-Angle, Magnitude-Angle or Real-Imaginary as per the touchstone specification
-        all angles are in degrees."""
+        all angles are in degrees. The data is recalculated from sparameter_complex with numpy."""
         old_format=self.format
-
-        if re.match('db',new_format,re.IGNORECASE):
-            self.format="DB"
-            self.option_line=self.option_line.replace(old_format,"DB")
-            self.column_names=S1P_DB_COLUMN_NAMES
-            self.row_pattern=make_row_match_string(S1P_DB_COLUMN_NAMES)
-            for row_index,row in enumerate(self.data):
-                frequency=self.sparameter_complex[row_index][0]
-                dbS11=20.*math.log(abs(self.sparameter_complex[row_index][1]),10.)
-                argS11=(180./math.pi)*cmath.phase(self.sparameter_complex[row_index][1])
-                self.data[row_index]=[frequency,dbS11,argS11]
-
-        elif re.match('ma',new_format,re.IGNORECASE):
-            self.format="MA"
-            self.option_line=self.option_line.replace(old_format,"MA")
-            self.column_names=S1P_MA_COLUMN_NAMES
-            self.row_pattern=make_row_match_string(S1P_MA_COLUMN_NAMES)
-            for row_index,row in enumerate(self.data):
-                frequency=self.sparameter_complex[row_index][0]
-                magS11=abs(self.sparameter_complex[row_index][1])
-                argS11=(180./math.pi)*cmath.phase(self.sparameter_complex[row_index][1])
-                self.data[row_index]=[frequency,magS11,argS11]
-
-        elif re.match('ri',new_format,re.IGNORECASE):
-            self.format="RI"
-            self.option_line=self.option_line.replace(old_format,"RI")
-            self.column_names=S1P_RI_COLUMN_NAMES
-            self.row_pattern=make_row_match_string(S1P_RI_COLUMN_NAMES)
-            for row_index,row in enumerate(self.data):
-                frequency=self.sparameter_complex[row_index][0]
-                reS11=self.sparameter_complex[row_index][1].real
-                imS11=self.sparameter_complex[row_index][1].imag
-                self.data[row_index]=[frequency,reS11,imS11]
+        for data_format in FORMATS:
+            if re.match(data_format,new_format,re.IGNORECASE):
+                break
         else:
             print("Could not change data format the specified format was not DB, MA, or RI")
             return
-
-
+        self.format=data_format
+        self.option_line=self.option_line.replace(old_format,data_format)
+        self.column_names={"RI":S1P_RI_COLUMN_NAMES,"MA":S1P_MA_COLUMN_NAMES,"DB":S1P_DB_COLUMN_NAMES}[data_format]
+        self.row_pattern=make_row_match_string(self.column_names)
+        self.data=sparameter_complex_to_data(self.sparameter_complex[:len(self.data)],data_format)
 
 
 class S2PV1(SNPBase):
@@ -935,6 +1168,7 @@ class S2PV1(SNPBase):
                   "inline_comment_end":"",
                   "sparameter_begin_line":1,
                   "sparameter_end_line":None,
+                  "cache":None
                   }
         self.options={}
         for key,value in defaults.items():
@@ -948,7 +1182,7 @@ class S2PV1(SNPBase):
         self.noiseparameter_column_names=S2P_NOISE_PARAMETER_COLUMN_NAMES
         if file_path is not None:
             self.path=file_path
-            self.__read_and_fix__()
+            self.read_file()
         else:
             for element in self.elements:
                 self.__dict__[element]=self.options[element]
@@ -1049,17 +1283,19 @@ class S2PV1(SNPBase):
         self.options["noiseparameter_begin_line"]=self.options["noiseparameter_end_line"]=0
         data_lines=[]
         noise_lines=[]
+        row_pattern=re.compile(self.row_pattern)
         for index,line in enumerate(stripped_lines):
-            if re.search(self.row_pattern,line):
+            row_match=row_pattern.search(line)
+            if row_match:
                 data_lines.append(index)
-                #print re.search(self.row_pattern,line).groupdict()
-                row_data=re.search(self.row_pattern,line).groupdict()
+                row_data=row_match.groupdict()
                 self.add_sparameter_row(row_data=row_data)
-                self.add_sparameter_complex_row(row_data=row_data)
             elif re.match(self.noiseparameter_row_pattern,line):
                 noise_lines.append(index)
                 row_data=re.match(self.noiseparameter_row_pattern,line).groupdict()
                 self.add_noiseparameter_row(row_data=row_data)
+        self.sparameter_complex=complex_array_to_sparameter_complex(*snp_data_to_complex_array(self.data,2,
+                                                                                              self.format))
         if data_lines != []:
             self.options["sparameter_begin_line"]=min(data_lines)+add_option_line
             self.options["sparameter_end_line"]=max(data_lines)+add_option_line
@@ -1225,62 +1461,19 @@ class S2PV1(SNPBase):
     def change_data_format(self,new_format=None):
         """Changes the data format to new_format. Format must be one of the following: 'DB','MA','RI'
         standing for Decibel-Angle, Magnitude-Angle or Real-Imaginary as per the touchstone specification
-        all angles are in degrees."""
+        all angles are in degrees. The data is recalculated from sparameter_complex with numpy."""
         old_format=self.format
-
-        if re.match('db',new_format,re.IGNORECASE):
-            self.format="DB"
-            self.option_line=self.option_line.replace(old_format,"DB")
-            self.column_names=S2P_DB_COLUMN_NAMES
-            self.row_pattern=make_row_match_string(S2P_DB_COLUMN_NAMES)
-            for row_index,row in enumerate(self.sparameter_complex):
-                frequency=self.sparameter_complex[row_index][0]
-                dbS11=20.*math.log(abs(self.sparameter_complex[row_index][1]),10.)
-                argS11=(180./math.pi)*cmath.phase(self.sparameter_complex[row_index][1])
-                dbS21=20.*math.log(abs(self.sparameter_complex[row_index][2]),10.)
-                argS21=(180./math.pi)*cmath.phase(self.sparameter_complex[row_index][2])
-                dbS12=20.*math.log(abs(self.sparameter_complex[row_index][3]),10.)
-                argS12=(180./math.pi)*cmath.phase(self.sparameter_complex[row_index][3])
-                dbS22=20.*math.log(abs(self.sparameter_complex[row_index][4]),10.)
-                argS22=(180./math.pi)*cmath.phase(self.sparameter_complex[row_index][4])
-                self.data[row_index]=[frequency,dbS11,argS11,dbS21,argS21,dbS12,argS12,dbS22,argS22]
-
-        elif re.match('ma',new_format,re.IGNORECASE):
-            self.format="MA"
-            self.option_line=self.option_line.replace(old_format,"MA")
-            self.column_names=S2P_MA_COLUMN_NAMES
-            self.row_pattern=make_row_match_string(S2P_MA_COLUMN_NAMES)
-            for row_index,row in enumerate(self.sparameter_complex):
-                frequency=self.sparameter_complex[row_index][0]
-                magS11=abs(self.sparameter_complex[row_index][1])
-                argS11=(180./math.pi)*cmath.phase(self.sparameter_complex[row_index][1])
-                magS21=abs(self.sparameter_complex[row_index][2])
-                argS21=(180./math.pi)*cmath.phase(self.sparameter_complex[row_index][2])
-                magS12=abs(self.sparameter_complex[row_index][3])
-                argS12=(180./math.pi)*cmath.phase(self.sparameter_complex[row_index][3])
-                magS22=abs(self.sparameter_complex[row_index][4])
-                argS22=(180./math.pi)*cmath.phase(self.sparameter_complex[row_index][4])
-                self.data[row_index]=[frequency,magS11,argS11,magS21,argS21,magS12,argS12,magS22,argS22]
-
-        elif re.match('ri',new_format,re.IGNORECASE):
-            self.format="RI"
-            self.option_line=self.option_line.replace(old_format,"RI")
-            self.column_names=S2P_RI_COLUMN_NAMES
-            self.row_pattern=make_row_match_string(S2P_RI_COLUMN_NAMES)
-            for row_index,row in enumerate(self.sparameter_complex):
-                frequency=self.sparameter_complex[row_index][0]
-                reS11=self.sparameter_complex[row_index][1].real
-                imS11=self.sparameter_complex[row_index][1].imag
-                reS21=self.sparameter_complex[row_index][2].real
-                imS21=self.sparameter_complex[row_index][2].imag
-                reS12=self.sparameter_complex[row_index][3].real
-                imS12=self.sparameter_complex[row_index][3].imag
-                reS22=self.sparameter_complex[row_index][4].real
-                imS22=self.sparameter_complex[row_index][4].imag
-                self.data[row_index]=[frequency,reS11,imS11,reS21,imS21,reS12,imS12,reS22,imS22]
+        for data_format in FORMATS:
+            if re.match(data_format,new_format,re.IGNORECASE):
+                break
         else:
             print("Could not change data format the specified format was not DB, MA, or RI")
             return
+        self.format=data_format
+        self.option_line=self.option_line.replace(old_format,data_format)
+        self.column_names={"RI":S2P_RI_COLUMN_NAMES,"MA":S2P_MA_COLUMN_NAMES,"DB":S2P_DB_COLUMN_NAMES}[data_format]
+        self.row_pattern=make_row_match_string(self.column_names)
+        self.data=sparameter_complex_to_data(self.sparameter_complex,data_format)
 
 
     def correct_switch_terms(self,switch_terms=None,switch_terms_format='port'):
@@ -1342,6 +1535,7 @@ class SNP(SNPBase):
                   "inline_comment_end":"",
                   "sparameter_begin_line":1,
                   "sparameter_end_line":None,
+                  "cache":None
                   }
         self.options={}
         for key,value in defaults.items():
@@ -1370,18 +1564,10 @@ class SNP(SNPBase):
         self.noiseparameter_data=[]
         self.metadata=self.options["metadata"]
         # Determine the number of lines per sparameter
-        if self.number_ports in [1,2]:
-            self.number_lines_per_sparameter=1
-            self.wrap_value=8
-        elif self.number_ports in [3]:
-            self.number_lines_per_sparameter=3
-            self.wrap_value=6
-        else:
-            self.number_lines_per_sparameter=int(self.number_ports**2/4)
-            self.wrap_value=8
+        self.number_lines_per_sparameter,self.wrap_value=get_snp_line_layout(self.number_ports)
         if file_path is not None:
             self.path=file_path
-            self.__read_and_fix__()
+            self.read_file()
         else:
             # promote options to attributes
             for element in self.elements:
@@ -1423,25 +1609,8 @@ class SNP(SNPBase):
             else:
                 self.path=self.options["path"]
         # Need to be careful here, sparameters can have many lines
-        self.sparameter_lines=[]
-        for row in self.data[:]:
-            for line_number in range(self.number_lines_per_sparameter):
-                if line_number is 0:
-                    row_formatter=build_row_formatter(precision=9,number_columns=self.wrap_value+1)
-                    self.sparameter_lines.append(row_formatter.format(delimiter=self.options["data_delimiter"],
-                                                                      *row[:self.wrap_value+1]))
-                elif line_number>0 and line_number<self.number_lines_per_sparameter:
-                    row_formatter=build_row_formatter(precision=9,number_columns=self.wrap_value)
-                    offset=1+self.wrap_value*(line_number)
-                    span=self.wrap_value
-                    self.sparameter_lines.append(row_formatter.format(delimiter=self.options["data_delimiter"],
-                                                                      *row[offset:offset+span]))
-                elif line_number<self.number_lines_per_sparameter-1:
-                    offset=1+self.wrap_value*(line_number)
-                    span=len(row)-offset
-                    row_formatter=build_row_formatter(precision=9,number_columns=span)
-                    self.sparameter_lines.append(row_formatter.format(delimiter=self.options["data_delimiter"],
-                                                                      *row[offset:offset+span]))
+        self.sparameter_lines=build_snp_lines(self.data,self.number_ports,
+                                              delimiter=self.options["data_delimiter"])
         #print("{0} is {1}".format("len(self.sparameter_lines)",len(self.sparameter_lines)))
         self.options["column_types"]=["float" for column in self.column_names[:]]
     def __read_and_fix__(self):
@@ -1456,22 +1625,10 @@ class SNP(SNPBase):
         in_file=open(self.path,'r')
         # to keep the logic clean we will repeatedly cycle through self.lines
         # but in theory we could do it all on the line input stage
-        self.lines=[]
-        self.data_lines=[]
-        removed_lines=[]
-        for index,line in enumerate(in_file):
-            self.lines.append(line)
-            # if the line is just '\n' ignore it
-            if line in ["","\n"]:
-                removed_lines.append(index)
-                continue
-            #if the line is an option line collect it
-            elif re.search(OPTION_LINE_PATTERN,line,re.IGNORECASE):
-                continue
-            elif re.match(COMMENT_PATTERN,line,re.IGNORECASE):
-                continue
-            else:
-                self.data_lines.append(line)
+        self.lines=in_file.readlines()
+        in_file.close()
+        self.data_lines,removed_lines=split_snp_lines(self.lines)
+        option_line_pattern=re.compile(OPTION_LINE_PATTERN,re.IGNORECASE)
         # now we need to collect and extract all the inline comments
         # There should be two types ones that have char position EOL, -1 or 0
         self.comments=collect_inline_comments(self.lines,begin_token="!",end_token="\n")
@@ -1494,7 +1651,7 @@ class SNP(SNPBase):
         self.option_line=default_option_line
         add_option_line=1
         for index,line in enumerate(self.lines):
-            if re.search(OPTION_LINE_PATTERN,line,re.IGNORECASE):
+            if "#" in line and option_line_pattern.search(line):
                 #print line
                 self.option_line=line.replace("\n","")
                 self.options["option_line_line"]=index
@@ -1506,12 +1663,19 @@ class SNP(SNPBase):
         # now the option line attributes are set deduce column properties from them
         self.column_names=build_snp_column_names(self.number_ports,self.format)
         #print stripped_lines
-        segments=[self.data_lines[i::self.number_lines_per_sparameter] for i in range(self.number_lines_per_sparameter)]
-        combined_list=combine_segments(segments)
-        self.data=parse_combined_float_list(combined_list)
-        self.sparameter_complex=[]
-        for row in self.data[:]:
-            self.add_sparameter_complex_row(row)
+        data_array=parse_snp_data_lines(self.data_lines,self.number_ports,self.number_lines_per_sparameter)
+        if data_array is None:
+            segments=[self.data_lines[i::self.number_lines_per_sparameter]
+                      for i in range(self.number_lines_per_sparameter)]
+            combined_list=combine_segments(segments)
+            self.data=parse_combined_float_list(combined_list)
+            self.sparameter_complex=[]
+            for row in self.data[:]:
+                self.add_sparameter_complex_row(row)
+        else:
+            self.data=data_array.tolist()
+            self.sparameter_complex=complex_array_to_sparameter_complex(
+                *snp_data_to_complex_array(data_array,self.number_ports,self.format))
         self.options["sparameter_begin_line"]=self.options["sparameter_end_line"]=0
 
     def build_string(self,**temp_options):
@@ -1546,23 +1710,12 @@ class SNP(SNPBase):
         #print("{0} is {1}".format('out_lines',out_lines))
         # now start writting data at first empty line after the option line
         #print("{0} is {1}".format('len(self.sparameter_lines)',len(self.sparameter_lines)))
-        out_line_number=0
-        for index,line in enumerate(self.sparameter_lines[:]):
-                value_written=False
-                while(not value_written):
-                    if out_line_number==self.options["option_line_line"]:
-                        out_line_number+=1
-                        continue
-                    elif out_line_number in comment_lines:
-                        out_line_number+=1
-                        continue
-                    else:
-                        #print out_lines
-                        #print index
-                        out_lines[out_line_number]=line
-                        out_line_number+=1
-                        #print("{0} is {1}".format('out_line_number',out_line_number))
-                        value_written=True
+        # the sparameter lines fill the lines that are not the option line or comments in order
+        skipped_lines=set(comment_lines)
+        skipped_lines.add(self.options["option_line_line"])
+        data_line_numbers=[line_number for line_number in range(number_lines) if line_number not in skipped_lines]
+        for line_number,line in zip(data_line_numbers,self.sparameter_lines):
+            out_lines[line_number]=line
 
         #print("{0} is {1}".format('out_lines',out_lines))
         #print("{0} is {1}".format('inline_comments',inline_comments))
@@ -1679,63 +1832,20 @@ class SNP(SNPBase):
     def change_data_format(self,new_format=None):
         """Changes the data format to new_format. Format must be one of the following: 'DB','MA','RI'
         standing for Decibel-Angle, Magnitude-Angle or Real-Imaginary as per the touchstone specification
-        all angles are in degrees."""
+        all angles are in degrees. The data is recalculated from sparameter_complex with numpy."""
         old_format=self.format
-
-        if re.match('db',new_format,re.IGNORECASE):
-            self.format="DB"
-            self.option_line=self.option_line.replace(old_format,"DB")
-            self.column_names=build_snp_column_names(self.number_ports,new_format)
-            for row_index,row in enumerate(self.sparameter_complex):
-                frequency=self.sparameter_complex[row_index][0]
-                complex_values=self.sparameter_complex[row_index][1:]
-                values=[]
-                for index,value in enumerate(complex_values):
-                    if value == complex(0,0):
-                        db=MINIMUM_DB_VALUE
-                        arg=MINIMUM_DB_ARG_VALUE
-                    else:
-                        db=20.*math.log(abs(value),10.)
-                        arg=(180./math.pi)*cmath.phase(value)
-                    values.append(db)
-                    values.append(arg)
-                new_row=[frequency]+values
-                self.data[row_index]=new_row
-
-        elif re.match('ma',new_format,re.IGNORECASE):
-            self.format="MA"
-            self.option_line=self.option_line.replace(old_format,"MA")
-            self.column_names=build_snp_column_names(self.number_ports,new_format)
-            for row_index,row in enumerate(self.sparameter_complex):
-                frequency=self.sparameter_complex[row_index][0]
-                complex_values=self.sparameter_complex[row_index][1:]
-                values=[]
-                for index,value in enumerate(complex_values):
-                    mag=abs(value)
-                    arg=(180./math.pi)*cmath.phase(value)
-                    values.append(mag)
-                    values.append(arg)
-                new_row=[frequency]+values
-                self.data[row_index]=new_row
-
-        elif re.match('ri',new_format,re.IGNORECASE):
-            self.format="RI"
-            self.option_line=self.option_line.replace(old_format,"RI")
-            self.column_names=build_snp_column_names(self.number_ports,new_format)
-            for row_index,row in enumerate(self.sparameter_complex):
-                frequency=self.sparameter_complex[row_index][0]
-                complex_values=self.sparameter_complex[row_index][1:]
-                values=[]
-                for index,value in enumerate(complex_values):
-                    re_part=value.real
-                    im_part=value.imag
-                    values.append(re_part)
-                    values.append(im_part)
-                new_row=[frequency]+values
-                self.data[row_index]=new_row
+        for data_format in FORMATS:
+            if re.match(data_format,new_format,re.IGNORECASE):
+                break
         else:
             print("Could not change data format the specified format was not DB, MA, or RI")
             return
+        self.format=data_format
+        self.option_line=self.option_line.replace(old_format,data_format)
+        self.column_names=build_snp_column_names(self.number_ports,data_format)
+        self.data=sparameter_complex_to_data(self.sparameter_complex,data_format)
+        self.sparameter_lines=build_snp_lines(self.data,self.number_ports,delimiter=self.options["data_delimiter"])
+
     def show(self,**options):
         """Shows the touchstone file"""
         defaults={"display_legend":True,
@@ -1789,6 +1899,128 @@ class SNP(SNPBase):
             plt.show()
             return fig
 
+class SNPStatistics(object):
+    """SNPStatistics accumulates the count, mean and variance (Welford's method) of the data of touchstone models
+    (S1PV1, S2PV1, SNP or file paths to them) one model at a time, so the memory used does not depend on the
+    number of models. Rows are aligned by frequency with a dictionary {frequency:row}, rows with the same frequency
+    in a single model are averaged first, and every model has the same weight. The models should have the same
+    format and number of ports.
+        #!python
+        >>statistics=SNPStatistics()
+        >>for file_path in file_paths:
+        >>    statistics.add(file_path)
+        >>mean=statistics.get_mean_model()
+        >>standard_deviation=statistics.get_standard_deviation_model()
+    """
+    def __init__(self,frequency_selector=0):
+        """Initializes an empty accumulator, frequency_selector is the index of the frequency column"""
+        self.frequency_selector=frequency_selector
+        self.frequency_index={}
+        self.frequencies=[]
+        self.count=None
+        self.mean=None
+        self.sum_squared_deviations=None
+        self.number_models=0
+        self.model_class=None
+        self.number_ports=None
+        self.option_line=None
+        self.last_frequencies=None
+        self.last_rows=None
+
+    def add(self,model):
+        """Adds a touchstone model or the path to a touchstone file to the statistics"""
+        if isinstance(model,StringType):
+            number_ports=number_ports_from_file_name(model)
+            if number_ports==1:
+                model=S1PV1(model)
+            elif number_ports==2:
+                model=S2PV1(model)
+            else:
+                model=SNP(model,number_ports=number_ports)
+        if self.model_class is None:
+            self.model_class=model.__class__
+            self.number_ports=getattr(model,"number_ports",None)
+            self.option_line=model.option_line
+        data=np.array(model.data,dtype=np.float64)
+        if data.size==0:
+            return
+        frequencies=data[:,self.frequency_selector].tolist()
+        values=np.delete(data,self.frequency_selector,axis=1)
+        if len(set(frequencies))!=len(frequencies):
+            # average the rows of this model that have the same frequency
+            unique_frequencies,inverse=np.unique(data[:,self.frequency_selector],return_inverse=True)
+            sums=np.zeros((len(unique_frequencies),values.shape[1]))
+            np.add.at(sums,inverse,values)
+            values=sums/np.bincount(inverse)[:,np.newaxis]
+            frequencies=unique_frequencies.tolist()
+        if frequencies==self.last_frequencies:
+            rows=self.last_rows
+        else:
+            rows=np.array([self.get_row(frequency) for frequency in frequencies],dtype=np.intp)
+            self.last_frequencies=frequencies
+            self.last_rows=rows
+        if self.mean is None:
+            self.count=np.zeros(len(self.frequencies))
+            self.mean=np.zeros((len(self.frequencies),values.shape[1]))
+            self.sum_squared_deviations=np.zeros((len(self.frequencies),values.shape[1]))
+        elif len(self.frequencies)>len(self.count):
+            new_rows=len(self.frequencies)-len(self.count)
+            self.count=np.concatenate([self.count,np.zeros(new_rows)])
+            self.mean=np.concatenate([self.mean,np.zeros((new_rows,values.shape[1]))])
+            self.sum_squared_deviations=np.concatenate([self.sum_squared_deviations,
+                                                        np.zeros((new_rows,values.shape[1]))])
+        self.count[rows]+=1
+        delta=values-self.mean[rows]
+        self.mean[rows]+=delta/self.count[rows][:,np.newaxis]
+        self.sum_squared_deviations[rows]+=delta*(values-self.mean[rows])
+        self.number_models+=1
+
+    def add_models(self,models):
+        """Adds each model or file path in the iterable models to the statistics"""
+        for model in models:
+            self.add(model)
+
+    def get_row(self,frequency):
+        """Returns the accumulator row for frequency, adding a new row if the frequency has not been seen"""
+        row=self.frequency_index.get(frequency)
+        if row is None:
+            row=len(self.frequencies)
+            self.frequency_index[frequency]=row
+            self.frequencies.append(frequency)
+        return row
+
+    def get_data(self,values):
+        """Returns a data list with the frequency column inserted in front of values, sorted by frequency"""
+        order=np.argsort(self.frequencies,kind="stable")
+        data=np.insert(values[order],self.frequency_selector,np.array(self.frequencies)[order],axis=1)
+        return data.tolist()
+
+    def build_model(self,values):
+        """Returns a model of the same class as the first model added with data built from values"""
+        options={"data":self.get_data(values),"option_line":self.option_line}
+        if self.model_class is SNP:
+            options["number_ports"]=self.number_ports
+            options["extension"]="s{0}p".format(self.number_ports)
+        return self.model_class(None,**options)
+
+    def get_mean_model(self):
+        """Returns the mean of the models added as a model"""
+        return self.build_model(self.mean)
+
+    def get_standard_deviation_model(self,ddof=1):
+        """Returns the standard deviation of the models added as a model, ddof=1 is the sample standard deviation.
+        Frequencies with ddof or fewer models are nan"""
+        with np.errstate(invalid="ignore",divide="ignore"):
+            variance=self.sum_squared_deviations/(self.count-ddof)[:,np.newaxis]
+        variance[self.count<=ddof]=np.nan
+        return self.build_model(np.sqrt(variance))
+
+    def get_count_model(self):
+        """Returns an AsciiDataTable with columns Frequency and Count, the number of models at each frequency"""
+        order=np.argsort(self.frequencies,kind="stable")
+        data=[[self.frequencies[row],int(self.count[row])] for row in order]
+        return AsciiDataTable(None,column_names=["Frequency","Count"],data=data,column_types=["float","int"])
+
 #-----------------------------------------------------------------------------
 # Module Scripts
 def test_option_string():
@@ -1933,6 +2165,17 @@ def test_s2p_mean(s2p_list=["thru.s2p","thru.s2p"]):
         s2p_models.append(S2PV1(file_name))
     mean=s2p_mean(s2p_models)
     mean.show()
+def test_SNPStatistics(file_paths=["thru.s2p","thru.s2p","704b.S2P"]):
+    """Tests the SNPStatistics class by adding the files in TESTS_DIRECTORY"""
+    os.chdir(TESTS_DIRECTORY)
+    statistics=SNPStatistics()
+    statistics.add_models(file_paths)
+    print(("{0} models were added".format(statistics.number_models)))
+    print(("The first row of the mean is {0}".format(statistics.get_mean_model().data[0])))
+    print(("The first row of the standard deviation is {0}".format(
+        statistics.get_standard_deviation_model().data[0])))
+    print(statistics.get_count_model().data[:3])
+
 def test_s2p_difference(s2p_one="thru.s2p",s2p_two="thru.s2p"):
     """Tests the s2p_difference function by applying it the files in TESTS_DIRECTORY"""
     os.chdir(TESTS_DIRECTORY)
@@ -1960,6 +2203,43 @@ def test_add_comment(file_path="thru.s2p"):
     s2p.add_comment("A new comment")
     print(s2p)
 
+def test_snp_sparameter_array(file_path="setup20101028.s4p"):
+    """Tests reading a snp file into a (number_frequencies,number_ports,number_ports) array and writing it back"""
+    os.chdir(TESTS_DIRECTORY)
+    new_table=SNP(file_path)
+    frequency,sparameters=new_table.get_sparameter_array()
+    print(("The sparameter array for {0} has shape {1}".format(file_path,sparameters.shape)))
+    print(("S12 at the first frequency {0} is {1}".format(frequency[0],sparameters[0,0,1])))
+    print(("The sparameter_complex rebuilt from the array is the same: {0}".format(
+        complex_array_to_sparameter_complex(frequency,sparameters)==new_table.sparameter_complex)))
+    lines=build_snp_lines(new_table.data,new_table.number_ports)
+    print(("The data lines parse back to the same data: {0}".format(
+        np.allclose(parse_snp_data_lines(lines,new_table.number_ports),new_table.data,rtol=1e-8))))
+
+def test_touchstone_cache(file_path="thru.s2p"):
+    """Tests the TouchstoneCache by reading file_path without and with a cache"""
+    os.chdir(TESTS_DIRECTORY)
+    cache=TouchstoneCache()
+    for model_class in [S2PV1,SNP]:
+        parsed=model_class(file_path)
+        cache.remove(parsed)
+        start=datetime.datetime.now()
+        model_class(file_path,cache=cache)
+        middle=datetime.datetime.now()
+        cached=model_class(file_path,cache=cache)
+        stop=datetime.datetime.now()
+        print(("{0} parse and store took {1}, cached load took {2}".format(model_class.__name__,middle-start,
+                                                                        stop-middle)))
+        print(("The cached data is the same as the parsed data: {0}".format(
+            cached.data==parsed.data and cached.sparameter_complex==parsed.sparameter_complex
+            and str(cached)==str(parsed))))
+        print(("The cached model read the file lines on first use: {0}".format(
+            "lines" not in cached.__dict__ and cached.lines==parsed.lines)))
+        if model_class is SNP:
+            print(("The cached data_lines are the same as the parsed data_lines: {0}".format(
+                cached.data_lines==parsed.data_lines)))
+        cache.remove(parsed)
+
 #-----------------------------------------------------------------------------
 # Module Runner
 if __name__ == '__main__':
@@ -1982,7 +2262,11 @@ if __name__ == '__main__':
     test_s2p_mean()
     test_s2p_difference()
     test_s2p_mean(["thru.s2p","thru.s2p","thru.s2p"])
+    test_SNPStatistics()
     test_s2p_mean_and_difference()
     test_SNP('Solution_0.s4p')
     test_change_format_SNP('Solution_0.s4p')
     test_add_comment()
+    test_snp_sparameter_array('Solution_0.s4p')
+    test_snp_sparameter_array('B7_baseline_50ohm_OR2_10n0_4p0_REV2_EVB1_01new.s3p')
+    test_touchstone_cache()
@@ -305,8 +305,9 @@ def AsciiDataTable_to_XmlDataTable(ascii_data_table,**options):
     for key,value in options.items():
         XML_options[key]=value
     # Todo: Clean this up so the AsciiDataTable.column_names always goes to an XML attribute that is properly named
-    for index,column_name in enumerate(ascii_data_table.column_names[:]):
-        ascii_data_table.column_names[index]=column_name.replace("*","_times_").replace("/","_div_").replace("(","_").replace(")","_").replace("-","_")
+    # the names are cleaned in a copy, the table can be read by other conversions at the same time
+    column_names=[column_name.replace("*","_times_").replace("/","_div_").replace("(","_").replace(")","_").replace("-","_")
+                  for column_name in ascii_data_table.column_names]
 
     data_description={}
     if ascii_data_table.options["column_descriptions"] is not None:
@@ -315,7 +316,7 @@ def AsciiDataTable_to_XmlDataTable(ascii_data_table,**options):
                 data_description[key]=value
         elif isinstance(ascii_data_table.options["column_descriptions"], ListType):
             for index,value in enumerate(ascii_data_table.options["column_descriptions"]):
-                key=ascii_data_table.column_names[index]
+                key=column_names[index]
                 data_description[key]=value
 
     if ascii_data_table.metadata is not None:
@@ -330,7 +331,11 @@ def AsciiDataTable_to_XmlDataTable(ascii_data_table,**options):
             for index,line in enumerate(ascii_data_table.footer):
                 key="Footer_{0:0>3}".format(index)
                 data_description[key]=line
-    data_dictionary={"Data_Description":data_description,"Data":ascii_data_table.get_data_dictionary_list()}
+    data_list=ascii_data_table.get_data_dictionary_list()
+    if data_list is not None:
+        data_list=[{column_names[index]:row[column_name]
+                    for index,column_name in enumerate(ascii_data_table.column_names)} for row in data_list]
+    data_dictionary={"Data_Description":data_description,"Data":data_list}
     XML_options["data_dictionary"]=data_dictionary
     new_xml_data_table=DataTable(None,**XML_options)
     return new_xml_data_table
@@ -1760,6 +1765,153 @@ def ABCDFrequencyList_to_SFrequencyList(ABCD_frequency_list,Z01=complex(50,0),Z0
     return s_frequency_list
 
 
+# Array versions of the two-port conversions, a FrequencyArray is a list [frequency_array, parameter_array] where
+# parameter_array is a complex numpy array of shape (N,2,2) so that each conversion is a single numpy expression
+def FrequencyList_to_FrequencyArray(frequency_list):
+    """Converts a list of form [[f,m11,m12,m21,m22],...] to a list of form [frequency_array,matrix_array] where
+    matrix_array has shape (N,2,2) and matrix_array[i]=[[m11,m12],[m21,m22]].
+    inverse of FrequencyArray_to_FrequencyList"""
+    frequency_array=np.array([row[0] for row in frequency_list])
+    matrix_array=np.array([row[1:5] for row in frequency_list],dtype=np.complex128).reshape((-1,2,2))
+    return [frequency_array,matrix_array]
+
+def FrequencyArray_to_FrequencyList(frequency_array_list):
+    """Converts a list of form [frequency_array,matrix_array] to a list of form [[f,m11,m12,m21,m22],...]
+    inverse of FrequencyList_to_FrequencyArray"""
+    [frequency_array,matrix_array]=frequency_array_list
+    values=matrix_array.reshape((-1,4)).tolist()
+    return [[frequency]+row for frequency,row in zip(np.asarray(frequency_array).tolist(),values)]
+
+def FrequencyMatrixList_to_FrequencyArray(frequency_matrix_list):
+    """Converts a list of form [[f,np.matrix([[m11,m12],[m21,m22]])],...] to a list of form
+    [frequency_array,matrix_array], inverse of FrequencyArray_to_FrequencyMatrixList"""
+    frequency_array=np.array([row[0] for row in frequency_matrix_list])
+    matrix_array=np.array([np.asarray(row[1]) for row in frequency_matrix_list],dtype=np.complex128).reshape((-1,2,2))
+    return [frequency_array,matrix_array]
+
+def FrequencyArray_to_FrequencyMatrixList(frequency_array_list):
+    """Converts a list of form [frequency_array,matrix_array] to a list of form
+    [[f,np.matrix([[m11,m12],[m21,m22]])],...], inverse of FrequencyMatrixList_to_FrequencyArray"""
+    [frequency_array,matrix_array]=frequency_array_list
+    return [[frequency,np.matrix(matrix)] for frequency,matrix in zip(np.asarray(frequency_array).tolist(),
+                                                                      matrix_array)]
+
+def matrix_array_from_elements(m11,m12,m21,m22):
+    """Returns a (N,2,2) complex array given the four element arrays"""
+    matrix_array=np.empty((len(m11),2,2),dtype=np.complex128)
+    matrix_array[:,0,0]=m11
+    matrix_array[:,0,1]=m12
+    matrix_array[:,1,0]=m21
+    matrix_array[:,1,1]=m22
+    return matrix_array
+
+def positive_real_part(values):
+    """Returns the complex array values with the absolute value of the real part, the array version of
+    complex(abs(value.real),value.imag)"""
+    return np.abs(values.real)+1j*values.imag
+
+def SFrequencyArray_to_TFrequencyArray(s_frequency_array):
+    """Converts S-parameters into T parameters, input and output are in the form [frequency_array,(N,2,2) array].
+    Is the inverse of TFrequencyArray_to_SFrequencyArray"""
+    [frequency_array,m]=s_frequency_array
+    [S11,S12,S21,S22]=[m[:,0,0],m[:,0,1],m[:,1,0],m[:,1,1]]
+    return [frequency_array,matrix_array_from_elements(-(S11*S22-S12*S21)/S21,S11/S21,-S22/S21,1/S21)]
+
+def TFrequencyArray_to_SFrequencyArray(t_frequency_array):
+    """Converts T parameters into S-parameters, input and output are in the form [frequency_array,(N,2,2) array].
+    Is the inverse of SFrequencyArray_to_TFrequencyArray"""
+    [frequency_array,m]=t_frequency_array
+    [T11,T12,T21,T22]=[m[:,0,0],m[:,0,1],m[:,1,0],m[:,1,1]]
+    return [frequency_array,matrix_array_from_elements(T12/T22,(T11*T22-T12*T21)/T22,1/T22,-T21/T22)]
+
+def SFrequencyArray_to_ZFrequencyArray(s_frequency_array,Z01=complex(50,0),Z02=complex(50,0)):
+    """ Converts s parameters into z-parameters, input and output are in the form [frequency_array,(N,2,2) array].
+    The port 1 (Z01) and port 2 (Z01) impedances can be specified, default is 50."""
+    [frequency_array,m]=s_frequency_array
+    [S11,S12,S21,S22]=[m[:,0,0],m[:,0,1],m[:,1,0],m[:,1,1]]
+    denominator=-1*((1-S11)*(1-S22)-S12*S21)
+    Z11=((Z01.conjugate()+S11*Z01)*(1-S22)+S12*S21*Z01)/denominator
+    Z12=(2*S12*(Z01.real*Z02.real)**(.5))/denominator
+    Z21=(2*S21*(Z01.real*Z02.real)**(.5))/denominator
+    Z22=((1-S11)*(Z02.conjugate()+S22*Z02)+S21*S12*Z02)/denominator
+    return [frequency_array,matrix_array_from_elements(positive_real_part(Z11),Z12,Z21,positive_real_part(Z22))]
+
+def ZFrequencyArray_to_TFrequencyArray(z_frequency_array,Z01=complex(50,0),Z02=complex(50,0)):
+    """ Converts z parameters into T parameters, input and output are in the form [frequency_array,(N,2,2) array].
+    The port 1 (Z01) and port 2 (Z01) impedances can be specified, default is 50."""
+    [frequency_array,m]=z_frequency_array
+    [Z11,Z12,Z21,Z22]=[m[:,0,0],m[:,0,1],m[:,1,0],m[:,1,1]]
+    denominator=2*Z21*(Z01.real*Z02.real)**(.5)
+    T11= ((Z11+Z01)*(Z22+Z02)-Z12*Z21)/denominator
+    T12=((Z11+Z01)*(Z02.conjugate()-Z22)+Z12*Z21)/denominator
+    T21=((Z11-Z01.conjugate())*(Z22+Z02)-Z12*Z21)/denominator
+    T22=((Z01.conjugate()-Z11)*(Z22-Z02.conjugate())+Z12*Z21)/denominator
+    return [frequency_array,matrix_array_from_elements(T11,T12,T21,T22)]
+
+def ZFrequencyArray_to_YFrequencyArray(z_frequency_array):
+    """ Converts Z parameters into Y-parameters by inverting all of the matrices at once,
+    inverse of YFrequencyArray_to_ZFrequencyArray"""
+    [frequency_array,m]=z_frequency_array
+    return [frequency_array,np.linalg.inv(m)]
+
+def YFrequencyArray_to_ZFrequencyArray(y_frequency_array):
+    """ Converts Y parameters into Z-parameters by inverting all of the matrices at once,
+    inverse of ZFrequencyArray_to_YFrequencyArray"""
+    [frequency_array,m]=y_frequency_array
+    return [frequency_array,np.linalg.inv(m)]
+
+def ZFrequencyArray_to_ABCDFrequencyArray(z_frequency_array):
+    """ Converts z parameters into ABCD-parameters, the ABCD array is [[A,B],[C,D]].
+    inverse of ABCDFrequencyArray_to_ZFrequencyArray"""
+    [frequency_array,m]=z_frequency_array
+    [Z11,Z12,Z21,Z22]=[m[:,0,0],m[:,0,1],m[:,1,0],m[:,1,1]]
+    return [frequency_array,matrix_array_from_elements(Z11/Z21,(Z11*Z22-Z12*Z21)/Z21,1/Z21,Z22/Z21)]
+
+def ABCDFrequencyArray_to_ZFrequencyArray(ABCD_frequency_array):
+    """ Converts ABCD parameters into z-parameters, inverse of ZFrequencyArray_to_ABCDFrequencyArray"""
+    [frequency_array,m]=ABCD_frequency_array
+    [A,B,C,D]=[m[:,0,0],m[:,0,1],m[:,1,0],m[:,1,1]]
+    return [frequency_array,matrix_array_from_elements(positive_real_part(A/C),(A*D-B*C)/C,1/C,
+                                                       positive_real_part(D/C))]
+
+def ABCDFrequencyArray_to_YFrequencyArray(ABCD_frequency_array):
+    """ Converts ABCD parameters into Y-parameters"""
+    [frequency_array,m]=ABCD_frequency_array
+    [A,B,C,D]=[m[:,0,0],m[:,0,1],m[:,1,0],m[:,1,1]]
+    return [frequency_array,matrix_array_from_elements(D/B,(B*C-A*D)/B,-1/B,A/B)]
+
+def YFrequencyArray_to_HFrequencyArray(y_frequency_array):
+    """ Converts Y parameters into h-parameters"""
+    [frequency_array,m]=y_frequency_array
+    [Y11,Y12,Y21,Y22]=[m[:,0,0],m[:,0,1],m[:,1,0],m[:,1,1]]
+    return [frequency_array,matrix_array_from_elements(1/Y11,-1*Y12/Y11,Y21/Y11,(Y11*Y22-Y12*Y21)/Y11)]
+
+def ABCDFrequencyArray_to_HFrequencyArray(ABCD_frequency_array):
+    """ Converts ABCD parameters into h-parameters"""
+    [frequency_array,m]=ABCD_frequency_array
+    [A,B,C,D]=[m[:,0,0],m[:,0,1],m[:,1,0],m[:,1,1]]
+    return [frequency_array,matrix_array_from_elements(B/D,(A*D-B*C)/D,-1/D,C/D)]
+
+def HFrequencyArray_to_ZFrequencyArray(h_frequency_array):
+    """ Converts h parameters into Z-parameters"""
+    [frequency_array,m]=h_frequency_array
+    [h11,h12,h21,h22]=[m[:,0,0],m[:,0,1],m[:,1,0],m[:,1,1]]
+    return [frequency_array,matrix_array_from_elements((h11*h22-h12*h21)/h22,positive_real_part(h12/h22),
+                                                       positive_real_part(-1*h21/h22),1/h22)]
+
+def ABCDFrequencyArray_to_SFrequencyArray(ABCD_frequency_array,Z01=complex(50,0),Z02=complex(50,0)):
+    """ Converts ABCD parameters into s-parameters, input and output are in the form
+    [frequency_array,(N,2,2) array]"""
+    [frequency_array,m]=ABCD_frequency_array
+    [A,B,C,D]=[m[:,0,0],m[:,0,1],m[:,1,0],m[:,1,1]]
+    denominator=A*Z02+B+C*Z01*Z02+D*Z01
+    S11=(A*Z02+B-C*Z01.conjugate()*Z02-D*Z01.conjugate())/denominator
+    S12=-1*(2*(Z01.real*Z02.real)**(.5))/denominator
+    S21=-1*(2*(Z01.real*Z02.real)**(.5))/denominator
+    S22=(-1*A*Z02.conjugate()+B-C*Z01*Z02+D*Z01)/denominator
+    return [frequency_array,matrix_array_from_elements(S11,S12,S21,S22)]
+
+
 def FileName_to_HtmlBase(file_path, xsl_directory=os.path.join(TESTS_DIRECTORY, "../XSL")):
     """Return an html version of the file for display"""
     file_location = file_path
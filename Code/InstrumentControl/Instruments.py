@@ -41,6 +41,10 @@ from types import *
 from ctypes import *
 import datetime,time
 import sys
+import copy
+import threading
+import queue
+import concurrent.futures
 
 #-------------------------------------------------------------------------------
 # Third Party Imports
@@ -130,9 +134,9 @@ def emulation_data(data=None):
     undecorated"""
     def method_decorator(method):
         def return_data(self,*args,**kwargs):
-            if self.emulation_mode and not data==None:
+            if self.emulation_mode and data is not None:
                 return data
-            elif data==None:
+            elif data is None:
                 print("No data was present to return in emulation_mode, returning None instead.")
                 return None
             else:
@@ -1053,11 +1057,39 @@ class VNA(VisaInstrument):
         for trace in traces:
             self.write("DISP:WIND{0}:TRAC{1}:DEL".format(window, trace))
 
-    @emulation_data(EMULATION_SWITCH_TERMS)
-    def measure_switch_terms(self, **options):
-        """Measures switch terms and returns a s2p table in forward and reverse format. To return in port format
-        set the option order= "PORT"""
-        defaults = {"view_trace": True,"initialize":True,"order":"FR"}
+    def wait_for_sweep(self, completion="sleep", sweep_factor=2):
+        """Waits for a triggered sweep to finish. The sweep takes ~ sweep_factor*#points/IFBW seconds. If
+        completion is 'sleep' it sleeps for the sweep time and then polls is_busy, if it is 'opc' it blocks on a
+        *OPC? query with the timeout raised to cover the sweep and if it is 'srq' it enables the operation complete
+        service request, sends *OPC and waits for the SRQ"""
+        sweep_time = len(self.frequency_list) * sweep_factor / float(self.IFBW)
+        if re.search("opc", completion, re.IGNORECASE):
+            timeout = self.resource.timeout
+            if timeout is not None:
+                self.resource.timeout = max(timeout, 2000. * sweep_time + 10000)
+            try:
+                self.query("*OPC?")
+            finally:
+                self.resource.timeout = timeout
+        elif re.search("srq", completion, re.IGNORECASE):
+            self.write("*CLS")
+            # bit 0 of the event status register is operation complete, bit 5 of the status byte is the
+            # event status summary
+            self.write("*ESE 1")
+            self.write("*SRE 32")
+            self.write("*OPC")
+            self.resource.wait_for_srq(timeout=int(2000. * sweep_time + 10000))
+            self.resource.read_stb()
+            self.write("*CLS")
+        else:
+            time.sleep(sweep_time)
+            while self.is_busy():
+                time.sleep(.01)
+
+    def acquire_switch_terms(self, **options):
+        """Triggers a switch term sweep, waits for it to complete and reads the raw forward and reverse trace
+        strings. Returns a dictionary that parse_switch_terms turns into a s2p table, see measure_switch_terms"""
+        defaults = {"view_trace": True,"initialize":True,"order":"FR","completion":"sleep"}
         self.measure_switch_term_options = {}
         for key, value in defaults.items():
             self.measure_switch_term_options[key] = value
@@ -1083,11 +1115,8 @@ class VNA(VisaInstrument):
         # Select Channel
         self.write("CALC1:SEL;")
         self.write("ABORT;TRIG:SING;")
-        # Sleep for the duration of the scan
-        time.sleep(len(self.frequency_list) * 2.5 / float(self.IFBW))
-        # wait for other functions to be completed
-        # while self.is_busy():
-        #     time.sleep(.01)
+        # wait for the duration of the scan
+        self.wait_for_sweep(self.measure_switch_term_options["completion"], sweep_factor=2.5)
         # Set the read format
         self.write("FORM:ASC,0")
         # Read in the data
@@ -1097,7 +1126,15 @@ class VNA(VisaInstrument):
             time.sleep(.01)
         self.write("CALC:PAR:SEL 'REV';")
         reverse_switch_string = self.query("CALC:DATA? SDATA")
-
+        return {"strings": [foward_switch_string, reverse_switch_string],
+                "frequency_list": self.frequency_list[:], "frequency_units": self.frequency_units,
+                "options": self.measure_switch_term_options.copy()}
+
+    def parse_switch_terms(self, raw_measurement):
+        """Parses a raw measurement from acquire_switch_terms and returns a S2PV1. It does not communicate with
+        the instrument so it can run while the next sweep is measured"""
+        [foward_switch_string, reverse_switch_string] = raw_measurement["strings"]
+        frequency_list = raw_measurement["frequency_list"]
         # Anritsu Specific String Parsing
         foward_switch_string=re.sub("#\d+\n","",foward_switch_string)
         reverse_switch_string=re.sub("#\d+\n","",reverse_switch_string)
@@ -1110,8 +1147,8 @@ class VNA(VisaInstrument):
         real_reverse = reverse_switch_list[0::2]
         imaginary_reverse = reverse_switch_list[1::2]
         switch_data = []
-        if re.search("f",self.measure_switch_term_options["order"],re.IGNORECASE):
-            for index, frequency in enumerate(self.frequency_list[:]):
+        if re.search("f",raw_measurement["options"]["order"],re.IGNORECASE):
+            for index, frequency in enumerate(frequency_list):
                 new_row = [frequency,
                            real_foward[index], imaginary_forward[index],
                            real_reverse[index], imaginary_reverse[index],
@@ -1119,8 +1156,8 @@ class VNA(VisaInstrument):
                            0, 0]
                 new_row = [float(x) for x in new_row]
                 switch_data.append(new_row)
-        elif re.search("p",self.measure_switch_term_options["order"],re.IGNORECASE):
-            for index, frequency in enumerate(self.frequency_list[:]):
+        elif re.search("p",raw_measurement["options"]["order"],re.IGNORECASE):
+            for index, frequency in enumerate(frequency_list):
                 new_row = [frequency,
                            real_reverse[index], imaginary_reverse[index],
                            real_foward[index], imaginary_forward[index],
@@ -1132,13 +1169,21 @@ class VNA(VisaInstrument):
         # add some options here about auto saving
         # do we want comment options?
         s2p = S2PV1(None, option_line=option_line, data=switch_data)
-        s2p.change_frequency_units(self.frequency_units)
+        s2p.change_frequency_units(raw_measurement["frequency_units"])
         return s2p
 
-    @emulation_data(EMULATION_S2P)
-    def measure_sparameters(self, **options):
-        """Triggers a single sparameter measurement for all 4 parameters and returns a SP2V1 object"""
-        defaults = {"trigger": "single"}
+    @emulation_data(EMULATION_SWITCH_TERMS)
+    def measure_switch_terms(self, **options):
+        """Measures switch terms and returns a s2p table in forward and reverse format. To return in port format
+        set the option order= "PORT". The option completion sets how the end of the sweep is found,
+        see wait_for_sweep"""
+        return self.parse_switch_terms(self.acquire_switch_terms(**options))
+
+    def acquire_sparameters(self, **options):
+        """Triggers a single sparameter sweep (if trigger is single), waits for it to complete and reads the
+        raw S11, S12, S21 and S22 trace strings. Returns a dictionary that parse_sparameters turns into a S2PV1,
+        see measure_sparameters"""
+        defaults = {"trigger": "single","completion":"sleep"}
         self.measure_sparameter_options = {}
         for key, value in defaults.items():
             self.measure_sparameter_options[key] = value
@@ -1147,8 +1192,8 @@ class VNA(VisaInstrument):
         if self.measure_sparameter_options["trigger"] in ["single"]:
             self.write("INITiate:CONTinuous OFF")
             self.write("ABORT;INITiate:IMMediate;*wai")
-            # now go to sleep for the time to take the scan
-            time.sleep(len(self.frequency_list) * 2 / float(self.IFBW))
+            # now wait for the time to take the scan
+            self.wait_for_sweep(self.measure_sparameter_options["completion"])
 
         # wait for other functions to be completed
         while self.is_busy():
@@ -1156,34 +1201,22 @@ class VNA(VisaInstrument):
         # Set the format to ascii and set up sweep definitions
         self.write('FORM:ASC,0')
         # First get the Sparameter lists
-        self.write('CALC:PAR:SEL S11')
-        self.write('CALC:FORM MLIN')
-        while self.is_busy():
-            time.sleep(.01)
-        s11_string = self.query('CALC:DATA? SDATA')
-
-        self.write('CALC:PAR:SEL S12')
-        self.write('CALC:FORM MLIN')
-        while self.is_busy():
-            time.sleep(.01)
-        s12_string = self.query('CALC:DATA? SDATA')
-        self.write('CALC:PAR:SEL S21')
-        self.write('CALC:FORM MLIN')
-        while self.is_busy():
-            time.sleep(.01)
-        s21_string = self.query('CALC:DATA? SDATA')
-        self.write('CALC:PAR:SEL S22')
-        self.write('CALC:FORM MLIN')
-        while self.is_busy():
-            time.sleep(.01)
-        s22_string = self.query('CALC:DATA? SDATA')
+        sparameter_strings = []
+        for sparameter in ["S11", "S12", "S21", "S22"]:
+            self.write('CALC:PAR:SEL {0}'.format(sparameter))
+            self.write('CALC:FORM MLIN')
+            while self.is_busy():
+                time.sleep(.01)
+            sparameter_strings.append(self.query('CALC:DATA? SDATA'))
+        return {"strings": sparameter_strings, "frequency_list": self.frequency_list[:],
+                "frequency_units": self.frequency_units, "options": self.measure_sparameter_options.copy()}
 
+    def parse_sparameters(self, raw_measurement):
+        """Parses a raw measurement from acquire_sparameters and returns a S2PV1. It does not communicate with
+        the instrument so it can run while the next sweep is measured"""
         # String Parsing, Vector star specific, but no harm to Keysight, Rohde
-        s11_string=re.sub("#\d+\n","",s11_string)
-        s12_string=re.sub("#\d+\n","",s12_string)
-        s21_string=re.sub("#\d+\n","",s21_string)
-        s22_string=re.sub("#\d+\n","",s22_string)
-
+        [s11_string, s12_string, s21_string, s22_string] = [re.sub("#\d+\n","",sparameter_string)
+                                                            for sparameter_string in raw_measurement["strings"]]
 
         s11_list = s11_string.replace("\n", "").split(",")
         s12_list = s12_string.replace("\n", "").split(",")
@@ -1199,7 +1232,7 @@ class VNA(VisaInstrument):
         reS22 = s22_list[0::2]
         imS22 = s22_list[1::2]
         sparameter_data = []
-        for index, frequency in enumerate(self.frequency_list[:]):
+        for index, frequency in enumerate(raw_measurement["frequency_list"]):
             new_row = [frequency,
                        reS11[index], imS11[index],
                        reS21[index], imS21[index],
@@ -1211,9 +1244,20 @@ class VNA(VisaInstrument):
         # add some options here about auto saving
         # do we want comment options?
         s2p = S2PV1(None, option_line=option_line, data=sparameter_data)
-        s2p.change_frequency_units(self.frequency_units)
+        s2p.change_frequency_units(raw_measurement["frequency_units"])
         return s2p
 
+    @emulation_data(EMULATION_S2P)
+    def measure_sparameters(self, **options):
+        """Triggers a single sparameter measurement for all 4 parameters and returns a SP2V1 object. The option
+        completion sets how the end of the sweep is found, see wait_for_sweep"""
+        return self.parse_sparameters(self.acquire_sparameters(**options))
+
+    def measure_sweeps(self, measurement="sparameters", number_sweeps=1, **options):
+        """Measures number_sweeps sweeps of measurement ('sparameters', 'switch_terms', 'w1p' or 'w2p') with a
+        VNASweepPipeline, so each sweep is parsed while the next one is measured. Returns a list of the tables,
+        see VNASweepPipeline for the options"""
+        return VNASweepPipeline(self, measurement, number_sweeps=number_sweeps, **options).run()
 
     def initialize_w2p(self,**options):
         """Initializes the system for w2p acquisition"""
@@ -1355,13 +1399,13 @@ class VNA(VisaInstrument):
             self.frequency_list = []
         return self.frequency_list[:]
 
-    @emulation_data(EMULATION_W1P)
-    def measure_w1p(self, **options):
-        """Triggers a single w1p measurement for a specified
-        port and returns a w1p object."""
+    def acquire_w1p(self, **options):
+        """Triggers a single w1p sweep for a specified port (if trigger is single), waits for it to complete and
+        reads the raw a and b trace strings. Returns a dictionary that parse_w1p turns into a w1p table,
+        see measure_w1p"""
         defaults = {"trigger": "single", "port": 1,
                     "b_name_list": ["A", "B", "C", "D"],
-                    "w1p_options": None}
+                    "w1p_options": None, "completion": "sleep"}
         self.measure_w1p_options = {}
         for key, value in defaults.items():
             self.measure_w1p_options[key] = value
@@ -1370,8 +1414,8 @@ class VNA(VisaInstrument):
         if self.measure_w1p_options["trigger"] in ["single"]:
             self.write("INITiate:CONTinuous OFF")
             self.write("ABORT;INITiate:IMMediate;*wai")
-            # now go to sleep for the time to take the scan
-            time.sleep(len(self.frequency_list) * 2 / float(self.IFBW))
+            # now wait for the time to take the scan
+            self.wait_for_sweep(self.measure_w1p_options["completion"])
 
         # wait for other functions to be completed
         while self.is_busy():
@@ -1390,7 +1434,13 @@ class VNA(VisaInstrument):
         while self.is_busy():
             time.sleep(.01)
         b_string = self.query('CALC:DATA? SDATA')
+        return {"strings": [a_string, b_string], "frequency_list": self.frequency_list[:],
+                "frequency_units": self.frequency_units, "options": self.measure_w1p_options.copy()}
 
+    def parse_w1p(self, raw_measurement):
+        """Parses a raw measurement from acquire_w1p and returns a w1p AsciiDataTable. It does not communicate
+        with the instrument so it can run while the next sweep is measured"""
+        [a_string, b_string] = raw_measurement["strings"]
         # Anritsu Specific String Parsing
         a_string=re.sub("#\d+\n","",a_string)
         b_string=re.sub("#\d+\n","",b_string)
@@ -1407,7 +1457,7 @@ class VNA(VisaInstrument):
         re_b = b_list[0::2]
         im_b = b_list[1::2]
         wparameter_data = []
-        for index, frequency in enumerate(self.frequency_list[:]):
+        for index, frequency in enumerate(raw_measurement["frequency_list"]):
             new_row = [frequency / 10. ** 9,
                        re_a[index], im_a[index],
                        re_b[index], im_b[index]]
@@ -1420,19 +1470,26 @@ class VNA(VisaInstrument):
                    "data": wparameter_data, "specific_descriptor": "Wave_Parameters",
                    "general_descriptor": "One_Port", "extension": "w1p",
                    "column_types":["float" for column in column_names]}
-        if self.measure_w1p_options["w1p_options"]:
-            for key,value in self.measure_w1p_options["w1p_options"].items():
+        if raw_measurement["options"]["w1p_options"]:
+            for key,value in raw_measurement["options"]["w1p_options"].items():
                 options[key]=value
         w1p = AsciiDataTable(None, **options)
         return w1p
 
-    @emulation_data(EMULATION_W2P)
-    def measure_w2p(self, **options):
-        """Triggers a single w2p measurement for a specified
-        port and returns a w2p object."""
+    @emulation_data(EMULATION_W1P)
+    def measure_w1p(self, **options):
+        """Triggers a single w1p measurement for a specified
+        port and returns a w1p object. The option completion sets how the end of the sweep is found,
+        see wait_for_sweep"""
+        return self.parse_w1p(self.acquire_w1p(**options))
+
+    def acquire_w2p(self, **options):
+        """Triggers a single w2p sweep for the specified ports (if trigger is single), waits for it to complete
+        and reads the raw wave parameter trace strings. Returns a dictionary that parse_w2p turns into a W2P,
+        see measure_w2p"""
         defaults = {"trigger": "single", "port1": 1,"port2":2,
                     "b_name_list": ["A", "B", "C", "D"],
-                    "w2p_options": None}
+                    "w2p_options": None, "completion": "sleep"}
         self.measure_w2p_options = {}
         for key, value in defaults.items():
             self.measure_w2p_options[key] = value
@@ -1441,8 +1498,8 @@ class VNA(VisaInstrument):
         if self.measure_w2p_options["trigger"] in ["single"]:
             self.write("INITiate:CONTinuous OFF")
             self.write("ABORT;INITiate:IMMediate;*wai")
-            # now go to sleep for the time to take the scan
-            time.sleep(len(self.frequency_list) * 2 / float(self.IFBW))
+            # now wait for the time to take the scan
+            self.wait_for_sweep(self.measure_w2p_options["completion"])
 
         # wait for other functions to be completed
         while self.is_busy():
@@ -1464,10 +1521,14 @@ class VNA(VisaInstrument):
             while self.is_busy():
                 time.sleep(.01)
             all_wave_raw_string .append(self.query('CALC:DATA? SDATA'))
+        return {"strings": all_wave_raw_string, "frequency_list": self.frequency_list[:],
+                "frequency_units": self.frequency_units, "options": self.measure_w2p_options.copy()}
 
+    def parse_w2p(self, raw_measurement):
+        """Parses a raw measurement from acquire_w2p and returns a W2P. It does not communicate with the
+        instrument so it can run while the next sweep is measured"""
         # Anritsu specific parsing
-        for index,wave in enumerate(all_wave_raw_string):
-            all_wave_raw_string[index]=re.sub("#\d+\n","",wave)
+        all_wave_raw_string=[re.sub("#\d+\n","",wave) for wave in raw_measurement["strings"]]
 
         # String Parsing
         all_wave_list=[x.replace("\n","").split(",") for x in all_wave_raw_string]
@@ -1475,7 +1536,7 @@ class VNA(VisaInstrument):
         re_all_wave_list = [a_list[0::2] for a_list in all_wave_list]
         im_all_wave_list = [a_list[1::2] for a_list in all_wave_list]
         wparameter_data = []
-        for index, frequency in enumerate(self.frequency_list[:]):
+        for index, frequency in enumerate(raw_measurement["frequency_list"]):
             re_row=[re[index] for re in re_all_wave_list ]
             im_row=[im[index] for im in im_all_wave_list]
             wave_row=[]
@@ -1486,8 +1547,8 @@ class VNA(VisaInstrument):
             new_row = [float(x) for x in new_row]
             wparameter_data.append(new_row)
         waveparameter_column_names=[]
-        for drive_port in [self.measure_w2p_options["port1"], self.measure_w2p_options["port2"]]:
-            for detect_port in [self.measure_w2p_options["port1"], self.measure_w2p_options["port2"]]:
+        for drive_port in [raw_measurement["options"]["port1"], raw_measurement["options"]["port2"]]:
+            for detect_port in [raw_measurement["options"]["port1"], raw_measurement["options"]["port2"]]:
                 for receiver in ["A","B"]:
                     for complex_type in ["re","im"]:
                         waveparameter_column_names.append("{3}{0}{1}_D{2}".format(receiver,
@@ -1501,12 +1562,172 @@ class VNA(VisaInstrument):
                    "data": wparameter_data, "specific_descriptor": "Wave_Parameters",
                    "general_descriptor": "Two_Port", "extension": "w2p",
                    "column_types":["float" for column in column_names]}
-        if self.measure_w2p_options["w2p_options"]:
-            for key,value in self.measure_w2p_options["w2p_options"].items():
+        if raw_measurement["options"]["w2p_options"]:
+            for key,value in raw_measurement["options"]["w2p_options"].items():
                 options[key]=value
         w2p = W2P(None, **options)
         return w2p
 
+    @emulation_data(EMULATION_W2P)
+    def measure_w2p(self, **options):
+        """Triggers a single w2p measurement for a specified
+        port and returns a w2p object. The option completion sets how the end of the sweep is found,
+        see wait_for_sweep"""
+        return self.parse_w2p(self.acquire_w2p(**options))
+
+class VNASweepPipeline(object):
+    """VNASweepPipeline overlaps VNA sweeps with parsing and saving for repeated measurements. An acquisition
+    thread triggers each sweep, waits for it to complete (*OPC? by default, see VNA.wait_for_sweep) and reads the
+    raw trace strings with vna.acquire_<measurement>, then sweep N is parsed with vna.parse_<measurement> on a
+    worker thread while sweep N+1 is measured. The tables are delivered in sweep order: they are saved if
+    save_data is True, passed to each function in consumers and put on results_queue, which ends with None.
+    Iterating over the pipeline yields the tables as they arrive. If vna.emulation_mode is True each sweep is a copy
+    of the emulation data returned by vna.measure_<measurement>. With queue_size>0 the tables have to be taken from
+    results_queue (iterate over the pipeline or use run) or the pipeline stopped before join, otherwise delivery
+    waits for room in the queue"""
+    def __init__(self, vna, measurement="sparameters", **options):
+        """Initializes the pipeline, measurement is 'sparameters', 'switch_terms', 'w1p' or 'w2p'.
+        measure_options are passed to vna.acquire_<measurement>"""
+        defaults = {"number_sweeps": 1, "completion": "opc", "workers": 1, "consumers": None,
+                    "measure_options": None, "queue_size": 0, "save_data": False, "directory": os.getcwd(),
+                    "specific_descriptor": "VNA", "general_descriptor": measurement.title()}
+        self.options = {}
+        for key, value in defaults.items():
+            self.options[key] = value
+        for key, value in options.items():
+            self.options[key] = value
+        self.vna = vna
+        self.measurement = measurement
+        if getattr(vna, "emulation_mode", False):
+            self.acquire = self.emulate_sweep
+            self.parse = self.copy_table
+        else:
+            self.acquire = getattr(vna, "acquire_" + measurement)
+            self.parse = getattr(vna, "parse_" + measurement)
+        self.measure_options = {"completion": self.options["completion"]}
+        if self.options["measure_options"]:
+            for key, value in self.options["measure_options"].items():
+                self.measure_options[key] = value
+        self.consumers = self.options["consumers"]
+        if self.consumers is None:
+            self.consumers = []
+        self.results_queue = queue.Queue(maxsize=self.options["queue_size"])
+        self.pending_queue = queue.Queue()
+        self.stop_event = threading.Event()
+        self.finished_event = threading.Event()
+        self.errors = []
+        self.acquisition_thread = None
+        self.delivery_thread = None
+
+    def emulate_sweep(self, **options):
+        """Returns the emulation data of vna.measure_<measurement>, used in place of vna.acquire_<measurement>
+        when the vna is in emulation_mode"""
+        table = getattr(self.vna, "measure_" + self.measurement)(**options)
+        if table is None:
+            raise VisaInstrumentError("There is no emulation data for measure_{0}".format(self.measurement))
+        return table
+
+    def copy_table(self, table):
+        """Returns a copy of an emulated table so that saving or changing one sweep does not change the others"""
+        return copy.deepcopy(table)
+
+    def start(self):
+        """Starts the acquisition and delivery threads and returns the pipeline"""
+        self.executor = concurrent.futures.ThreadPoolExecutor(max_workers=self.options["workers"])
+        self.acquisition_thread = threading.Thread(target=self.acquire_sweeps)
+        self.delivery_thread = threading.Thread(target=self.deliver_results)
+        self.acquisition_thread.daemon = True
+        self.delivery_thread.daemon = True
+        self.acquisition_thread.start()
+        self.delivery_thread.start()
+        return self
+
+    def acquire_sweeps(self):
+        """Measures the sweeps and submits each raw measurement to be parsed, runs on the acquisition thread"""
+        try:
+            for sweep_index in range(self.options["number_sweeps"]):
+                if self.stop_event.is_set():
+                    break
+                raw_measurement = self.acquire(**self.measure_options)
+                self.pending_queue.put(self.executor.submit(self.parse, raw_measurement))
+        except Exception as error:
+            self.errors.append(error)
+        finally:
+            self.pending_queue.put(None)
+
+    def deliver_results(self):
+        """Waits for the parsed tables in sweep order, saves them and passes them to the consumers and the
+        results_queue, runs on the delivery thread"""
+        while True:
+            future = self.pending_queue.get()
+            if future is None:
+                break
+            try:
+                table = future.result()
+                if self.options["save_data"]:
+                    extension = "s2p"
+                    if re.search("w1p|w2p", self.measurement, re.IGNORECASE):
+                        extension = self.measurement
+                    table.path = os.path.join(self.options["directory"],
+                                              auto_name(specific_descriptor=self.options["specific_descriptor"],
+                                                        general_descriptor=self.options["general_descriptor"],
+                                                        directory=self.options["directory"],
+                                                        extension=extension, padding=3))
+                    table.save()
+                for consumer in self.consumers:
+                    consumer(table)
+            except Exception as error:
+                self.errors.append(error)
+                self.stop_event.set()
+                continue
+            self.put_result(table)
+        self.executor.shutdown()
+        self.finished_event.set()
+        self.put_result(None)
+
+    def put_result(self, table):
+        """Puts table on results_queue, waiting for room in the queue until the pipeline is stopped. Returns False
+        if the table was dropped because the queue was full and the pipeline stopped"""
+        while True:
+            try:
+                self.results_queue.put(table, timeout=.1)
+                return True
+            except queue.Full:
+                if self.stop_event.is_set():
+                    return False
+
+    def __iter__(self):
+        """Yields the tables from results_queue until the pipeline is finished"""
+        while True:
+            try:
+                table = self.results_queue.get(timeout=.1)
+            except queue.Empty:
+                if self.finished_event.is_set():
+                    break
+                continue
+            if table is None:
+                break
+            yield table
+
+    def stop(self):
+        """Stops the pipeline after the current sweep, tables that do not fit in a full results_queue are dropped"""
+        self.stop_event.set()
+
+    def join(self):
+        """Waits for the pipeline to finish and raises the first error that happened in it. With queue_size>0
+        the tables have to be consumed or stop called first"""
+        self.acquisition_thread.join()
+        self.delivery_thread.join()
+        if self.errors:
+            raise self.errors[0]
+
+    def run(self):
+        """Starts the pipeline, waits for it to finish and returns a list of the tables"""
+        self.start()
+        tables = [table for table in self]
+        self.join()
+        return tables
+
 class PowerMeter(VisaInstrument):
     """Controls power meters"""
     def initialize(self):
@@ -1566,7 +1787,12 @@ class HighSpeedOscope(VisaInstrument):
         pass
 
     def measure_waves(self, **options):
-        """Returns data for a measurement in an AsciiDataTable"""
+        """Returns data for a measurement in an AsciiDataTable. If download_format is not ASCII the channels are
+        read as binary int16 into a preallocated array of shape (number_frames, number_channels, number_points),
+        converted to volts with the waveform y increment and origin if convert_to_volts is True and reshaped into
+        rows in one step. The counts, gains and offsets are kept in waveform_counts, waveform_gain and
+        waveform_offset. If stream_frames is True the counts array is a .npy file in directory (stream_path) that
+        each frame is written to as it arrives"""
         defaults = {"number_frames": 1, "number_points": self.get_number_points(),
                     "timebase_scale": self.get_timebase_scale(), "channels": [1, 2, 3, 4],
                     "initial_time_offset": self.get_time_position(), "timeout_measurement": 10000,
@@ -1574,6 +1800,7 @@ class HighSpeedOscope(VisaInstrument):
                     "specific_descriptor": "Scope", "general_descriptor": "Measurement", "add_header": False,
                     "output_table_options": {"data_delimiter": "\t", "treat_header_as_comment": True},
                     "download_format":"ASCII","verbose_timing":False,
+                    "convert_to_volts": True, "stream_frames": False
                     }
         self.measure_options = {}
         for key, value in defaults.items():
@@ -1609,6 +1836,24 @@ class HighSpeedOscope(VisaInstrument):
         # this is the way diogo did it
         # number of points
         number_points = self.measure_options["number_points"]
+        binary_download = not re.search("asc", self.measure_options["download_format"], re.IGNORECASE)
+        if binary_download:
+            waveform_shape = (self.measure_options["number_frames"], len(self.measure_options["channels"]),
+                              number_points)
+            if self.measure_options["stream_frames"]:
+                self.stream_path = os.path.join(self.measure_options["directory"],
+                                                auto_name(specific_descriptor=self.measure_options[
+                                                    "specific_descriptor"],
+                                                          general_descriptor=self.measure_options[
+                                                              "general_descriptor"],
+                                                          directory=self.measure_options["directory"],
+                                                          extension='npy', padding=3))
+                self.waveform_counts = np.lib.format.open_memmap(self.stream_path, mode='w+', dtype=np.int16,
+                                                                 shape=waveform_shape)
+            else:
+                self.waveform_counts = np.empty(waveform_shape, dtype=np.int16)
+            self.waveform_gain = np.ones(waveform_shape[:2])
+            self.waveform_offset = np.zeros(waveform_shape[:2])
         if self.measure_options["verbose_timing"]:
             setup_timer=datetime.datetime.now()
             time_difference=setup_timer-start_timer
@@ -1658,55 +1903,79 @@ class HighSpeedOscope(VisaInstrument):
                 # get data for channel 1
                 self.write(':WAV:SOUR CHAN{0}'.format(channel_read))
                 # get data
-                if re.search("asc", self.measure_options["download_format"], re.IGNORECASE):
+                if binary_download:
+                    if self.measure_options["convert_to_volts"]:
+                        self.waveform_gain[frame_index, channel_read_index] = float(self.query(':WAV:YINC?'))
+                        self.waveform_offset[frame_index, channel_read_index] = float(self.query(':WAV:YOR?'))
+                    # This downloads the data as signed 16bit ints straight into the frame array
+                    self.waveform_counts[frame_index, channel_read_index] = \
+                        self.resource.query_binary_values(':WAV:DATA?', datatype='h', is_big_endian=False,
+                                                          container=np.array)
+                else:
                     data_column = self.resource.query(':WAV:DATA?')
                     data_column = data_column.replace("\n", "").replace("1-", "-").split(",")
-                else:
-                    # This downloads the data as signed 16bit ints
-                    # Need a conversion to volts
-                    data_column=self.resource.query_binary_values(':WAV:DATA?', datatype='h')
-
-
-                new_frame.append(data_column)
+                    new_frame.append(data_column)
                 # print("{0} is {1}".format("data_column",data_column))
                 if self.measure_options["verbose_timing"]:
                     timer = datetime.datetime.now()
                     print(("Finshed Data Acquistion for Channel {0} at {1}".format(channel_read,timer)))
+            if binary_download and self.measure_options["stream_frames"]:
+                self.waveform_counts.flush()
             frames_data.append(new_frame)
 
 
         if self.measure_options["verbose_timing"]:
             timer = datetime.datetime.now()
             print(("Data Manipulation Began at {0}".format(timer)))
-        # reshape measurement data
-        measurement_data = [list(range(len(frames_data[0]))) for x in range(number_points * len(frames_data))]
-        #         print(len(measurement_data))
-        #         print(len(measurement_data[0]))
-        #         print("{0} is{1}".format("len(frames_data)",len(frames_data)))
-        #         print("{0} is{1}".format("len(frames_data[0])",len(frames_data[0])))
-        #         print("{0} is{1}".format("len(frames_data[0][0])",len(frames_data[0][0])))
-        if self.measure_options["verbose_timing"]:
-            timer = datetime.datetime.now()
-            print(("Data reshaping step1 ended at {0}".format(timer)))
-        for frame_index, frame in enumerate(frames_data):
-            for column_index, column in enumerate(frame):
-                for row_index, row in enumerate(column):
-                    number_rows = len(column)
-                    # print("{0} is {1}".format("([row_index+frame_index*number_rows],[column_index],[frame_index])",
-                    #([row_index + frame_index * number_rows], [column_index], [frame_index])))
-                    measurement_data[row_index + frame_index * number_rows][column_index] =frames_data[frame_index][column_index][row_index]
-
-        if self.measure_options["verbose_timing"]:
-            timer = datetime.datetime.now()
-            print(("Data reshaping step 2 ended at {0}".format(timer)))
         # reset timeout
         self.resource.timeout = timeout
-        data_out = []
-        time_start = self.measure_options["initial_time_offset"]
+        if binary_download:
+            if self.measure_options["convert_to_volts"]:
+                waveform_data = self.waveform_offset[:, :, np.newaxis] + \
+                                self.waveform_gain[:, :, np.newaxis] * self.waveform_counts
+            else:
+                waveform_data = self.waveform_counts
+            # frames are stacked in time, each row has a value for every channel
+            measurement_array = np.transpose(waveform_data, (0, 2, 1)).reshape(-1, waveform_data.shape[1])
+            time_start = self.measure_options["initial_time_offset"]
+            time_array = time_start + np.arange(len(measurement_array)) * time_step
+            if self.measure_options["convert_to_volts"]:
+                data_out = np.column_stack([time_array, measurement_array]).tolist()
+            else:
+                # counts stay python ints
+                data_out = [[time_value] + data_row for time_value, data_row in zip(time_array.tolist(),
+                                                                                     measurement_array.tolist())]
+            if self.measure_options["verbose_timing"]:
+                timer = datetime.datetime.now()
+                print(("Data reshaping ended at {0}".format(timer)))
+        else:
+            # reshape measurement data
+            measurement_data = [list(range(len(frames_data[0]))) for x in range(number_points * len(frames_data))]
+            #         print(len(measurement_data))
+            #         print(len(measurement_data[0]))
+            #         print("{0} is{1}".format("len(frames_data)",len(frames_data)))
+            #         print("{0} is{1}".format("len(frames_data[0])",len(frames_data[0])))
+            #         print("{0} is{1}".format("len(frames_data[0][0])",len(frames_data[0][0])))
+            if self.measure_options["verbose_timing"]:
+                timer = datetime.datetime.now()
+                print(("Data reshaping step1 ended at {0}".format(timer)))
+            for frame_index, frame in enumerate(frames_data):
+                for column_index, column in enumerate(frame):
+                    for row_index, row in enumerate(column):
+                        number_rows = len(column)
+                        # print("{0} is {1}".format("([row_index+frame_index*number_rows],[column_index],[frame_index])",
+                        #([row_index + frame_index * number_rows], [column_index], [frame_index])))
+                        measurement_data[row_index + frame_index * number_rows][column_index] =frames_data[frame_index][column_index][row_index]
 
-        for row_index, data_row in enumerate(measurement_data):
-            new_row = [time_start + row_index * time_step] + data_row
-            data_out.append(new_row)
+            if self.measure_options["verbose_timing"]:
+                timer = datetime.datetime.now()
+                print(("Data reshaping step 2 ended at {0}".format(timer)))
+            data_out = []
+            time_start = self.measure_options["initial_time_offset"]
+
+            for row_index, data_row in enumerate(measurement_data):
+                new_row = [time_start + row_index * time_step] + data_row
+                data_out.append(new_row)
         if self.measure_options["add_header"]:
             header = []
             for key, value in self.measure_options.items():
@@ -1724,7 +1993,7 @@ class HighSpeedOscope(VisaInstrument):
                          "extension": "dat",
                          "directory": self.measure_options["directory"],
                          "column_names": column_names}
-        if re.search("asc",self.measure_options["download_format"],re.IGNORECASE):
+        if not binary_download or self.measure_options["convert_to_volts"]:
             table_options["column_types"]=["float" for i in range(len(column_names))]
         else:
             table_options["column_types"]=["float"]+["int" for i in range(len(column_names)-1)]
@@ -1895,6 +2164,124 @@ def test_VisaInstrument(address="GPIB::21"):
     print(instrument.state_buffer)
     print(instrument.commands)
 
+def test_VNASweepPipeline(address="GPIB::16",number_sweeps=3):
+    """Tests the VNASweepPipeline class by measuring number_sweeps sparameter sweeps"""
+    vna=VNA(address)
+    vna.initialize()
+    start=time.time()
+    pipeline=VNASweepPipeline(vna,"sparameters",number_sweeps=number_sweeps,
+                              consumers=[lambda table:print(table.data[0])])
+    for index,table in enumerate(pipeline.start()):
+        print("Sweep {0} has {1} rows".format(index,len(table.data)))
+    pipeline.join()
+    print("{0} sweeps took {1} s".format(number_sweeps,time.time()-start))
+
+def test_VNASweepPipeline_mock(number_sweeps=5,number_points=11):
+    """Tests the order, error propagation and emulation_mode of VNASweepPipeline with a mock VNA resource that
+    returns the sweep number as the trace data, no instrument is needed"""
+    class MockResource(object):
+        def __init__(self,fail_sweep=None):
+            self.timeout=2000
+            self.sweep=-1
+            self.fail_sweep=fail_sweep
+        def write(self,command):
+            if re.search("INITiate:IMMediate",command):
+                self.sweep+=1
+                if self.sweep==self.fail_sweep:
+                    raise VisaInstrumentError("Mock sweep {0} failed".format(self.sweep))
+        def query(self,command):
+            if re.search(r"\*OPC\?",command):
+                time.sleep(.01)
+                return "1"
+            return ",".join(["{0}".format(self.sweep) for i in range(2*number_points)])+"\n"
+    def mock_vna(fail_sweep=None,emulation_mode=False):
+        vna=VNA.__new__(VNA)
+        vna.resource=MockResource(fail_sweep)
+        vna.emulation_mode=emulation_mode
+        vna.frequency_list=[float(i)*10**9 for i in range(1,number_points+1)]
+        vna.frequency_units="GHz"
+        vna.IFBW=10**6
+        return vna
+    consumed=[]
+    tables=mock_vna().measure_sweeps("sparameters",number_sweeps,workers=3,consumers=[consumed.append],
+                                     queue_size=1)
+    print("The sweeps were delivered in order: {0}".format([table.data[0][1] for table in tables]==
+                                                            [float(i) for i in range(number_sweeps)]))
+    print("The consumers got every sweep: {0}".format(consumed==tables))
+    pipeline=VNASweepPipeline(mock_vna(fail_sweep=2),"sparameters",number_sweeps=number_sweeps)
+    delivered=[table for table in pipeline.start()]
+    try:
+        pipeline.join()
+        print("The error in sweep 2 was not raised")
+    except VisaInstrumentError as error:
+        print("join raised '{0}' after {1} sweeps were delivered".format(error,len(delivered)))
+    if EMULATION_FILES_PRESENT:
+        emulation_data=copy.deepcopy(EMULATION_S2P.data)
+        tables=mock_vna(emulation_mode=True).measure_sweeps("sparameters",2)
+        print("The emulated sweeps are copies of EMULATION_S2P: {0}".format(
+            [table.data for table in tables]==[emulation_data,emulation_data]))
+        tables[0].data[0][1]=12345.
+        print("Changing one emulated sweep leaves the other and EMULATION_S2P unchanged: {0}".format(
+            tables[1].data==emulation_data and EMULATION_S2P.data==emulation_data))
+    pipeline=VNASweepPipeline(mock_vna(),"sparameters",number_sweeps=number_sweeps,queue_size=1).start()
+    pipeline.stop()
+    pipeline.join()
+    print("A stopped pipeline with a full queue joins with {0} sweep(s) queued".format(pipeline.results_queue.qsize()))
+
+def test_HighSpeedOscope_mock(number_frames=3,number_points=5,channels=[1,3]):
+    """Tests the ASCII and binary downloads, convert_to_volts and stream_frames of HighSpeedOscope.measure_waves
+    with a mock scope resource that returns 100*frame+10*channel+point as the counts, no instrument is needed"""
+    class MockResource(object):
+        def __init__(self):
+            self.timeout=2000
+            self.frame=-1
+            self.channel=None
+        def write(self,command):
+            if re.match(":DIG",command):
+                self.frame+=1
+            elif re.match(":WAV:SOUR",command):
+                self.channel=int(command[-1])
+        def counts(self):
+            return [100*self.frame+10*self.channel+point for point in range(number_points)]
+        def query(self,command):
+            if re.match(":WAV:YINC",command):
+                return "{0}".format(.001*self.channel)
+            elif re.match(":WAV:YOR",command):
+                return "{0}".format(.5*self.channel)
+            elif re.match(":WAV:DATA",command):
+                return ",".join(["{0}".format(count) for count in self.counts()])+"\n"
+            return "0"
+        def query_binary_values(self,command,datatype='h',is_big_endian=False,container=list):
+            return container(np.array(self.counts(),dtype=np.int16))
+    def mock_scope():
+        scope=HighSpeedOscope.__new__(HighSpeedOscope)
+        scope.resource=MockResource()
+        return scope
+    measure_options={"number_frames":number_frames,"number_points":number_points,"timebase_scale":1.,
+                     "initial_time_offset":0.,"channels":channels}
+    ascii_table=mock_scope().measure_waves(download_format="ASCII",**measure_options)
+    ascii_rows=[[float(value) for value in row] for row in ascii_table.data]
+    counts_table=mock_scope().measure_waves(download_format="WORD",convert_to_volts=False,**measure_options)
+    print("The binary counts have the same row and channel order as the ASCII download: {0}".format(
+        counts_table.data==ascii_rows))
+    print("The binary counts are ints: {0}".format(type(counts_table.data[0][1]) is int))
+    volts_table=mock_scope().measure_waves(download_format="WORD",**measure_options)
+    volts_rows=[[row[0]]+[.5*channel+.001*channel*count for channel,count in zip(channels,row[1:])]
+                for row in ascii_rows]
+    print("convert_to_volts applies YINC and YOR for every channel: {0}".format(
+        np.allclose(volts_table.data,volts_rows)))
+    scope=mock_scope()
+    stream_table=scope.measure_waves(download_format="WORD",stream_frames=True,directory=TESTS_DIRECTORY,
+                                     **measure_options)
+    streamed_counts=np.load(scope.stream_path)
+    print("The streamed .npy file holds every frame: {0}".format(
+        streamed_counts.shape==(number_frames,len(channels),number_points) and
+        np.array_equal(streamed_counts,scope.waveform_counts)))
+    print("The streamed table is the same as the in memory table: {0}".format(
+        np.allclose(stream_table.data,volts_table.data)))
+    del scope.waveform_counts,streamed_counts
+    os.remove(scope.stream_path)
+
 #-------------------------------------------------------------------------------
 # Module Runner       
 
@@ -1902,5 +2289,8 @@ if __name__ == '__main__':
     #test_IV()
     #test_find_description()
     test_VisaInstrument()
+    #test_VNASweepPipeline()
+    test_VNASweepPipeline_mock()
+    test_HighSpeedOscope_mock()
     #user_terminate=raw_input("Please Press Any key To Finish:")
     
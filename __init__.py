@@ -6,7 +6,9 @@ fashion (from pyMez.Code.Subpackage.Module import class_or_function). For clarit
 package importer (this file) has a constant VERBOSE_IMPORT = True that prints a list of each of the packages as it is
 imported. To change the imported API, change the dictionary API_MODULES to have an entry
 API_MODULE["Code.Subpackage.Module"]=True
- in this __init__.py file.
+ in this __init__.py file. Setting the environment variable PYMEZ_LAZY_IMPORT=1 before importing pyMez (python 3.7+)
+ defers the imports: a name to module index is read from the API module sources and cached in
+ pyMez_API_Index.pkl, and a module is only imported the first time one of its names is used.
 Designed by Aric Sanders 2016
 
  Examples
@@ -15,6 +17,12 @@ Designed by Aric Sanders 2016
     >>from pyMez import *
     >>test_AdvancedInterfaceFrame()
 
+    #!python
+    >>import os
+    >>os.environ["PYMEZ_LAZY_IMPORT"]="1"
+    >>import pyMez
+    >>pyMez.AsciiDataTable # only imports Code.DataHandlers.GeneralModels
+
  <h3><a href="../Examples/html/Examples_Home.html">All Examples</a></h3>
 
 Requirements
@@ -48,10 +56,18 @@ Help
 
 import os
 import sys
+import ast
+import pickle
+import importlib
 VERBOSE_IMPORT=True
 TIMED_IMPORT=True
 
 "Constant that determines if import statements are echoed to output"
+LAZY_IMPORT=os.environ.get("PYMEZ_LAZY_IMPORT","").lower() in ["1","true","yes","on"]
+"Constant that determines if the API modules are imported on first attribute access instead of at import time," \
+"set the environment variable PYMEZ_LAZY_IMPORT=1 before importing pyMez to turn it on (requires python 3.7+)"
+API_INDEX_PATH=os.path.join(os.path.dirname(os.path.realpath(__file__)),"pyMez_API_Index.pkl")
+"Path to the cached name to module index used by the lazy importer, it is rebuilt if any API module changes"
 # control the modules loaded in the API, this should be included in a pyMez Settings file
 # The new module load scheme can be for module in API_MODULES.keys()
 API_MODULES={"Code.Utils.Names":True,
@@ -106,26 +122,180 @@ API_MODULES={"Code.Utils.Names":True,
 "Dictionary that controls the definition of the API, this can be set to leave out any unwanted modules. Also it is" \
 "possible to discover all modules by API_MODULES.keys()"
 
+def get_api_module_path(module_name):
+    """Returns the path to the source file of an API module given its dotted name, for example
+    get_api_module_path("Code.DataHandlers.TouchstoneModels") returns .../pyMez/Code/DataHandlers/TouchstoneModels.py"""
+    package_directory=os.path.dirname(os.path.realpath(__file__))
+    return os.path.join(package_directory,*module_name.split("."))+".py"
+
+def get_module_names(module_name,visited_files=None,module_cache=None):
+    """Returns a tuple of lists (defined_names,imported_names) of the public names that
+    from module_name import * would bind, found by reading the module source with the ast module instead of importing
+    it. Star imports of other pyMez modules (from Code.Utils.Types import *) are followed. visited_files is a dictionary
+    of {file_path:modification_time} that is updated with every file read and module_cache a dictionary of
+    {module_name:(defined_names,imported_names)} so that each module is only read once"""
+    if visited_files is None:
+        visited_files={}
+    if module_cache is None:
+        module_cache={}
+    if module_name in module_cache:
+        return module_cache[module_name]
+    defined_names=[]
+    imported_names=[]
+    # this also stops circular star imports
+    module_cache[module_name]=(defined_names,imported_names)
+    module_path=get_api_module_path(module_name)
+    if not os.path.isfile(module_path):
+        return defined_names,imported_names
+    visited_files[module_path]=os.path.getmtime(module_path)
+    source_file=open(module_path,"rb")
+    tree=ast.parse(source_file.read(),filename=module_path)
+    source_file.close()
+    statements=list(tree.body)
+    while statements:
+        statement=statements.pop(0)
+        if isinstance(statement,(ast.FunctionDef,ast.ClassDef)) or \
+                type(statement).__name__ in ["AsyncFunctionDef"]:
+            defined_names.append(statement.name)
+        elif isinstance(statement,ast.Assign):
+            for target in statement.targets:
+                for node in ast.walk(target):
+                    if isinstance(node,ast.Name):
+                        defined_names.append(node.id)
+        elif isinstance(statement,ast.Import):
+            for alias in statement.names:
+                imported_names.append(alias.asname or alias.name.split(".")[0])
+        elif isinstance(statement,ast.ImportFrom):
+            for alias in statement.names:
+                if alias.name=="*":
+                    if statement.module and statement.module.split(".")[0]=="Code":
+                        star_defined,star_imported=get_module_names(statement.module,visited_files,
+                                                                                    module_cache)
+                        imported_names.extend(star_defined+star_imported)
+                else:
+                    imported_names.append(alias.asname or alias.name)
+        elif isinstance(statement,ast.If):
+            statements=statement.body+statement.orelse+statements
+        elif isinstance(statement,ast.Try) or type(statement).__name__ in ["TryExcept","TryFinally"]:
+            handler_bodies=[]
+            for handler in getattr(statement,"handlers",[]):
+                handler_bodies=handler_bodies+handler.body
+            statements=statement.body+handler_bodies+getattr(statement,"orelse",[])+\
+                       getattr(statement,"finalbody",[])+statements
+    defined_names[:]=[name for name in defined_names if not name.startswith("_")]
+    imported_names[:]=[name for name in imported_names if not name.startswith("_")]
+    return defined_names,imported_names
+
+def build_api_index(api_modules=None):
+    """Builds a dictionary of {name:module_name} for every public name exported by the active modules in
+    api_modules (defaults to API_MODULES). Names a module defines itself take precedence over names it only imports,
+    and later modules in sorted order win the same way they do for the from module import * loop.
+    Returns a tuple (index,visited_files)"""
+    if api_modules is None:
+        api_modules=API_MODULES
+    index={}
+    imported_index={}
+    visited_files={}
+    module_cache={}
+    for module_name in sorted(api_modules.keys()):
+        if api_modules[module_name]:
+            defined_names,imported_names=get_module_names(module_name,visited_files,module_cache)
+            for name in imported_names:
+                if name not in imported_index:
+                    imported_index[name]=module_name
+            for name in defined_names:
+                index[name]=module_name
+    for name,module_name in imported_index.items():
+        if name not in index:
+            index[name]=module_name
+    return index,visited_files
+
+def load_api_index(api_modules=None,index_path=None):
+    """Returns the name to module index, reading it from index_path (defaults to API_INDEX_PATH) if none of the
+    source files have changed since it was written, otherwise builds it and tries to write it back"""
+    if api_modules is None:
+        api_modules=API_MODULES
+    if index_path is None:
+        index_path=API_INDEX_PATH
+    active_modules=sorted([key for key,value in api_modules.items() if value])
+    try:
+        index_file=open(index_path,"rb")
+        cache=pickle.load(index_file)
+        index_file.close()
+        if cache["active_modules"]==active_modules:
+            up_to_date=True
+            for file_path,modification_time in cache["visited_files"].items():
+                if not os.path.isfile(file_path) or os.path.getmtime(file_path)!=modification_time:
+                    up_to_date=False
+                    break
+            if up_to_date:
+                return cache["index"]
+    except:
+        pass
+    index,visited_files=build_api_index(api_modules)
+    try:
+        index_file=open(index_path,"wb")
+        pickle.dump({"active_modules":active_modules,"visited_files":visited_files,"index":index},index_file)
+        index_file.close()
+    except:
+        pass
+    return index
+
+def import_api_module(module_name):
+    """Imports an API module by its dotted name (Code.Subpackage.Module) and returns it, echoing and timing the
+    import in the same way as the eager importer"""
+    if TIMED_IMPORT:
+        import datetime
+        start_timer=datetime.datetime.utcnow()
+    if VERBOSE_IMPORT and module_name not in sys.modules:
+        print(("Importing {0}".format(module_name)))
+    module=importlib.import_module(module_name)
+    if TIMED_IMPORT and VERBOSE_IMPORT:
+        time_difference=datetime.datetime.utcnow()-start_timer
+        print(("It took {0} s to import {1}".format(time_difference.total_seconds(),module_name)))
+    return module
+
 # This makes sure this file is the one loaded
 sys.path.append(os.path.dirname( __file__ ))
 # To tune the imported API change the API_MODULES dictionary
-if TIMED_IMPORT:
-    import datetime
-    first_timer=datetime.datetime.utcnow()
-    start_timer=datetime.datetime.utcnow()
-print("Importing pyMez, this should take roughly 30 seconds")
-for module in sorted(API_MODULES.keys()):
-    if API_MODULES[module]:
-        if VERBOSE_IMPORT:
-            print(("Importing {0}".format(module)))
-        exec('from {0} import *'.format(module))
-        if TIMED_IMPORT:
-            end_timer=datetime.datetime.utcnow()
-            time_difference=end_timer-start_timer
-            print(("It took {0} s to import {1}".format(time_difference.total_seconds(),module)))
-            start_timer=end_timer
-if TIMED_IMPORT:
-    end_timer = datetime.datetime.utcnow()
-    time_difference = end_timer - first_timer
-    print(("It took {0} s to import all of the active modules".format(time_difference.total_seconds())))
+if LAZY_IMPORT and sys.version_info < (3,7):
+    print("Lazy import requires module level __getattr__ (python 3.7+), importing all of the active modules")
+    LAZY_IMPORT=False
+if LAZY_IMPORT:
+    API_INDEX=load_api_index()
+    "Dictionary of {name:module_name} used to resolve pyMez.name on first access"
+    __all__=sorted(API_INDEX.keys())
+
+    def __getattr__(name):
+        """Resolves a name in the API by importing only the module that provides it"""
+        try:
+            module_name=API_INDEX[name]
+        except KeyError:
+            raise AttributeError("module {0!r} has no attribute {1!r}".format(__name__,name))
+        value=getattr(import_api_module(module_name),name)
+        globals()[name]=value
+        return value
+
+    def __dir__():
+        return sorted(set(globals().keys())|set(API_INDEX.keys()))
+else:
+    if TIMED_IMPORT:
+        import datetime
+        first_timer=datetime.datetime.utcnow()
+        start_timer=datetime.datetime.utcnow()
+    print("Importing pyMez, this should take roughly 30 seconds")
+    for module in sorted(API_MODULES.keys()):
+        if API_MODULES[module]:
+            if VERBOSE_IMPORT:
+                print(("Importing {0}".format(module)))
+            exec('from {0} import *'.format(module))
+            if TIMED_IMPORT:
+                end_timer=datetime.datetime.utcnow()
+                time_difference=end_timer-start_timer
+                print(("It took {0} s to import {1}".format(time_difference.total_seconds(),module)))
+                start_timer=end_timer
+    if TIMED_IMPORT:
+        end_timer = datetime.datetime.utcnow()
+        time_difference = end_timer - first_timer
+        print(("It took {0} s to import all of the active modules".format(time_difference.total_seconds())))
 